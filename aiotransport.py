@@ -0,0 +1,249 @@
+import asyncio
+import logging
+import os
+import time
+from http import HTTPStatus
+
+import aiohttp
+import telegram
+
+import homework
+from breaker import is_available
+from decoder import loads
+from exceptions import StatusCodeNotOk
+from homework import (admit, process_error, process_response,
+                      read_response, report_errors)
+from jsonlog import TENANT
+from metrics import API_LATENCY, API_RESPONSES, MESSAGES_SENT, SEND_LATENCY
+from tracing import tracer
+from traffic import api_record, get_log, send_record
+from transport import (HTTP_CONNECT_TIMEOUT, HTTP_POOL_MAXSIZE,
+                       HTTP_READ_TIMEOUT, HTTP_RETRIES)
+
+TELEGRAM_API_URL = os.getenv('TELEGRAM_API_URL', 'https://api.telegram.org')
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncTransport:
+    """
+    Асинхронные запросы к API Практикума и Telegram Bot API.
+    Все запросы идут через общий пул keep-alive соединений.
+    В режиме записи (TRAFFIC_RECORD) запросы к API и отправленные
+    сообщения записываются в log, как RecordingSession и RecordingBot.
+    """
+
+    def __init__(self, endpoint=homework.ENDPOINT,
+                 telegram_url=TELEGRAM_API_URL,
+                 pool_size=HTTP_POOL_MAXSIZE,
+                 connect_timeout=HTTP_CONNECT_TIMEOUT,
+                 read_timeout=HTTP_READ_TIMEOUT,
+                 retries=HTTP_RETRIES, log=None):
+        self.endpoint = endpoint
+        self.telegram_url = telegram_url
+        self.pool_size = pool_size
+        self.timeout = aiohttp.ClientTimeout(sock_connect=connect_timeout,
+                                             sock_read=read_timeout)
+        self.retries = retries
+        self.log = get_log() if log is None else log
+        self.session = None
+
+    async def start(self):
+        """Создаёт сессию с пулом соединений."""
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.pool_size),
+            timeout=self.timeout,
+        )
+
+    async def close(self):
+        """Закрывает все соединения пула."""
+        await self.session.close()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    async def get(self, headers, params):
+        """
+        Выполняет GET запрос к эндпоинту API.
+        Сбой соединения повторяется до retries раз.
+        Возвращает код, заголовки и тело ответа.
+        """
+        for attempt in range(self.retries + 1):
+            try:
+                async with self.session.get(
+                    self.endpoint, headers=headers, params=params
+                ) as response:
+                    return (response.status, response.headers,
+                            await response.read())
+            except aiohttp.ClientConnectionError:
+                if attempt == self.retries:
+                    raise
+
+    async def request_api(self, headers, timestamp, tenant=None):
+        """
+        Запрашивает эндпоинт API с заголовками конкретного студента.
+        Если передан студент, ответ разбирается только при изменении,
+        иначе возвращается None (см. homework.read_response).
+        Пока предохранитель API разомкнут, запрос не отправляется.
+        """
+        breaker, probe = admit(self.endpoint)
+        logger.debug('Делаем запрос к API')
+        payload = {'from_date': timestamp}
+        code = 'error'
+        started = time.perf_counter()
+        try:
+            with tracer.span('request'):
+                code, response_headers, body = await self.get(headers,
+                                                              payload)
+            if self.log is not None:
+                self.log.write(api_record(timestamp, code, response_headers,
+                                          body))
+            if tenant is not None and code in (HTTPStatus.OK,
+                                               HTTPStatus.NOT_MODIFIED):
+                return read_response(tenant, code, response_headers, body)
+            if code != HTTPStatus.OK:
+                raise StatusCodeNotOk(code)
+            return loads(body)
+        except Exception as error:
+            if self.log is not None and code == 'error':
+                # Ответа нет: записывается сбой запроса.
+                self.log.write(api_record(timestamp, error=error))
+            raise ConnectionError(
+                'Ошибка при запросе к основному API'
+            ) from error
+        except BaseException:
+            # Запрос отменён (asyncio.CancelledError), ответа API нет.
+            code = None
+            raise
+        finally:
+            if code is None:
+                breaker.abandon(probe)
+            else:
+                API_LATENCY.observe(time.perf_counter() - started)
+                API_RESPONSES.labels(code).inc()
+                breaker.release(probe, is_available(code))
+
+    def bot(self, token):
+        """Возвращает асинхронного бота Telegram с токеном token."""
+        return AsyncBot(self, token)
+
+
+class AsyncBot:
+    """
+    Асинхронный аналог telegram.Bot для отправки сообщений.
+    Ошибки Bot API превращаются в исключения telegram.error.
+    """
+
+    def __init__(self, transport, token):
+        self.transport = transport
+        self.log = transport.log
+        self.url = f'{transport.telegram_url}/bot{token}'
+
+    async def call(self, method, payload, wait=0):
+        """
+        Вызывает метод Bot API и возвращает его результат.
+        wait - сколько секунд сервер может держать запрос (long polling).
+        """
+        timeout = aiohttp.ClientTimeout(
+            sock_connect=self.transport.timeout.sock_connect,
+            sock_read=self.transport.timeout.sock_read + wait,
+        )
+        try:
+            async with self.transport.session.post(
+                f'{self.url}/{method}', json=payload, timeout=timeout
+            ) as response:
+                data = await response.json(content_type=None)
+        except asyncio.TimeoutError as error:
+            raise telegram.error.TimedOut() from error
+        except (aiohttp.ClientError, ValueError) as error:
+            raise telegram.error.NetworkError(str(error)) from error
+        if data.get('ok'):
+            return data['result']
+        description = data.get('description', 'Unknown error')
+        code = data.get('error_code')
+        if code == HTTPStatus.TOO_MANY_REQUESTS:
+            raise telegram.error.RetryAfter(
+                data.get('parameters', {}).get('retry_after', 1)
+            )
+        if code == HTTPStatus.BAD_REQUEST:
+            raise telegram.error.BadRequest(description)
+        if code in (HTTPStatus.UNAUTHORIZED, HTTPStatus.FORBIDDEN):
+            raise telegram.error.Unauthorized(description)
+        raise telegram.error.NetworkError(description)
+
+    async def send_message(self, chat_id=None, text=None):
+        """Отправляет сообщение в чат."""
+        try:
+            result = await self.call('sendMessage',
+                                     {'chat_id': chat_id, 'text': text})
+        except telegram.error.TelegramError as error:
+            if self.log is not None:
+                self.log.write(send_record(chat_id, text, error))
+            raise
+        if self.log is not None:
+            self.log.write(send_record(chat_id, text))
+        return result
+
+    async def get_updates(self, offset=None, timeout=0):
+        """
+        Возвращает новые сообщения боту с номером не меньше offset.
+        Если их нет, сервер ждёт до timeout секунд (long polling).
+        """
+        return await self.call(
+            'getUpdates',
+            {'offset': offset, 'timeout': timeout,
+             'allowed_updates': ['message']},
+            wait=timeout
+        )
+
+
+async def async_get_api_answer(transport, timestamp):
+    """Асинхронно запрашивает эндпоинт API-сервиса Яндекс.Домашка."""
+    return await transport.request_api(homework.HEADERS, timestamp)
+
+
+async def async_send_message(bot, message):
+    """Асинхронно отправляет сообщение в Telegram чат."""
+    return await async_send_chat_message(bot, homework.TELEGRAM_CHAT_ID,
+                                         message)
+
+
+async def async_send_chat_message(bot, chat_id, message):
+    """
+    Асинхронно отправляет сообщение в указанный Telegram чат.
+    Возвращает True, если сообщение доставлено.
+    """
+    started = time.perf_counter()
+    try:
+        with tracer.span('send_message'):
+            await bot.send_message(chat_id=chat_id, text=message)
+    except telegram.error.TelegramError as error:
+        logger.error(f'сбой при отправке сообщения: {message} - {error}')
+        return False
+    finally:
+        SEND_LATENCY.observe(time.perf_counter() - started)
+    MESSAGES_SENT.inc()
+    logger.debug(f'В Телеграм отправлено сообщение: {message}')
+    return True
+
+
+async def async_check_updates(transport, tenant, notify):
+    """Асинхронно выполняет один цикл опроса API для одного студента."""
+    context = TENANT.set(tenant.chat_id)
+    logger.info('Запрашиваем статус домашки')
+    try:
+        with tracer.span('check_updates'):
+            response = await transport.request_api(
+                tenant.conditional_headers(), tenant.timestamp, tenant
+            )
+            if response is not None:
+                process_response(tenant, response, notify)
+    except Exception as error:
+        process_error(tenant, error, notify)
+    finally:
+        report_errors(tenant, notify)
+        TENANT.reset(context)
@@ -0,0 +1,115 @@
+"""
+Локальные заменители API Практикум.Домашка и Telegram Bot API.
+
+У каждого студента (токен tokenN, чат N) одна работа: после первого
+запроса она находится на проверке, а через случайное время из
+[0, flip_window] секунд получает статус approved. Заменитель Telegram
+запоминает, когда пришло сообщение о вердикте, и отдаёт задержки
+уведомлений по адресу /stats.
+
+Запуск: python benchmarks/fakes.py --port 8080 --latency 0.05
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from aiohttp import web
+
+APPROVED_TEXT = 'ревьюеру всё понравилось'
+
+
+class FakeServers:
+    """Заменители API Практикума и Telegram с настраиваемыми сбоями."""
+
+    def __init__(self, latency=0, error_rate=0, telegram_latency=0,
+                 telegram_429_rate=0, flip_window=1, seed=0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.telegram_latency = telegram_latency
+        self.telegram_429_rate = telegram_429_rate
+        self.flip_window = flip_window
+        self.rng = random.Random(seed)
+        self.flips = {}
+        self.latencies = {}
+        self.counters = {'api_requests': 0, 'api_errors': 0,
+                         'messages': 0, 'too_many_requests': 0}
+
+    def application(self):
+        """Возвращает приложение aiohttp с обоими API."""
+        app = web.Application()
+        app.router.add_get('/api/user_api/homework_statuses/',
+                           self.homework_statuses)
+        app.router.add_post('/bot{token}/sendMessage', self.send_message)
+        app.router.add_get('/stats', self.stats)
+        return app
+
+    async def homework_statuses(self, request):
+        """Отвечает как API Практикум.Домашка."""
+        self.counters['api_requests'] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.rng.random() < self.error_rate:
+            self.counters['api_errors'] += 1
+            return web.json_response({}, status=500)
+        number = int(request.headers['Authorization'].split('token')[-1])
+        now = time.time()
+        if number not in self.flips:
+            self.flips[number] = now + self.rng.uniform(0, self.flip_window)
+        status = 'approved' if now >= self.flips[number] else 'reviewing'
+        return web.json_response({
+            'homeworks': [{'id': number, 'homework_name': f'hw{number}',
+                           'status': status}],
+            'current_date': int(request.query['from_date'])
+        })
+
+    async def send_message(self, request):
+        """Отвечает как метод sendMessage Telegram Bot API."""
+        if self.telegram_latency:
+            await asyncio.sleep(self.telegram_latency)
+        if self.rng.random() < self.telegram_429_rate:
+            self.counters['too_many_requests'] += 1
+            return web.json_response({
+                'ok': False, 'error_code': 429,
+                'description': 'Too Many Requests: retry after 1',
+                'parameters': {'retry_after': 1}
+            })
+        data = await request.json()
+        self.counters['messages'] += 1
+        number = int(data['chat_id'])
+        if APPROVED_TEXT in data['text'] and number not in self.latencies:
+            self.latencies[number] = time.time() - self.flips[number]
+        return web.json_response({'ok': True, 'result': {}})
+
+    async def stats(self, request):
+        """Отдаёт задержки уведомлений и счётчики запросов."""
+        return web.json_response({
+            'latencies': list(self.latencies.values()),
+            **self.counters
+        })
+
+
+def main():
+    """Запускает заменители на указанном порту."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency', type=float, default=0)
+    parser.add_argument('--error-rate', type=float, default=0)
+    parser.add_argument('--telegram-latency', type=float, default=0)
+    parser.add_argument('--telegram-429-rate', type=float, default=0)
+    parser.add_argument('--flip-window', type=float, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    servers = FakeServers(
+        latency=args.latency, error_rate=args.error_rate,
+        telegram_latency=args.telegram_latency,
+        telegram_429_rate=args.telegram_429_rate,
+        flip_window=args.flip_window, seed=args.seed
+    )
+    web.run_app(servers.application(), host=args.host, port=args.port,
+                print=None, access_log=None)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,174 @@
+"""
+Нагрузочный тест бота против локальных заменителей API.
+
+Для каждого числа студентов запускает заменители API Практикума
+и Telegram (benchmarks/fakes.py) в отдельном процессе и опрашивает
+студентов через engine.serve без пауз между циклами, пока все не
+получат уведомление о проверенной работе. Записывает в JSON файл
+время цикла, задержки уведомлений p50/p99, память и процессорное время.
+
+Запуск: python benchmarks/load.py --tenants 1 100 10000
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import resource
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARKS_DIR))
+
+from aiotransport import AsyncTransport  # noqa: E402
+from engine import serve  # noqa: E402
+from homework import Tenant  # noqa: E402
+from scheduler import Scheduler  # noqa: E402
+from sender import OutboundQueue  # noqa: E402
+
+
+def free_port():
+    """Возвращает свободный TCP порт."""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_fakes(port, args):
+    """Запускает заменители API в отдельном процессе."""
+    process = subprocess.Popen([
+        sys.executable, os.path.join(BENCHMARKS_DIR, 'fakes.py'),
+        '--port', str(port),
+        '--latency', str(args.latency),
+        '--error-rate', str(args.error_rate),
+        '--telegram-latency', str(args.telegram_latency),
+        '--telegram-429-rate', str(args.telegram_429_rate),
+        '--flip-window', str(args.flip_window),
+    ])
+    for _ in range(100):
+        try:
+            fetch_stats(port)
+            return process
+        except OSError:
+            time.sleep(0.05)
+    process.kill()
+    raise RuntimeError('Заменители API не запустились')
+
+
+def fetch_stats(port):
+    """Возвращает статистику заменителей API."""
+    with urllib.request.urlopen(f'http://127.0.0.1:{port}/stats') as answer:
+        return json.load(answer)
+
+
+def percentile(values, fraction):
+    """Возвращает перцентиль fraction (от 0 до 1) списка значений."""
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+async def drive(port, tenants, args):
+    """Опрашивает студентов, пока все не получат вердикт."""
+    transport = AsyncTransport(
+        endpoint=f'http://127.0.0.1:{port}/api/user_api/homework_statuses/',
+        telegram_url=f'http://127.0.0.1:{port}',
+        pool_size=args.concurrency, retries=0
+    )
+    async with transport:
+        bot = transport.bot('123:fake')
+        scheduler = Scheduler(period=0, reviewing_period=0, idle_period=0,
+                              max_backoff=1)
+        sender = OutboundQueue(bot, rate=args.telegram_rate,
+                               chat_rate=args.telegram_rate,
+                               workers=args.send_workers)
+        task = asyncio.create_task(serve(
+            bot, tenants, scheduler=scheduler, sender=sender,
+            transport=transport, concurrency=args.concurrency
+        ))
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        while time.perf_counter() - started < args.timeout:
+            await asyncio.sleep(0.2)
+            stats = await loop.run_in_executor(None, fetch_stats, port)
+            if len(stats['latencies']) >= len(tenants):
+                break
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return time.perf_counter() - started, stats
+
+
+def run(count, args):
+    """Прогоняет тест для count студентов и возвращает результат."""
+    port = free_port()
+    process = start_fakes(port, args)
+    try:
+        tenants = [Tenant(f'token{number}', number)
+                   for number in range(count)]
+        cpu_started = time.process_time()
+        elapsed, stats = asyncio.run(drive(port, tenants, args))
+        cpu = time.process_time() - cpu_started
+    finally:
+        process.terminate()
+        process.wait()
+    latencies = stats['latencies']
+    cycles = stats['api_requests'] / count
+    return {
+        'tenants': count,
+        'elapsed_seconds': elapsed,
+        'cycles': cycles,
+        'cycle_seconds': elapsed / cycles if cycles else None,
+        'notified': len(latencies),
+        'latency_p50_seconds': percentile(latencies, 0.5),
+        'latency_p99_seconds': percentile(latencies, 0.99),
+        'latency_mean_seconds': (statistics.mean(latencies)
+                                 if latencies else None),
+        'cpu_seconds': cpu,
+        'max_rss_mb': resource.getrusage(
+            resource.RUSAGE_SELF
+        ).ru_maxrss / 1024,
+        **{key: value for key, value in stats.items()
+           if key != 'latencies'},
+    }
+
+
+def main():
+    """Запускает нагрузочный тест и записывает результаты."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--tenants', type=int, nargs='+',
+                        default=[1, 100, 10000])
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--send-workers', type=int, default=50)
+    parser.add_argument('--telegram-rate', type=float, default=10000)
+    parser.add_argument('--latency', type=float, default=0.01)
+    parser.add_argument('--error-rate', type=float, default=0)
+    parser.add_argument('--telegram-latency', type=float, default=0.01)
+    parser.add_argument('--telegram-429-rate', type=float, default=0)
+    parser.add_argument('--flip-window', type=float, default=1)
+    parser.add_argument('--timeout', type=float, default=120)
+    parser.add_argument('--output', default='load_results.json')
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    results = []
+    for count in args.tenants:
+        result = run(count, args)
+        results.append(result)
+        print(f'{count:>6} студентов: цикл {result["cycle_seconds"]:.3f} с, '
+              f'p50 {result["latency_p50_seconds"]:.3f} с, '
+              f'p99 {result["latency_p99_seconds"]:.3f} с, '
+              f'CPU {result["cpu_seconds"]:.1f} с, '
+              f'RSS {result["max_rss_mb"]:.0f} МБ')
+    with open(args.output, 'w', encoding='utf-8') as file:
+        json.dump({'created': time.time(), 'arguments': vars(args),
+                   'results': results}, file, ensure_ascii=False, indent=4)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""
+Накладные расходы логирования на цикл опроса.
+
+Цикл опроса - check_updates для каждого студента с заменённым запросом
+к API, поэтому время цикла складывается из записей в лог. Сравниваются
+синхронный StreamHandler (как раньше) и очередь с фоновым потоком
+(LOG_ASYNC=1) при быстром выводе и при медленном выводе, который
+задерживает каждую запись, как переполненный канал лог-дрейна.
+Накладные расходы - разница со временем цикла при выключенном логе.
+
+Запуск: python benchmarks/logging_overhead.py --tenants 1000 --cycles 5
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import homework  # noqa: E402
+from homework import Tenant, check_updates, logger  # noqa: E402
+from jsonlog import CYCLE, queue_handler  # noqa: E402
+from metrics import LOG_RECORDS_DROPPED  # noqa: E402
+
+
+class Stream:
+    """Вывод, который тратит delay секунд на каждую запись."""
+
+    def __init__(self, delay=0):
+        self.delay = delay
+        self.writes = 0
+
+    def write(self, text):
+        """Учитывает запись и ждёт delay секунд."""
+        self.writes += 1
+        if self.delay:
+            time.sleep(self.delay)
+
+    def flush(self):
+        """Ничего не делает: записи никуда не выводятся."""
+
+
+def request_api(headers, timestamp, tenant=None):
+    """Заменяет запрос к API записью в лог, как в homework.request_api."""
+    logger.debug('Делаем запрос к API')
+    return None
+
+
+def sync_handler(stream):
+    """Возвращает прежний синхронный обработчик лога."""
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(
+        logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+    )
+    return handler
+
+
+def cycle_time(tenants, cycles):
+    """Возвращает среднее время цикла опроса в секундах."""
+    started = time.perf_counter()
+    for cycle in range(cycles):
+        context = CYCLE.set(cycle)
+        for tenant in tenants:
+            check_updates(tenant, bool)
+        CYCLE.reset(context)
+    return (time.perf_counter() - started) / cycles
+
+
+def dropped():
+    """Возвращает число отброшенных записей лога."""
+    return sum(LOG_RECORDS_DROPPED.labels(level).value
+               for level in ('DEBUG', 'INFO'))
+
+
+def measure(mode, delay, tenants, args):
+    """Возвращает время цикла с обработчиком mode и выводом с задержкой."""
+    stream = Stream(delay)
+    handler = (sync_handler(stream) if mode == 'sync'
+               else queue_handler(stream, size=args.queue_size))
+    # Как configure_logging: обработчик корневого логгера.
+    logging.getLogger().handlers = [handler]
+    before = dropped()
+    seconds = cycle_time(tenants, args.cycles)
+    lost = dropped() - before
+    if mode == 'queue':
+        handler.listener.stop()
+    return {'mode': mode, 'write_delay_seconds': delay,
+            'cycle_seconds': seconds, 'records_dropped': lost,
+            'records_written': stream.writes}
+
+
+def main():
+    """Запускает бенчмарк и записывает результаты."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--tenants', type=int, default=1000)
+    parser.add_argument('--cycles', type=int, default=5)
+    parser.add_argument('--slow-write', type=float, default=0.0002,
+                        help='задержка одной записи медленного вывода, с')
+    parser.add_argument('--queue-size', type=int, default=10000)
+    parser.add_argument('--output', default='logging_results.json')
+    args = parser.parse_args()
+    homework.request_api = request_api
+    tenants = [Tenant(f'token{number}', number)
+               for number in range(args.tenants)]
+
+    logging.getLogger().setLevel(logging.DEBUG)
+    logging.disable(logging.CRITICAL)
+    baseline = cycle_time(tenants, args.cycles)
+    logging.disable(logging.NOTSET)
+    results = []
+    for delay in (0, args.slow_write):
+        for mode in ('sync', 'queue'):
+            result = measure(mode, delay, tenants, args)
+            result['overhead_seconds'] = result['cycle_seconds'] - baseline
+            results.append(result)
+            print(f'{mode:>5}, задержка вывода {delay * 1e6:>4.0f} мкс: '
+                  f'расходы на цикл {result["overhead_seconds"] * 1e3:8.1f}'
+                  f' мс, отброшено {result["records_dropped"]}')
+    with open(args.output, 'w', encoding='utf-8') as file:
+        json.dump({'created': time.time(), 'arguments': vars(args),
+                   'baseline_cycle_seconds': baseline, 'results': results},
+                  file, ensure_ascii=False, indent=4)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""
+Память на одну отслеживаемую работу.
+
+Ответы API с работами студентов разбираются json.loads, после чего
+работы хранятся одним из способов:
+ - json: словари работ из response.json() как есть;
+ - dict: прежний индекс Tenant - словари {id: статус} и {id: имя};
+ - table: HomeworkTable - колонки в массивах, коды статусов, время
+   обновления в секундах.
+Память считается tracemalloc после того, как ответы API отброшены.
+
+Запуск: python benchmarks/memory.py --tenants 1000 --homeworks 100
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from homework import (HOMEWORK_VERDICTS, STATUS_CODES,  # noqa: E402
+                      get_homework_id)
+from records import HomeworkTable, parse_timestamp  # noqa: E402
+
+
+def make_response(tenant, homeworks, start):
+    """Возвращает тело ответа API с homeworks работами студента."""
+    return json.dumps({'homeworks': [
+        {'id': start + number,
+         'status': random.choice(list(HOMEWORK_VERDICTS)),
+         'homework_name': f'student{tenant}__hw{number:02d}_project.zip',
+         'reviewer_comment': 'Принято!',
+         'date_updated': '2022-06-03T14:40:57Z',
+         'lesson_name': f'Итоговый проект {number}'}
+        for number in range(homeworks)
+    ], 'current_date': 1654267257})
+
+
+def keep_json(homeworks):
+    """Хранит словари работ как есть."""
+    return homeworks
+
+
+def keep_dict(homeworks):
+    """Хранит работы в словарях статусов и имён, как прежний Tenant."""
+    statuses, names = {}, {}
+    for homework in homeworks:
+        homework_id = get_homework_id(homework)
+        statuses[homework_id] = homework['status']
+        names[homework_id] = homework.get('homework_name', homework_id)
+    return statuses, names
+
+
+def keep_table(homeworks):
+    """Хранит работы в HomeworkTable."""
+    table = HomeworkTable(STATUS_CODES)
+    for homework in homeworks:
+        table.set(get_homework_id(homework), homework['status'],
+                  homework.get('homework_name'),
+                  parse_timestamp(homework.get('date_updated')))
+    return table
+
+
+def measure(keep, responses):
+    """Возвращает байты на работу и время заполнения в секундах."""
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    kept = [keep(json.loads(response)['homeworks'])
+            for response in responses]
+    seconds = time.perf_counter() - started
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return size, seconds
+
+
+def main():
+    """Запускает бенчмарк и записывает результаты."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--tenants', type=int, default=1000)
+    parser.add_argument('--homeworks', type=int, default=100,
+                        help='работ у одного студента')
+    parser.add_argument('--output', default='memory_results.json')
+    args = parser.parse_args()
+    random.seed(1)
+    responses = [make_response(tenant, args.homeworks,
+                               tenant * args.homeworks)
+                 for tenant in range(args.tenants)]
+    total = args.tenants * args.homeworks
+    results = {}
+    for name, keep in (('json', keep_json), ('dict', keep_dict),
+                       ('table', keep_table)):
+        size, seconds = measure(keep, responses)
+        results[name] = {'bytes_per_homework': size / total,
+                         'fill_seconds': seconds}
+    for name, result in results.items():
+        ratio = (results['json']['bytes_per_homework']
+                 / result['bytes_per_homework'])
+        result['reduction_vs_json'] = ratio
+        print(f'{name:>5}: {result["bytes_per_homework"]:7.1f} байт '
+              f'на работу, в {ratio:5.1f} раз меньше json, '
+              f'заполнение {result["fill_seconds"]:.2f} с')
+    with open(args.output, 'w', encoding='utf-8') as file:
+        json.dump({'created': time.time(), 'arguments': vars(args),
+                   'homeworks': total, 'results': results},
+                  file, ensure_ascii=False, indent=4)
+
+
+if __name__ == '__main__':
+    main()
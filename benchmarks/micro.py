@@ -0,0 +1,194 @@
+"""
+Микробенчмарки check_response, parse_status и validate_homeworks.
+
+Синтетические ответы API содержат от 1 до 1000 работ, есть ответ
+размером около 1 МБ. Для каждого сценария (корректный ответ и все
+ветки ошибок) измеряется время одного вызова в наносекундах и память,
+выделяемая за вызов (по tracemalloc).
+
+Запуск: python benchmarks/micro.py --output micro_results.json
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from decoder import current_backend, decode  # noqa: E402
+from homework import (HOMEWORK_VERDICTS, check_response,  # noqa: E402
+                      fingerprint, parse_status, status_message,
+                      validate_homeworks)
+
+STATUSES = tuple(HOMEWORK_VERDICTS)
+
+
+def make_homework(number, rng, comment_size=200):
+    """Возвращает домашнюю работу в формате API."""
+    return {
+        'id': number,
+        'status': rng.choice(STATUSES),
+        'homework_name': f'student__hw{number:04d}_project.zip',
+        'reviewer_comment': 'Отличная работа! ' * (comment_size // 17),
+        'date_updated': '2022-06-03T14:40:57Z',
+        'lesson_name': f'Проект спринта {number % 20}',
+    }
+
+
+def make_response(count, comment_size=200, seed=0):
+    """Возвращает ответ API с count домашними работами."""
+    rng = random.Random(seed)
+    return {
+        'homeworks': [make_homework(number, rng, comment_size)
+                      for number in range(count)],
+        'current_date': 1654268458,
+    }
+
+
+def make_megabyte_response():
+    """Возвращает ответ API размером около 1 МБ в JSON."""
+    return make_response(500, comment_size=2000)
+
+
+def check_all(response):
+    """Проверяет ответ и разбирает статусы всех работ, как в main()."""
+    for homework in check_response(response):
+        parse_status(homework)
+
+
+def validate_all(response, messages=False):
+    """
+    Проверяет ответ и все работы скомпилированным валидатором.
+    При messages=True готовит сообщения для всех работ, как parse_status.
+    """
+    errors = []
+    for homework in validate_homeworks(check_response(response), errors):
+        if messages:
+            status_message(homework)
+    return errors
+
+
+def expect_error(function, argument):
+    """Вызывает функцию, которая должна выбросить исключение."""
+    def call():
+        try:
+            function(argument)
+        except (TypeError, KeyError):
+            return
+        raise AssertionError(f'{function.__name__} не выбросила исключение')
+    return call
+
+
+def scenarios():
+    """Возвращает сценарии: {название: функция без аргументов}."""
+    cases = {}
+    for count in (1, 10, 100, 1000):
+        response = make_response(count)
+        cases[f'check_response, {count} работ'] = (
+            lambda response=response: check_response(response)
+        )
+        cases[f'check_response + parse_status, {count} работ'] = (
+            lambda response=response: check_all(response)
+        )
+        cases[f'validate_homeworks, {count} работ'] = (
+            lambda response=response: validate_all(response)
+        )
+        cases[f'validate_homeworks + сообщения, {count} работ'] = (
+            lambda response=response: validate_all(response, messages=True)
+        )
+    broken = make_response(1000)
+    for homework in broken['homeworks'][::10]:
+        homework['status'] = 'unknown'
+    cases['validate_homeworks, 1000 работ, 10% с ошибкой'] = (
+        lambda: validate_all(broken)
+    )
+    megabyte = make_megabyte_response()
+    cases['check_response + parse_status, 1 МБ'] = (
+        lambda: check_all(megabyte)
+    )
+    bodies = {
+        '1000 работ': json.dumps(make_response(1000),
+                                 ensure_ascii=False).encode(),
+        '1 МБ': json.dumps(megabyte, ensure_ascii=False).encode(),
+    }
+    for size, body in bodies.items():
+        cases[f'json.loads + проверка, {size}'] = (
+            lambda body=body: check_all(json.loads(body))
+        )
+        cases[f'decode ({current_backend().__name__}) + проверка, {size}'] = (
+            lambda body=body: check_all(decode(body, lazy=False))
+        )
+        cases[f'decode (лениво) + проверка, {size}'] = (
+            lambda body=body: check_all(decode(body, lazy=True))
+        )
+    cases['отпечаток тела ответа, 1 МБ'] = (
+        lambda: fingerprint(bodies['1 МБ'])
+    )
+    homework = make_homework(1, random.Random(0))
+    cases['parse_status, одна работа'] = lambda: parse_status(homework)
+    cases['ошибка: нет ключа homeworks'] = expect_error(
+        check_response, {'current_date': 1}
+    )
+    cases['ошибка: ответ не словарь'] = expect_error(
+        check_response, [make_response(1)]
+    )
+    cases['ошибка: homeworks не список'] = expect_error(
+        check_response, {'homeworks': homework}
+    )
+    cases['ошибка: неизвестный статус'] = expect_error(
+        parse_status, dict(homework, status='unknown')
+    )
+    cases['ошибка: нет homework_name'] = expect_error(
+        parse_status, {'status': 'approved'}
+    )
+    cases['ошибка: нет status'] = expect_error(
+        parse_status, {'homework_name': 'hw'}
+    )
+    return cases
+
+
+def measure(function, repeat=5):
+    """
+    Возвращает время вызова в наносекундах и память за вызов.
+    Память - пик выделенных за один вызов байт (по tracemalloc).
+    """
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    best = min(timer.repeat(repeat=repeat, number=number)) / number
+    tracemalloc.start()
+    function()
+    baseline, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'ns_per_op': best * 1e9, 'peak_bytes_per_op': peak - baseline}
+
+
+def main():
+    """Запускает микробенчмарки и печатает таблицу."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--filter', default='',
+                        help='запускать только сценарии с этой подстрокой')
+    parser.add_argument('--output', help='файл для результатов в JSON')
+    args = parser.parse_args()
+
+    results = {}
+    print(f'{"сценарий":<52}{"нс/вызов":>14}{"память, Б/вызов":>18}')
+    for name, function in scenarios().items():
+        if args.filter not in name:
+            continue
+        result = measure(function)
+        results[name] = result
+        print(f'{name:<52}{result["ns_per_op"]:>14.0f}'
+              f'{result["peak_bytes_per_op"]:>18}')
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(results, file, ensure_ascii=False, indent=4)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+Сравнивает задержку уведомлений при опросе раз в RETRY_PERIOD
+и при опросе по расписанию Scheduler.
+
+Модель: студент сдаёт работу, через случайное время ревьюер берёт её
+на проверку (статус reviewing), ещё через случайное время выносит
+вердикт. Задержка уведомления - время от смены статуса до ближайшего
+опроса API.
+
+Запуск: python benchmarks/scheduler_latency.py --tenants 1000 --days 7
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from homework import RETRY_PERIOD  # noqa: E402
+from scheduler import Scheduler  # noqa: E402
+
+HOUR = 60 * 60
+DAY = 24 * HOUR
+
+
+def generate_events(rng, horizon):
+    """Возвращает смены статусов одного студента: [(время, статус)]."""
+    events = []
+    moment = rng.uniform(0, DAY)
+    while True:
+        moment += rng.expovariate(1 / (6 * HOUR))
+        if moment > horizon:
+            return events
+        events.append((moment, 'reviewing'))
+        moment += rng.expovariate(1 / HOUR)
+        if moment > horizon:
+            return events
+        events.append((moment, rng.choice(('approved', 'rejected'))))
+        moment += rng.expovariate(1 / (2 * DAY))
+
+
+def simulate(events, delay, start):
+    """
+    Опрашивает API студента с интервалами delay(студент, время).
+    Возвращает задержки уведомлений и число запросов.
+    """
+    tenant = SimpleNamespace(failures=0, last_status=None, changed_at=None)
+    latencies = []
+    requests = 0
+    moment = start
+    position = 0
+    horizon = events[-1][0] if events else start
+    while position < len(events) or moment <= horizon:
+        requests += 1
+        while position < len(events) and events[position][0] <= moment:
+            event_time, status = events[position]
+            latencies.append(moment - event_time)
+            tenant.last_status = status
+            tenant.changed_at = moment
+            position += 1
+        if position == len(events):
+            break
+        moment += delay(tenant, moment)
+    return latencies, requests
+
+
+def main():
+    """Выводит сравнение фиксированного и адаптивного опроса."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--tenants', type=int, default=1000)
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    horizon = args.days * DAY
+    scheduler = Scheduler(rng=random.Random(args.seed))
+    strategies = {
+        f'фиксированный {RETRY_PERIOD} с': lambda tenant, now: RETRY_PERIOD,
+        'Scheduler': scheduler.delay,
+    }
+    results = {name: ([], 0) for name in strategies}
+    for _ in range(args.tenants):
+        events = generate_events(rng, horizon)
+        start = rng.uniform(0, RETRY_PERIOD)
+        for name, delay in strategies.items():
+            latencies, requests = simulate(events, delay, start)
+            total_latencies, total_requests = results[name]
+            total_latencies.extend(latencies)
+            results[name] = total_latencies, total_requests + requests
+
+    print(f'{"стратегия":<22}{"средняя задержка, с":>22}'
+          f'{"p99, с":>10}{"запросов":>12}')
+    for name, (latencies, requests) in results.items():
+        p99 = statistics.quantiles(latencies, n=100)[-1]
+        print(f'{name:<22}{statistics.mean(latencies):>22.1f}'
+              f'{p99:>10.1f}{requests:>12}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+"""
+Масштабирование опроса при шардировании студентов по процессам.
+
+Для каждого числа процессов запускает столько же процессов бота
+(engine.serve с Shard) с общим реестром SQLite. Каждому процессу бота
+достаётся свой заменитель API (benchmarks/fakes.py), чтобы сервер
+не стал узким местом. Все процессы знают всех студентов, а опрашивают
+только свою часть. Записывает в JSON число опросов в секунду,
+ускорение и эффективность относительно одного процесса.
+
+Запуск: python benchmarks/sharding.py --workers 1 2 4 --tenants 2000
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARKS_DIR))
+
+from load import fetch_stats, free_port, start_fakes  # noqa: E402
+
+FAKES_OPTIONS = SimpleNamespace(latency=0, error_rate=0, telegram_latency=0,
+                                telegram_429_rate=0, flip_window=3600)
+
+
+async def poll_shard(args):
+    """Опрашивает часть студентов этого процесса args.duration секунд."""
+    from aiotransport import AsyncTransport
+    from engine import serve
+    from homework import Tenant
+    from scheduler import Scheduler
+    from sender import OutboundQueue
+    from sharding import Shard, ShardRegistry
+
+    logging.disable(logging.CRITICAL)
+    tenants = [Tenant(f'token{number}', number)
+               for number in range(args.tenants)]
+    shard = Shard(ShardRegistry(args.registry), tenants,
+                  worker=args.worker_id, interval=args.interval)
+    transport = AsyncTransport(
+        endpoint=f'http://127.0.0.1:{args.port}/api/user_api/'
+                 f'homework_statuses/',
+        telegram_url=f'http://127.0.0.1:{args.port}',
+        pool_size=args.concurrency, retries=0
+    )
+    async with transport:
+        bot = transport.bot('123:fake')
+        task = asyncio.create_task(serve(
+            bot, tenants, transport=transport, shard=shard,
+            scheduler=Scheduler(period=0, reviewing_period=0,
+                                idle_period=0),
+            sender=OutboundQueue(bot, rate=10000, chat_rate=10000),
+            concurrency=args.concurrency
+        ))
+        await asyncio.sleep(args.duration)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+    # Итог пишется в файл: stdout процесса общий с логом.
+    with open(args.result, 'w', encoding='utf-8') as file:
+        json.dump({'worker': args.worker_id, 'owned': len(shard.owned)}, file)
+
+
+def run(workers, args):
+    """Запускает workers процессов бота и возвращает число опросов в с."""
+    ports = [free_port() for _ in range(workers)]
+    fakes = [start_fakes(port, FAKES_OPTIONS) for port in ports]
+    directory = tempfile.mkdtemp()
+    registry = os.path.join(directory, 'shards.sqlite3')
+    results = [os.path.join(directory, f'worker{number}.json')
+               for number in range(workers)]
+    duration = args.warmup + args.duration
+    try:
+        processes = [subprocess.Popen(
+            [sys.executable, __file__, '--worker',
+             '--worker-id', f'worker{number}', '--port', str(port),
+             '--registry', registry, '--result', results[number],
+             '--tenants', str(args.tenants),
+             '--interval', str(args.interval),
+             '--concurrency', str(args.concurrency),
+             '--duration', str(duration)],
+            stdout=subprocess.DEVNULL
+        ) for number, port in enumerate(ports)]
+        time.sleep(args.warmup)
+        before = sum(fetch_stats(port)['api_requests'] for port in ports)
+        time.sleep(args.duration)
+        after = sum(fetch_stats(port)['api_requests'] for port in ports)
+        for process in processes:
+            process.wait()
+        owned = []
+        for path in results:
+            with open(path, encoding='utf-8') as file:
+                owned.append(json.load(file)['owned'])
+    finally:
+        for process in fakes:
+            process.terminate()
+            process.wait()
+    return {'workers': workers, 'owned': owned,
+            'polls_per_second': (after - before) / args.duration}
+
+
+def main():
+    """Запускает бенчмарк или, с --worker, один процесс бота."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--tenants', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--interval', type=float, default=0.5)
+    parser.add_argument('--warmup', type=float, default=3)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--output', default='sharding_results.json')
+    parser.add_argument('--worker', action='store_true',
+                        help=argparse.SUPPRESS)
+    parser.add_argument('--worker-id', help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--registry', help=argparse.SUPPRESS)
+    parser.add_argument('--result', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        asyncio.run(poll_shard(args))
+        return
+
+    results = []
+    for workers in args.workers:
+        result = run(workers, args)
+        base = results[0]['polls_per_second'] if results else (
+            result['polls_per_second']
+        )
+        result['speedup'] = result['polls_per_second'] / base
+        result['efficiency'] = result['speedup'] / workers
+        results.append(result)
+        print(f'{workers:>3} процессов: '
+              f'{result["polls_per_second"]:.0f} опросов/с, '
+              f'ускорение {result["speedup"]:.2f}, '
+              f'студентов по процессам {result["owned"]}')
+    with open(args.output, 'w', encoding='utf-8') as file:
+        json.dump({'created': time.time(), 'cpu_count': os.cpu_count(),
+                   'arguments': vars(args), 'results': results},
+                  file, ensure_ascii=False, indent=4)
+
+
+if __name__ == '__main__':
+    main()
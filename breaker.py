@@ -0,0 +1,150 @@
+import logging
+import os
+import threading
+import time
+from http import HTTPStatus
+
+from exceptions import CircuitOpen
+from metrics import (API_SHORT_CIRCUITS, BREAKER_STATE,
+                     BREAKER_TRANSITIONS)
+
+BREAKER_FAILURES = int(os.getenv('BREAKER_FAILURES', 5))
+BREAKER_RESET_TIMEOUT = float(os.getenv('BREAKER_RESET_TIMEOUT', 60))
+BREAKER_PROBES = int(os.getenv('BREAKER_PROBES', 1))
+
+CLOSED = 'closed'
+HALF_OPEN = 'half_open'
+OPEN = 'open'
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+logger = logging.getLogger(__name__)
+
+
+def is_available(code):
+    """
+    Проверяет, что API ответило по существу.
+    Сбой соединения ('error'), 5xx и 429 говорят о проблемах сервера,
+    остальные коды (например, 401 с чужим токеном) - нет.
+    """
+    if code == 'error':
+        return False
+    return code < HTTPStatus.INTERNAL_SERVER_ERROR and (
+        code != HTTPStatus.TOO_MANY_REQUESTS
+    )
+
+
+class CircuitBreaker:
+    """
+    Предохранитель запросов к одному эндпоинту.
+    После failures сбоев подряд размыкается и reset_timeout секунд
+    отклоняет все запросы. Затем пропускает не больше probes пробных
+    запросов одновременно: удачный замыкает цепь, неудачный снова
+    размыкает её.
+    Время, если его не передали, берётся из clock.
+    """
+
+    def __init__(self, name, failures=BREAKER_FAILURES,
+                 reset_timeout=BREAKER_RESET_TIMEOUT, probes=BREAKER_PROBES,
+                 clock=time.monotonic):
+        self.name = name
+        self.clock = clock
+        self.max_failures = failures
+        self.reset_timeout = reset_timeout
+        self.probes = probes
+        self.lock = threading.Lock()
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.in_flight = 0
+        BREAKER_STATE.labels(name).set(STATE_VALUES[CLOSED])
+
+    def transition(self, state, now):
+        """Переводит предохранитель в состояние state."""
+        logger.warning(f'Предохранитель {self.name}: '
+                       f'{self.state} -> {state}')
+        self.state = state
+        if state == OPEN:
+            self.opened_at = now
+        if state == CLOSED:
+            self.failures = 0
+        BREAKER_STATE.labels(self.name).set(STATE_VALUES[state])
+        BREAKER_TRANSITIONS.labels(self.name, state).inc()
+
+    def acquire(self, now=None):
+        """
+        Разрешает запрос или выбрасывает CircuitOpen.
+        Возвращает True, если запрос пробный.
+        """
+        if now is None:
+            now = self.clock()
+        with self.lock:
+            if self.state == OPEN and (
+                now - self.opened_at >= self.reset_timeout
+            ):
+                self.transition(HALF_OPEN, now)
+            if self.state == CLOSED:
+                return False
+            if self.state == HALF_OPEN and self.in_flight < self.probes:
+                self.in_flight += 1
+                return True
+        API_SHORT_CIRCUITS.labels(self.name).inc()
+        raise CircuitOpen(self.name)
+
+    def release(self, probe, ok, now=None):
+        """Учитывает результат запроса, разрешённого acquire."""
+        if now is None:
+            now = self.clock()
+        with self.lock:
+            if probe:
+                self.in_flight -= 1
+                if self.state == HALF_OPEN:
+                    self.transition(CLOSED if ok else OPEN, now)
+                return
+            if self.state != CLOSED:
+                # Ответ на запрос, начатый до размыкания цепи.
+                return
+            if ok:
+                self.failures = 0
+                return
+            self.failures += 1
+            if self.failures >= self.max_failures:
+                self.transition(OPEN, now)
+
+    def abandon(self, probe):
+        """
+        Освобождает место пробного запроса, прерванного до ответа.
+        Прерванный запрос (отмена задачи, завершение программы) ничего
+        не говорит о доступности API, поэтому не считается ни удачей,
+        ни сбоем.
+        """
+        if probe:
+            with self.lock:
+                self.in_flight -= 1
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(endpoint):
+    """Возвращает общий для процесса предохранитель эндпоинта."""
+    breaker = _breakers.get(endpoint)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.setdefault(endpoint,
+                                           CircuitBreaker(endpoint))
+    return breaker
+
+
+def set_breaker(endpoint, breaker):
+    """
+    Заменяет общий для процесса предохранитель эндпоинта.
+    Возвращает прежний или None. При breaker=None предохранитель будет
+    создан заново. Через эту функцию воспроизведение записи обмена с API
+    (traffic.py) подставляет предохранитель со своими часами.
+    """
+    with _breakers_lock:
+        previous = _breakers.pop(endpoint, None)
+        if breaker is not None:
+            _breakers[endpoint] = breaker
+    return previous
@@ -0,0 +1,105 @@
+import asyncio
+import logging
+import os
+import time
+
+import telegram
+
+from homework import HOMEWORK_VERDICTS
+from metrics import COMMAND_LATENCY, COMMANDS
+
+BOT_COMMANDS = bool(int(os.getenv('BOT_COMMANDS', 1)))
+UPDATES_TIMEOUT = int(os.getenv('UPDATES_TIMEOUT', 30))
+UPDATES_RETRY_DELAY = 5
+STATUS_LIMIT = 30
+
+HELP = ('Команды:\n'
+        '/status - последние известные статусы работ\n'
+        '/history - последние уведомления')
+UNKNOWN_CHAT = 'Этот чат не подписан на уведомления о домашних работах.'
+
+logger = logging.getLogger(__name__)
+
+
+class CommandHandler:
+    """
+    Отвечает на команды /status и /history в чатах студентов.
+    Ответы строятся из состояния студентов в памяти, без запросов к API.
+    Сообщения боту получаются через getUpdates (long polling).
+    """
+
+    def __init__(self, bot, tenants, timeout=UPDATES_TIMEOUT):
+        self.bot = bot
+        self.timeout = timeout
+        self.tenants = {str(tenant.chat_id): tenant for tenant in tenants}
+        self.offset = None
+        self.commands = {
+            '/start': self.help,
+            '/help': self.help,
+            '/status': self.status,
+            '/history': self.history,
+        }
+
+    def answer(self, chat_id, text):
+        """Возвращает ответ на сообщение text из чата chat_id или None."""
+        if not text.startswith('/'):
+            return None
+        command = text.split()[0].split('@')[0].lower()
+        if command not in self.commands:
+            command = '/help'
+        COMMANDS.labels(command).inc()
+        with COMMAND_LATENCY.time():
+            tenant = self.tenants.get(str(chat_id))
+            if tenant is None:
+                return UNKNOWN_CHAT
+            return self.commands[command](tenant)
+
+    def help(self, tenant):
+        """Возвращает список команд."""
+        return HELP
+
+    def status(self, tenant):
+        """Возвращает последние известные статусы работ студента."""
+        total = len(tenant.statuses)
+        if not total:
+            return 'Пока нет данных о ваших работах.'
+        lines = [
+            f'"{name}": {HOMEWORK_VERDICTS.get(status, status)}'
+            for homework_id, status, name in tenant.statuses.last(STATUS_LIMIT)
+        ]
+        if total > STATUS_LIMIT:
+            lines.insert(0, f'Последние {STATUS_LIMIT} из {total} работ:')
+        return '\n'.join(lines)
+
+    def history(self, tenant):
+        """Возвращает последние уведомления, отправленные студенту."""
+        history = list(tenant.history)
+        if not history:
+            return 'Уведомлений пока не было.'
+        return '\n\n'.join(
+            f'{time.strftime("%d.%m.%Y %H:%M", time.localtime(sent_at))}\n'
+            f'{message}'
+            for message, sent_at in history
+        )
+
+    def handle(self, update, sender):
+        """Отвечает на одно обновление getUpdates."""
+        self.offset = update['update_id'] + 1
+        message = update.get('message') or {}
+        chat_id = message.get('chat', {}).get('id')
+        reply = self.answer(chat_id, message.get('text') or '')
+        if reply is not None:
+            sender.submit(chat_id, reply)
+
+    async def run(self, sender):
+        """Получает сообщения боту и отправляет ответы через sender."""
+        while True:
+            try:
+                updates = await self.bot.get_updates(offset=self.offset,
+                                                     timeout=self.timeout)
+            except telegram.error.TelegramError as error:
+                logger.error(f'Сбой при получении команд: {error}')
+                await asyncio.sleep(UPDATES_RETRY_DELAY)
+                continue
+            for update in updates:
+                self.handle(update, sender)
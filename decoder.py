@@ -0,0 +1,137 @@
+import json
+import os
+import re
+
+JSON_BACKEND = os.getenv('JSON_BACKEND', 'auto')
+JSON_LAZY = bool(int(os.getenv('JSON_LAZY', 0)))
+
+HOMEWORKS = re.compile(rb'"homeworks"\s*:\s*\[')
+SEPARATOR = re.compile(rb'[\s,]*')
+# Текст до ближайшей фигурной скобки вне строк JSON. Каждый символ
+# подходит только под одну альтернативу, а совпадение не может
+# провалиться, поэтому поиск линейный и без возвратов.
+SKIP = re.compile(rb'(?:[^{}"]|"[^"\\]*(?:\\.[^"\\]*)*")*')
+
+
+def get_backend(name=JSON_BACKEND):
+    """
+    Возвращает модуль для разбора JSON.
+    При name='auto' это orjson, если он установлен, иначе json.
+    """
+    if name in ('auto', 'orjson'):
+        try:
+            import orjson
+            return orjson
+        except ImportError:
+            if name == 'orjson':
+                raise
+    return json
+
+
+_backend = None
+
+
+def current_backend():
+    """Возвращает библиотеку для разбора JSON, выбирая её при первом вызове."""
+    global _backend
+    if _backend is None:
+        _backend = get_backend()
+    return _backend
+
+
+def loads(data):
+    """Разбирает JSON выбранной библиотекой."""
+    return current_backend().loads(data)
+
+
+def object_end(body, start):
+    """
+    Возвращает конец объекта JSON, начинающегося в body[start], или None.
+    Считает глубину фигурных скобок вне строк, поэтому вложенные объекты
+    и массивы разбираются за один проход.
+    """
+    depth = 0
+    position = start
+    while True:
+        position = SKIP.match(body, position).end()
+        char = body[position:position + 1]
+        if char == b'{':
+            depth += 1
+        elif char == b'}':
+            depth -= 1
+            if not depth:
+                return position + 1
+        else:
+            # Конец тела или незакрытая строка.
+            return None
+        position += 1
+
+
+class LazyHomeworks(list):
+    """
+    Домашние работы из тела ответа, разбираемые при обращении к ним.
+    Хранит только границы работ в теле, поэтому в памяти одновременно
+    находится одна разобранная работа. Наследует list, чтобы проходить
+    проверку check_response.
+    """
+
+    def __init__(self, body, spans):
+        super().__init__()
+        self.body = body
+        self.spans = spans
+
+    def materialize(self, span):
+        """Разбирает работу с границами span."""
+        start, end = span
+        return loads(self.body[start:end])
+
+    def __len__(self):
+        return len(self.spans)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.materialize(span) for span in self.spans[index]]
+        return self.materialize(self.spans[index])
+
+    def __iter__(self):
+        return map(self.materialize, self.spans)
+
+    def __reversed__(self):
+        return map(self.materialize, reversed(self.spans))
+
+    def __eq__(self, other):
+        return list(self) == other
+
+    def __repr__(self):
+        return f'<LazyHomeworks: {len(self)}>'
+
+
+def decode(body, lazy=JSON_LAZY):
+    """
+    Разбирает тело ответа API.
+    В ленивом режиме список homeworks заменяется на LazyHomeworks.
+    Ленивый режим экономит память, а не время: границы работ ищутся
+    на Python, и разбор в несколько раз медленнее json.loads.
+    Если работы не объекты JSON, ответ разбирается целиком.
+    """
+    found = HOMEWORKS.search(body) if lazy else None
+    if found is None:
+        return loads(body)
+    spans = []
+    position = found.end()
+    while True:
+        position = SEPARATOR.match(body, position).end()
+        if body[position:position + 1] == b']':
+            break
+        end = None
+        if body[position:position + 1] == b'{':
+            end = object_end(body, position)
+        if end is None:
+            return loads(body)
+        spans.append((position, end))
+        position = end
+    response = loads(body[:found.end()] + body[position:])
+    if not isinstance(response, dict) or response.get('homeworks') != []:
+        return loads(body)
+    response['homeworks'] = LazyHomeworks(body, spans)
+    return response
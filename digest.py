@@ -0,0 +1,108 @@
+import os
+import time
+import traceback
+from collections import OrderedDict
+
+from exceptions import StatusCodeNotOk
+
+ERROR_TABLE_SIZE = int(os.getenv('ERROR_TABLE_SIZE', 32))
+ERROR_TTL = float(os.getenv('ERROR_TTL', 6 * 3600))
+ERROR_DIGEST_PERIOD = float(os.getenv('ERROR_DIGEST_PERIOD', 3600))
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def error_origin(error):
+    """Возвращает функцию бота, в которой было выброшено исключение."""
+    origin = None
+    for frame in traceback.extract_tb(error.__traceback__):
+        if os.path.dirname(os.path.abspath(frame.filename)) == PROJECT_DIR:
+            origin = frame.name
+    return origin
+
+
+def error_fingerprint(error):
+    """
+    Возвращает отпечаток сбоя: тип исходного исключения и его источник.
+    Источник - статус код для StatusCodeNotOk, иначе функция бота,
+    в которой выброшено исключение. Текст ошибки в отпечаток не входит.
+    """
+    while error.__cause__ is not None:
+        error = error.__cause__
+    name = type(error).__name__
+    if isinstance(error, StatusCodeNotOk):
+        return f'{name} ({error.value})'
+    origin = error_origin(error)
+    return f'{name} ({origin})' if origin else name
+
+
+class ErrorDigest:
+    """
+    Сбои студента по отпечаткам (см. error_fingerprint).
+    О новом сбое сообщается сразу, повторы только считаются и раз
+    в period секунд отправляются сводкой. Хранится не больше size
+    отпечатков; отпечаток, не встречавшийся ttl секунд, забывается.
+    Время, если его не передали, берётся из clock.
+    """
+
+    def __init__(self, size=ERROR_TABLE_SIZE, ttl=ERROR_TTL,
+                 period=ERROR_DIGEST_PERIOD, clock=time.time):
+        self.size = size
+        self.ttl = ttl
+        self.period = period
+        self.clock = clock
+        # Отпечаток -> [время последнего сбоя, повторы после сообщения].
+        self.entries = OrderedDict()
+        self.digest_at = None
+
+    def expire(self, now):
+        """Забывает отпечатки, не встречавшиеся ttl секунд."""
+        while self.entries:
+            fingerprint, (seen, _) = next(iter(self.entries.items()))
+            if now - seen < self.ttl:
+                return
+            del self.entries[fingerprint]
+
+    def record(self, fingerprint, now=None):
+        """
+        Учитывает сбой с отпечатком fingerprint.
+        Возвращает True, если о нём нужно сообщить сразу.
+        """
+        if now is None:
+            now = self.clock()
+        self.expire(now)
+        entry = self.entries.get(fingerprint)
+        if entry is None:
+            if len(self.entries) >= self.size:
+                self.entries.popitem(last=False)
+            self.entries[fingerprint] = [now, 0]
+            if self.digest_at is None:
+                self.digest_at = now + self.period
+            return True
+        self.entries.move_to_end(fingerprint)
+        entry[0] = now
+        entry[1] += 1
+        return False
+
+    def digest(self, now=None):
+        """
+        Возвращает сводку повторов за период или None.
+        Сводка составляется не чаще раза в period секунд.
+        """
+        if now is None:
+            now = self.clock()
+        if self.digest_at is None or now < self.digest_at:
+            return None
+        lines = []
+        for fingerprint, entry in self.entries.items():
+            if entry[1]:
+                lines.append(f' - {fingerprint} ×{entry[1]}')
+                entry[1] = 0
+        self.expire(now)
+        self.digest_at = now + self.period if self.entries else None
+        if not lines:
+            return None
+        return '\n'.join(
+            [f'Повторы сбоев за последние {round(self.period / 60)} мин:']
+            + lines
+        )
@@ -0,0 +1,310 @@
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from aiotransport import AsyncTransport, async_check_updates
+from commands import BOT_COMMANDS, CommandHandler
+from exceptions import OutboxLocked
+from homework import TELEGRAM_TOKEN, Tenant, check_updates
+from jsonlog import CYCLE, configure_logging
+from metrics import METRICS_PORT, POLL_LAG, start_http_server
+from outbox import Outbox, outbox_path
+from scheduler import Scheduler
+from sender import OutboundQueue
+from sharding import SHARD_DB, Shard, ShardRegistry
+from shutdown import SHUTDOWN_TIMEOUT, STOP_SIGNALS
+from state import StateStore
+from tracing import PROFILE_SIGNAL, profiler, tracer
+
+TENANTS_FILE = os.getenv('TENANTS_FILE', 'tenants.json')
+MAX_CONCURRENCY = int(os.getenv('MAX_CONCURRENCY', 100))
+
+logger = logging.getLogger(__name__)
+
+
+def load_tenants(path):
+    """
+    Загружает список студентов из JSON файла.
+    Ожидается список объектов с ключами practicum_token и chat_id.
+    """
+    with open(path, encoding='utf-8') as file:
+        records = json.load(file)
+    if not isinstance(records, list):
+        raise TypeError(f'Файл {path} должен содержать список студентов. '
+                        f'Получен {type(records)} вместо <list>')
+    tenants = []
+    for record in records:
+        if 'practicum_token' not in record or 'chat_id' not in record:
+            raise KeyError(f'У студента в файле {path} нет ключа '
+                           f'<practicum_token> или <chat_id>')
+        tenants.append(Tenant(record['practicum_token'], record['chat_id']))
+    return tenants
+
+
+async def run_cycle(sender, outbox, transport, tenants, executor,
+                    semaphore):
+    """
+    Опрашивает API для всех студентов, не более N одновременно.
+    Если задан transport, запросы выполняются асинхронно, иначе - в потоках.
+    Сообщения записываются в outbox (если он задан) и ставятся в очередь
+    sender, отправка идёт отдельно от опроса.
+    """
+    loop = asyncio.get_running_loop()
+
+    async def poll(tenant):
+        def notify(message):
+            if outbox is not None:
+                outbox.add(tenant.chat_id, message, tenant.record_sent)
+            else:
+                sender.submit(tenant.chat_id, message, tenant.record_sent)
+
+        async with semaphore:
+            if transport is not None:
+                await async_check_updates(transport, tenant, notify)
+            else:
+                await loop.run_in_executor(
+                    executor, contextvars.copy_context().run,
+                    check_updates, tenant, notify
+                )
+
+    await asyncio.gather(*(poll(tenant) for tenant in tenants))
+
+
+async def serve(bot, tenants, store=None, scheduler=None, sender=None,
+                outbox=None, transport=None, concurrency=MAX_CONCURRENCY,
+                cycles=None, commands=None, shard=None, stop=None,
+                shutdown_timeout=SHUTDOWN_TIMEOUT):
+    """
+    Опрашивает студентов по расписанию scheduler.
+    Изменения состояния за цикл записываются в store одной транзакцией.
+    Если задан commands, параллельно с опросом бот отвечает на команды.
+    Если задан shard, опрашиваются только студенты этого процесса.
+    Когда выставлено событие stop, опрос прерывается, а отправка
+    сообщений продолжается не дольше shutdown_timeout секунд.
+    """
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(concurrency)
+    if scheduler is None:
+        scheduler = Scheduler()
+    if sender is None:
+        sender = OutboundQueue(bot)
+    if shard is None:
+        scheduler.add(tenants, loop.time())
+    else:
+        balancer = asyncio.create_task(rebalance_forever(shard, scheduler,
+                                                         store, outbox))
+    await sender.start()
+    if outbox is not None:
+        drainer = asyncio.create_task(outbox.run(sender))
+    if commands is not None:
+        listener = asyncio.create_task(commands.run(sender))
+    try:
+        await poll_forever(sender, outbox, transport, scheduler, store,
+                           semaphore, concurrency, cycles, shard, stop)
+    finally:
+        timeout = None
+        if stop is not None and stop.is_set():
+            timeout = shutdown_timeout
+        if shard is not None:
+            balancer.cancel()
+            await loop.run_in_executor(None, shard.leave)
+        if commands is not None:
+            listener.cancel()
+        if outbox is not None:
+            drainer.cancel()
+            await outbox.close(sender, timeout)
+        else:
+            await sender.stop(timeout)
+        if store is not None:
+            store.flush(tenants)
+
+
+async def wait_stop(stop, delay):
+    """
+    Ждёт delay секунд или события stop.
+    Возвращает True, если выставлено stop.
+    """
+    if stop is None:
+        await asyncio.sleep(delay)
+        return False
+    try:
+        await asyncio.wait_for(stop.wait(), delay)
+    except asyncio.TimeoutError:
+        return False
+    return True
+
+
+async def run_until_stop(stop, coroutine):
+    """
+    Выполняет coroutine, пока не выставлено событие stop.
+    Если stop выставлено раньше, отменяет coroutine и возвращает True.
+    """
+    if stop is None:
+        await coroutine
+        return False
+    task = asyncio.ensure_future(coroutine)
+    waiter = asyncio.ensure_future(stop.wait())
+    await asyncio.wait((task, waiter), return_when=asyncio.FIRST_COMPLETED)
+    waiter.cancel()
+    if task.done():
+        task.result()
+        return False
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    return True
+
+
+async def poll_forever(sender, outbox, transport, scheduler, store,
+                       semaphore, concurrency, cycles, shard=None, stop=None):
+    """
+    Опрашивает студентов, когда подходит их время по расписанию.
+    По событию stop прерывает ожидание и начатый цикл: уже поставленные
+    в очередь сообщения не теряются, а состояние записывает serve.
+    """
+    loop = asyncio.get_running_loop()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        cycle = 0
+        while cycles is None or cycle < cycles:
+            if scheduler.next_due() is None:
+                if shard is None:
+                    logger.warning('Нет студентов для опроса')
+                    return
+                if await wait_stop(stop, shard.interval):
+                    return
+                continue
+            if await wait_stop(stop, scheduler.wait_time(loop.time())):
+                return
+            started = loop.time()
+            POLL_LAG.set(max(0, started - scheduler.next_due()))
+            due = scheduler.pop_due(started)
+            CYCLE.set(cycle)
+            with profiler.cycle(), tracer.span('cycle', tenants=len(due)):
+                if await run_until_stop(stop, run_cycle(
+                    sender, outbox, transport, due, executor, semaphore
+                )):
+                    return
+                if store is not None:
+                    with tracer.span('flush'):
+                        await save_state(outbox, store, due, executor)
+            if tracer.enabled:
+                await loop.run_in_executor(executor, tracer.flush)
+            scheduler.reschedule(due, loop.time())
+            logger.info(f'Цикл опроса {len(due)} студентов '
+                        f'занял {loop.time() - started:.2f} с')
+            cycle += 1
+
+
+async def save_state(outbox, store, tenants, executor=None):
+    """
+    Записывает состояние студентов в store.
+    Сначала на диск записывается журнал outbox: иначе после сбоя
+    состояние считало бы сообщения отправленными, а в журнале их бы
+    не было.
+    """
+    loop = asyncio.get_running_loop()
+    if outbox is not None:
+        await loop.run_in_executor(executor, outbox.commit)
+    await loop.run_in_executor(executor, store.flush, tenants)
+
+
+async def rebalance_forever(shard, scheduler, store, outbox=None):
+    """
+    Раз в shard.interval секунд пересчитывает студентов этого процесса.
+    Отпущенные студенты сохраняются в store, а взятые восстанавливаются
+    из него, поэтому store должен быть общим для всех процессов.
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        acquired, released = await loop.run_in_executor(
+            None, shard.rebalance, time.time()
+        )
+        if released:
+            scheduler.discard(released)
+            if store is not None:
+                await save_state(outbox, store, released)
+        if acquired:
+            if store is not None:
+                await loop.run_in_executor(None, store.restore, acquired)
+            scheduler.add(acquired, loop.time())
+        if acquired or released:
+            logger.info(f'Процесс {shard.worker}: взято {len(acquired)}, '
+                        f'отпущено {len(released)}, всего '
+                        f'{len(shard.owned)} студентов')
+        await asyncio.sleep(shard.interval)
+
+
+def main():
+    """Запускает опрос API для всех студентов из TENANTS_FILE."""
+    configure_logging()
+    if not TELEGRAM_TOKEN:
+        message = ('Отсутствует токен Telegram. '
+                   'Выполнение программы остановлено.')
+        logger.critical(message)
+        sys.exit(message)
+    if METRICS_PORT:
+        start_http_server(METRICS_PORT)
+    store = StateStore()
+    tenants = load_tenants(TENANTS_FILE)
+    store.restore(tenants)
+    shard = None
+    if SHARD_DB:
+        shard = Shard(ShardRegistry(SHARD_DB), tenants)
+    try:
+        outbox = Outbox(outbox_path(shard and shard.worker))
+    except OutboxLocked as error:
+        logger.critical(error)
+        sys.exit(str(error))
+    # Имя процесса по умолчанию (хост:pid) меняется при перезапуске:
+    # сообщения из журнала прежнего запуска отправит этот процесс.
+    outbox.adopt_orphans()
+    asyncio.run(serve_async(tenants, store, outbox, shard))
+
+
+async def serve_async(tenants, store, outbox, shard=None):
+    """
+    Опрашивает студентов через асинхронные клиенты API и Telegram.
+    По SIGTERM или SIGINT завершается, дописав журнал и состояние,
+    по второму сигналу - сразу.
+    """
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    async with AsyncTransport() as transport:
+        bot = transport.bot(TELEGRAM_TOKEN)
+        commands = None
+        # getUpdates может читать только один процесс, а состояние
+        # студентов при шардировании распределено между процессами.
+        if BOT_COMMANDS and shard is None:
+            commands = CommandHandler(bot, tenants)
+        serving = asyncio.create_task(serve(
+            bot, tenants, store, outbox=outbox, transport=transport,
+            commands=commands, shard=shard, stop=stop
+        ))
+
+        def request_stop(signum):
+            if stop.is_set():
+                serving.cancel()
+                return
+            logger.info(f'Получен сигнал {signum.name}, бот завершается')
+            stop.set()
+
+        for signum in STOP_SIGNALS:
+            loop.add_signal_handler(signum, request_stop, signum)
+        loop.add_signal_handler(PROFILE_SIGNAL, profiler.request)
+        try:
+            await serving
+        except asyncio.CancelledError:
+            logger.warning('Бот остановлен, не дождавшись отправки')
+        finally:
+            for signum in STOP_SIGNALS + (PROFILE_SIGNAL,):
+                loop.remove_signal_handler(signum)
+            profiler.dump()
+            tracer.flush()
+
+
+if __name__ == '__main__':
+    main()
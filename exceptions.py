@@ -6,3 +6,38 @@ class StatusCodeNotOk(Exception):
 
     def __str__(self):
         return f'Должен быть код 200. Сервер вернул статус код: {self.value}'
+
+
+class CircuitOpen(Exception):
+    """Предохранитель API разомкнут, запрос не отправлялся."""
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+
+    def __str__(self):
+        return f'Запросы к {self.endpoint} временно приостановлены'
+
+
+class InvalidHomeworks(Exception):
+    """Часть работ в ответе API не прошла проверку."""
+
+    def __init__(self, errors, total):
+        self.errors = errors
+        self.total = total
+
+    def __str__(self):
+        details = '; '.join(f'#{index}: {error!r}'
+                            for index, error in self.errors[:3])
+        return (f'{len(self.errors)} из {self.total} работ в ответе API '
+                f'не прошли проверку ({details})')
+
+
+class OutboxLocked(Exception):
+    """Журнал исходящих сообщений уже открыт другим процессом."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def __str__(self):
+        return (f'Журнал {self.path} уже используется другим процессом. '
+                'Задайте каждому процессу свой OUTBOX_FILE или WORKER_ID')
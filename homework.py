@@ -1,14 +1,30 @@
+import hashlib
 import logging
 import os
+import re
 import sys
 import time
+from collections import deque
 from http import HTTPStatus
 
-import requests
-import telegram
 from dotenv import load_dotenv
 
-from exceptions import StatusCodeNotOk
+from breaker import get_breaker, is_available
+from decoder import decode
+from digest import ErrorDigest, error_fingerprint
+from exceptions import CircuitOpen, InvalidHomeworks, StatusCodeNotOk
+from jsonlog import TENANT, configure_logging
+from shutdown import GracefulExit, Shutdown
+from metrics import (API_LATENCY, API_RESPONSES, ERRORS, MESSAGES_DEDUPLICATED,
+                     MESSAGES_SENT, METRICS_PORT, RESPONSE_CACHE,
+                     SEND_LATENCY, VALIDATION_FAILURES, start_http_server)
+from records import HomeworkTable, StatusCodes, parse_timestamp
+from schema import Field, get_validator
+from state import STATE_DB, StateStore
+from tracing import profiler, tracer
+
+# telegram и requests (transport) импортируются при первом использовании:
+# запуск с --once без изменений статусов обходится без них.
 
 load_dotenv()
 
@@ -20,6 +36,7 @@ TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
 RETRY_PERIOD = 600
 ENDPOINT = 'https://practicum.yandex.ru/api/user_api/homework_statuses/'
 HEADERS = {'Authorization': f'OAuth {PRACTICUM_TOKEN}'}
+HISTORY_SIZE = int(os.getenv('HISTORY_SIZE', 10))
 
 
 HOMEWORK_VERDICTS = {
@@ -28,14 +45,24 @@ HOMEWORK_VERDICTS = {
     'rejected': 'Работа проверена: у ревьюера есть замечания.'
 }
 
-logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)
-formatter = logging.Formatter(
-    '%(asctime)s - %(levelname)s - %(message)s'
+STATUS_CODES = StatusCodes(HOMEWORK_VERDICTS)
+
+NO_HOMEWORK_NAME = 'В ответе отсутствует имя домашней работы. "homework_name"'
+NO_STATUS = 'В ответе отсутствует ключ статуса работы'
+UNKNOWN_STATUS = 'Неизвестный статус работы'
+
+# Поля работы в ответе API, которые использует бот.
+HOMEWORK_SCHEMA = (
+    Field('homework_name', missing=NO_HOMEWORK_NAME),
+    Field('status', choices=frozenset(HOMEWORK_VERDICTS), missing=NO_STATUS,
+          invalid=UNKNOWN_STATUS),
+    Field('id', types=(int, str), required=False,
+          invalid='Неверный тип id работы'),
 )
-handler = logging.StreamHandler(stream=sys.stdout)
-handler.setFormatter(formatter)
-logger.addHandler(handler)
+
+CURRENT_DATE = re.compile(rb'"current_date"\s*:\s*(\d+)')
+
+logger = logging.getLogger(__name__)
 
 
 def check_tokens():
@@ -45,30 +72,127 @@ def check_tokens():
 
 def send_message(bot, message):
     """Отправляет сообщение в Telegram чат."""
+    return send_chat_message(bot, TELEGRAM_CHAT_ID, message)
+
+
+def send_chat_message(bot, chat_id, message):
+    """
+    Отправляет сообщение в указанный Telegram чат.
+    Возвращает True, если сообщение доставлено.
+    """
+    import telegram
     try:
-        bot.send_message(
-            chat_id=TELEGRAM_CHAT_ID,
-            text=message
-        )
+        with SEND_LATENCY.time(), tracer.span('send_message'):
+            bot.send_message(
+                chat_id=chat_id,
+                text=message
+            )
     except telegram.error.TelegramError as error:
         logger.error(f'сбой при отправке сообщения: {message} - {error}')
-    else:
-        logger.debug(f'В Телеграм отправлено сообщение: {message}')
+        return False
+    MESSAGES_SENT.inc()
+    logger.debug(f'В Телеграм отправлено сообщение: {message}')
+    return True
 
 
 def get_api_answer(timestamp):
     """Запрашивает эндпоинт API-сервиса Яндекс.Домашка."""
+    return request_api(HEADERS, timestamp)
+
+
+def admit(endpoint):
+    """
+    Спрашивает у предохранителя API разрешения на запрос к endpoint.
+    Возвращает предохранитель и признак пробного запроса.
+    """
+    breaker = get_breaker(endpoint)
+    try:
+        return breaker, breaker.acquire()
+    except CircuitOpen as error:
+        raise ConnectionError('Ошибка при запросе к основному API') from error
+
+
+def request_api(headers, timestamp, tenant=None):
+    """
+    Запрашивает эндпоинт API с заголовками конкретного студента.
+    Если передан студент, ответ разбирается только при изменении,
+    иначе возвращается None (см. read_response).
+    Пока предохранитель API разомкнут, запрос не отправляется.
+    """
+    from transport import get_session
+    breaker, probe = admit(ENDPOINT)
     logger.debug('Делаем запрос к API')
     payload = {'from_date': timestamp}
+    code = 'error'
     try:
-        response = requests.get(ENDPOINT, headers=HEADERS,
-                                params=payload)
+        with API_LATENCY.time(), tracer.span('request'):
+            response = get_session().get(ENDPOINT, headers=headers,
+                                         params=payload)
+        code = int(response.status_code)
+        if tenant is not None and response.status_code in (
+            HTTPStatus.OK, HTTPStatus.NOT_MODIFIED
+        ):
+            return read_response(tenant, response.status_code,
+                                 response.headers, response.content)
         if response.status_code == HTTPStatus.OK:
-            return response.json()
+            with tracer.span('decode'):
+                return response.json()
         else:
             raise StatusCodeNotOk(response.status_code)
     except Exception as error:
         raise ConnectionError('Ошибка при запросе к основному API') from error
+    except BaseException:
+        # Запрос прерван (Shutdown, KeyboardInterrupt), ответа API нет.
+        code = None
+        raise
+    finally:
+        if code is None:
+            breaker.abandon(probe)
+        else:
+            API_RESPONSES.labels(code).inc()
+            breaker.release(probe, is_available(code))
+
+
+def fingerprint(body):
+    """
+    Возвращает отпечаток тела ответа API и current_date из него.
+    current_date меняется в каждом ответе, поэтому в отпечаток не входит.
+    """
+    digest = hashlib.sha256()
+    start = body.rfind(b'"current_date"')
+    match = CURRENT_DATE.match(body, start) if start != -1 else None
+    if match is None:
+        digest.update(body)
+        return digest.digest(), None
+    view = memoryview(body)
+    digest.update(view[:match.start()])
+    digest.update(view[match.end():])
+    return digest.digest(), int(match[1])
+
+
+def read_response(tenant, status_code, headers, body):
+    """
+    Разбирает тело ответа API, если оно изменилось с прошлого опроса.
+    Для неизменившегося ответа (304 или тот же отпечаток) возвращает None
+    и только сдвигает курсор на current_date.
+    """
+    if status_code == HTTPStatus.NOT_MODIFIED:
+        RESPONSE_CACHE.labels('not_modified').inc()
+        tenant.failures = 0
+        return None
+    tenant.etag = headers.get('ETag')
+    tenant.last_modified = headers.get('Last-Modified')
+    digest, current_date = fingerprint(body)
+    if digest == tenant.fingerprint:
+        RESPONSE_CACHE.labels('hit').inc()
+        if current_date is not None:
+            tenant.timestamp = current_date
+        tenant.failures = 0
+        return None
+    RESPONSE_CACHE.labels('miss').inc()
+    tenant.fingerprint = digest
+    with tracer.span('decode', size=len(body)):
+        return decode(body)
 
 
 def check_response(response):
@@ -91,50 +215,324 @@ def check_response(response):
 def parse_status(homework):
     """Извлекает статус домашней работы из ответа API."""
     if 'homework_name' not in homework:
-        raise KeyError('В ответе отсутствует имя домашней работы. '
-                       '"homework_name"')
-    homework_name = homework['homework_name']
+        raise KeyError(NO_HOMEWORK_NAME)
     if 'status' not in homework:
-        raise KeyError('В ответе отсутствует ключ статуса работы')
-    homework_status = homework['status']
-    if homework_status not in HOMEWORK_VERDICTS:
-        raise KeyError('Неизвестный статус работы')
-    verdict = HOMEWORK_VERDICTS[homework_status]
+        raise KeyError(NO_STATUS)
+    if homework['status'] not in HOMEWORK_VERDICTS:
+        raise KeyError(UNKNOWN_STATUS)
+    return status_message(homework)
+
+
+def status_message(homework):
+    """Возвращает сообщение о статусе уже проверенной работы."""
+    homework_name = homework['homework_name']
+    verdict = HOMEWORK_VERDICTS[homework['status']]
     return f'Изменился статус проверки работы "{homework_name}". {verdict}'
 
 
-def main():
-    """Основная логика работы бота."""
+validate_homework_entries = get_validator(HOMEWORK_SCHEMA)
+
+
+def validate_homeworks(homeworks, errors):
+    """
+    Проверяет все работы ответа API за один проход.
+    Отдаёт работы, прошедшие проверку, а для остальных добавляет
+    в errors пары (номер работы, исключение).
+    """
+    return validate_homework_entries(homeworks, errors)
+
+
+def get_homework_id(homework):
+    """Возвращает идентификатор домашней работы для индекса статусов."""
+    return str(homework.get('id', homework.get('homework_name')))
+
+
+class Tenant:
+    """Студент: токен Практикума, чат Telegram и состояние опроса."""
+
+    __slots__ = ('key', 'chat_id', 'headers', 'timestamp', 'saved_timestamp',
+                 'errors', 'statuses', 'changed_statuses', 'sent_messages',
+                 'history', 'last_status', 'changed_at', 'failures',
+                 'fingerprint', 'etag', 'last_modified')
+
+    def __init__(self, practicum_token, chat_id, timestamp=None):
+        self.key = hashlib.sha256(practicum_token.encode()).hexdigest()
+        self.chat_id = chat_id
+        self.headers = {'Authorization': f'OAuth {practicum_token}'}
+        if timestamp is None:
+            timestamp = int(time.time())
+        self.timestamp = timestamp
+        self.saved_timestamp = None
+        self.errors = ErrorDigest()
+        self.statuses = HomeworkTable(STATUS_CODES)
+        self.changed_statuses = {}
+        self.sent_messages = []
+        self.history = deque(maxlen=HISTORY_SIZE)
+        self.last_status = None
+        self.changed_at = None
+        self.failures = 0
+        self.fingerprint = None
+        self.etag = None
+        self.last_modified = None
+
+    def restore(self, cursor, statuses, messages=()):
+        """
+        Восстанавливает сохранённое состояние студента.
+        Это курсор, статусы и имена работ ({id работы: (статус, имя)})
+        и последние отправленные сообщения.
+        """
+        if cursor is not None:
+            self.timestamp = self.saved_timestamp = cursor
+        for homework_id, (status, name) in statuses.items():
+            self.statuses.set(homework_id, status, name)
+        self.history.clear()
+        self.history.extend(messages)
+        if self.statuses.has_status('reviewing'):
+            self.last_status = 'reviewing'
+
+    def conditional_headers(self):
+        """Возвращает заголовки запроса с ETag и Last-Modified ответа."""
+        if self.etag is None and self.last_modified is None:
+            return self.headers
+        headers = dict(self.headers)
+        if self.etag is not None:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified is not None:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+    def forget_response(self):
+        """Забывает прошлый ответ, чтобы следующий был разобран целиком."""
+        self.fingerprint = None
+        self.etag = None
+        self.last_modified = None
+
+    def is_changed(self, homework):
+        """Проверяет, отличается ли статус работы от последнего известного."""
+        return self.statuses.get(get_homework_id(homework)) != (
+            homework['status']
+        )
+
+    def update_status(self, homework):
+        """Запоминает последний известный статус домашней работы."""
+        homework_id = get_homework_id(homework)
+        self.statuses.set(homework_id, homework['status'],
+                          homework.get('homework_name'),
+                          parse_timestamp(homework.get('date_updated')))
+        self.changed_statuses[homework_id] = (homework['status'],
+                                              homework.get('homework_name'))
+        self.last_status = homework['status']
+        self.changed_at = int(time.time())
+
+    def record_sent(self, message):
+        """Добавляет сообщение в журнал отправленных."""
+        record = (message, int(time.time()))
+        self.sent_messages.append(record)
+        self.history.append(record)
+
+    def take_changes(self):
+        """
+        Возвращает изменения состояния, ещё не записанные в базу.
+        Это новый курсор (или None), статусы и имена работ
+        ({id работы: (статус, имя)}) и отправленные сообщения.
+        """
+        cursor = None
+        if self.timestamp != self.saved_timestamp:
+            cursor = self.saved_timestamp = self.timestamp
+        statuses, self.changed_statuses = self.changed_statuses, {}
+        messages, self.sent_messages = self.sent_messages, []
+        return cursor, statuses, messages
+
+
+def check_updates(tenant, notify):
+    """
+    Выполняет один цикл опроса API для одного студента.
+    О каждой работе, статус которой изменился, отправляется сообщение.
+    Курсор опроса сдвигается на current_date из ответа API.
+    Неизменившийся ответ не разбирается и не проверяется.
+    Раз в период студенту отправляется сводка повторившихся сбоев.
+    """
+    context = TENANT.set(tenant.chat_id)
+    logger.info('Запрашиваем статус домашки')
+    try:
+        with tracer.span('check_updates'):
+            response = request_api(tenant.conditional_headers(),
+                                   tenant.timestamp, tenant)
+            if response is not None:
+                process_response(tenant, response, notify)
+    except Exception as error:
+        process_error(tenant, error, notify)
+    finally:
+        report_errors(tenant, notify)
+        TENANT.reset(context)
+
+
+def process_response(tenant, response, notify):
+    """
+    Сообщает об изменившихся статусах работ и сдвигает курсор.
+    notify возвращает True, если сообщение доставлено, None - если оно
+    поставлено в очередь отправки, и False, если доставить не удалось.
+    Тогда статус работы не запоминается, а курсор не сдвигается:
+    сообщение будет отправлено снова при следующем опросе.
+    """
+    try:
+        with tracer.span('check_response'):
+            homeworks = check_response(response) or []
+    except (TypeError, KeyError):
+        VALIDATION_FAILURES.labels('check_response').inc()
+        raise
+    errors = []
+    undelivered = 0
+    # API возвращает работы от новых к старым.
+    with tracer.span('homeworks', total=len(homeworks)):
+        for homework in validate_homeworks(reversed(homeworks), errors):
+            if not tenant.is_changed(homework):
+                MESSAGES_DEDUPLICATED.inc()
+                continue
+            message = status_message(homework)
+            delivered = notify(message)
+            if delivered is False:
+                undelivered += 1
+                continue
+            tenant.update_status(homework)
+            if delivered:
+                tenant.record_sent(message)
+    current_date = response.get('current_date')
+    if undelivered:
+        # Тот же ответ придёт снова: его нужно разобрать, а не пропустить.
+        tenant.forget_response()
+        logger.warning(f'Не доставлено сообщений: {undelivered}, '
+                       f'они будут отправлены при следующем опросе')
+    elif isinstance(current_date, int):
+        tenant.timestamp = current_date
+    if errors:
+        # Сломанные работы не мешают остальным, но о них сообщается
+        # как о сбое опроса.
+        VALIDATION_FAILURES.labels('parse_status').inc(len(errors))
+        raise InvalidHomeworks(
+            [(len(homeworks) - 1 - index, error) for index, error in errors],
+            len(homeworks)
+        )
+    tenant.failures = 0
+
+
+def process_error(tenant, error, notify):
+    """
+    Логирует сбой опроса и сообщает о нём студенту.
+    Сбои сравниваются по отпечатку (тип и источник, а не текст):
+    о повторе студент узнает из сводки (см. report_errors).
+    """
+    tenant.failures += 1
+    tenant.forget_response()
+    logger.error(f'Сбой в работе программы: {error}.')
+    fingerprint = error_fingerprint(error)
+    ERRORS.labels(fingerprint).inc()
+    if not tenant.errors.record(fingerprint):
+        MESSAGES_DEDUPLICATED.inc()
+        return
+    message = (f'Сбой в работе программы: {error}. Выполнение '
+               f'программы продолжено, но возможно нужно вмешаться.')
+    if notify(message):
+        tenant.record_sent(message)
+
+
+def report_errors(tenant, notify):
+    """Отправляет студенту сводку повторов сбоев, если подошло её время."""
+    message = tenant.errors.digest()
+    if message is not None and notify(message):
+        tenant.record_sent(message)
+
+
+def poll_cycle(tenant, notify, store):
+    """
+    Выполняет цикл main(): опрос API, сообщения и запись состояния.
+    Этот же цикл выполняет воспроизведение записи (см. traffic.py).
+    """
+    with tracer.span('cycle'):
+        check_updates(tenant, notify)
+        with tracer.span('flush'):
+            store.flush([tenant])
+    tracer.flush()
+
+
+def require_tokens():
+    """Останавливает программу, если не заданы необходимые токены."""
     if not check_tokens():
         message = ('Отсутствует один или несколько необходимых токенов. '
                    'Выполнение программы остановлено.')
         logger.critical(message)
         sys.exit(message)
 
+
+def run_once():
+    """
+    Выполняет один цикл опроса для запуска по расписанию (cron).
+    Бот Telegram создаётся, только если есть что отправить.
+    Возвращает True, если опрос прошёл без сбоев.
+    """
+    require_tokens()
+    store = StateStore(STATE_DB)
+    tenant = Tenant(PRACTICUM_TOKEN, TELEGRAM_CHAT_ID)
+    store.restore([tenant])
+    bots = []
+
+    def notify(message):
+        if not bots:
+            import telegram
+            from traffic import record_bot
+            bots.append(record_bot(telegram.Bot(token=TELEGRAM_TOKEN)))
+        return send_message(bots[0], message)
+
+    try:
+        check_updates(tenant, notify)
+        store.flush([tenant])
+    finally:
+        store.close()
+    return not tenant.failures
+
+
+def main():
+    """Основная логика работы бота."""
+    configure_logging()
+    require_tokens()
+
+    import telegram
+
+    from traffic import record_bot
+    if METRICS_PORT:
+        start_http_server(METRICS_PORT)
     bot = telegram.Bot(token=TELEGRAM_TOKEN)
-    timestamp = int(time.time())
-    old_messages = ''
+    bot = record_bot(bot)
+    store = StateStore(STATE_DB)
+    tenant = Tenant(PRACTICUM_TOKEN, TELEGRAM_CHAT_ID)
+    store.restore([tenant])
 
-    while True:
-        logger.info('Запрашиваем статус домашки')
+    # По SIGUSR1 следующие циклы профилируются без перезапуска бота.
+    profiler.install()
+    # По SIGTERM пауза между циклами прерывается сразу, а начатые
+    # опрос, отправка и запись состояния сначала завершаются.
+    with GracefulExit() as stop:
         try:
-            response = get_api_answer(timestamp)
-            homeworks = check_response(response)
-            if homeworks:
-                message = parse_status(homeworks[0])
-                if message != old_messages:
-                    send_message(bot, message)
-                    timestamp = int(time.time())
-        except Exception as error:
-            logger.error(f'Сбой в работе программы: {error}.')
-            message = (f'Сбой в работе программы: {error}. Выполнение '
-                       f'программы продолжено, но возможно нужно вмешаться.')
-            if message != old_messages:
-                old_messages = message
-                send_message(bot, message)
+            while True:
+                with stop.deferred(), profiler.cycle():
+                    poll_cycle(tenant,
+                               lambda message: send_message(bot, message),
+                               store)
+                time.sleep(RETRY_PERIOD)
+        except Shutdown as error:
+            logger.info(f'Бот остановлен: {error}')
         finally:
-            time.sleep(RETRY_PERIOD)
+            store.close()
+            profiler.dump()
+            tracer.flush()
 
 
 if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Бот-ассистент')
+    parser.add_argument('--once', action='store_true',
+                        help='опросить API один раз и завершиться')
+    if parser.parse_args().once:
+        configure_logging()
+        sys.exit(0 if run_once() else 1)
     main()
@@ -0,0 +1,170 @@
+import atexit
+import contextvars
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+
+from metrics import LOG_RECORDS_DROPPED
+
+LOG_ASYNC = bool(int(os.getenv('LOG_ASYNC', 0)))
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', 10000))
+LOG_DEBUG_FILL = float(os.getenv('LOG_DEBUG_FILL', 0.5))
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'DEBUG').upper()
+# Библиотеки, чьи записи DEBUG и INFO только засоряют вывод бота.
+QUIET_LOGGERS = ('aiohttp', 'asyncio', 'charset_normalizer', 'telegram',
+                 'urllib3')
+
+TENANT = contextvars.ContextVar('tenant', default=None)
+CYCLE = contextvars.ContextVar('cycle', default=None)
+
+_formatter = logging.Formatter()
+
+
+class ContextFilter(logging.Filter):
+    """Добавляет к записи лога студента и номер цикла опроса."""
+
+    def filter(self, record):
+        """Запоминает студента и цикл, в которых сделана запись."""
+        record.tenant = TENANT.get()
+        record.cycle = CYCLE.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Форматирует запись лога как одну строку JSON."""
+
+    def format(self, record):
+        """Возвращает запись в формате JSON."""
+        moment = time.strftime('%Y-%m-%dT%H:%M:%S',
+                               time.gmtime(record.created))
+        entry = {
+            'time': f'{moment}.{int(record.msecs):03d}Z',
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'tenant': getattr(record, 'tenant', None),
+            'cycle': getattr(record, 'cycle', None),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class QueueHandler(logging.Handler):
+    """
+    Кладёт записи лога в ограниченную очередь, не дожидаясь их вывода.
+    Записи DEBUG отбрасываются, как только очередь заполнена на
+    debug_fill, остальные - только когда она заполнена целиком.
+    """
+
+    def __init__(self, records, debug_fill=LOG_DEBUG_FILL):
+        super().__init__()
+        self.records = records
+        self.debug_limit = int(records.maxsize * debug_fill)
+
+    def prepare(self, record):
+        """
+        Подставляет аргументы в сообщение в потоке, сделавшем запись.
+        Аргументы и исключение могут измениться, пока запись в очереди.
+        """
+        record.message = record.getMessage()
+        if record.exc_info:
+            record.exc_text = _formatter.formatException(record.exc_info)
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+        return record
+
+    def emit(self, record):
+        """Ставит запись в очередь или отбрасывает её при переполнении."""
+        if (record.levelno <= logging.DEBUG
+                and self.records.qsize() >= self.debug_limit):
+            LOG_RECORDS_DROPPED.labels(record.levelname).inc()
+            return
+        try:
+            self.records.put_nowait(self.prepare(record))
+        except queue.Full:
+            LOG_RECORDS_DROPPED.labels(record.levelname).inc()
+        except Exception:
+            self.handleError(record)
+
+
+class QueueListener:
+    """Выводит записи лога из очереди в фоновом потоке."""
+
+    def __init__(self, records, handler):
+        self.records = records
+        self.handler = handler
+        self.thread = None
+
+    def start(self):
+        """Запускает фоновый поток."""
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        """Выводит записи, пока не встретит None."""
+        while True:
+            record = self.records.get()
+            if record is None:
+                return
+            self.handler.handle(record)
+
+    def stop(self):
+        """Выводит оставшиеся записи и останавливает поток."""
+        if self.thread is not None:
+            self.records.put(None)
+            self.thread.join()
+            self.thread = None
+
+
+def queue_handler(stream, size=LOG_QUEUE_SIZE, debug_fill=LOG_DEBUG_FILL):
+    """
+    Возвращает обработчик, пишущий записи в stream в фоновом потоке.
+    Записи выводятся в формате JSON, при выходе из программы поток
+    дописывает очередь.
+    """
+    output = logging.StreamHandler(stream)
+    output.setFormatter(JsonFormatter())
+    records = queue.Queue(size)
+    listener = QueueListener(records, output)
+    listener.start()
+    atexit.register(listener.stop)
+    handler = QueueHandler(records, debug_fill)
+    handler.addFilter(ContextFilter())
+    handler.listener = listener
+    return handler
+
+
+def configure_logging(stream=sys.stdout):
+    """
+    Настраивает вывод лога для запуска бота и возвращает обработчик.
+    Обработчик добавляется корневому логгеру, поэтому в него попадают
+    записи всех модулей (logging.getLogger(__name__)). Повторный вызов
+    возвращает уже добавленный обработчик.
+    """
+    root = logging.getLogger()
+    for handler in root.handlers:
+        if getattr(handler, 'bot_output', False):
+            return handler
+    if LOG_ASYNC:
+        # Медленный вывод не задерживает опрос: записи выводятся в JSON
+        # из фонового потока.
+        handler = queue_handler(stream)
+    else:
+        handler = logging.StreamHandler(stream)
+        handler.setFormatter(logging.Formatter(
+            '%(asctime)s - %(levelname)s - %(message)s'
+        ))
+    handler.bot_output = True
+    root.setLevel(LOG_LEVEL)
+    for name in QUIET_LOGGERS:
+        logging.getLogger(name).setLevel(logging.WARNING)
+    root.addHandler(handler)
+    return handler
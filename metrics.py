@@ -0,0 +1,298 @@
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+METRICS_PORT = os.getenv('METRICS_PORT')
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+                   30)
+
+
+class Registry:
+    """Набор метрик, отдаваемых по HTTP в текстовом формате Prometheus."""
+
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        """Добавляет метрику в набор."""
+        self.metrics.append(metric)
+
+    def render(self):
+        """Возвращает все метрики в текстовом формате Prometheus."""
+        lines = []
+        for metric in self.metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+def format_labels(names, values, extra=''):
+    """Возвращает метки метрики в виде {name="value",...}."""
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Metric:
+    """Метрика с необязательными метками."""
+
+    kind = 'untyped'
+
+    def __init__(self, name, documentation, labelnames=(),
+                 registry=REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+        self.children = {}
+        if not self.labelnames:
+            self.children[()] = self.child()
+        registry.register(self)
+
+    def child(self):
+        """Создаёт значение метрики для одного набора меток."""
+        raise NotImplementedError
+
+    def labels(self, *values):
+        """Возвращает значение метрики для набора меток."""
+        values = tuple(str(value) for value in values)
+        child = self.children.get(values)
+        if child is None:
+            with self.lock:
+                child = self.children.setdefault(values, self.child())
+        return child
+
+    def samples(self):
+        """Возвращает строки со значениями метрики."""
+        for values, child in list(self.children.items()):
+            yield from child.samples(self.name, self.labelnames, values)
+
+
+class Value:
+    """Число, которое можно менять из разных потоков."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.value = 0
+
+    def inc(self, amount=1):
+        """Увеличивает значение."""
+        with self.lock:
+            self.value += amount
+
+    def set(self, value):
+        """Устанавливает значение."""
+        self.value = value
+
+    def samples(self, name, labelnames, values):
+        """Возвращает строку со значением."""
+        yield f'{name}{format_labels(labelnames, values)} {self.value}'
+
+
+class Counter(Metric):
+    """Счётчик, который только растёт."""
+
+    kind = 'counter'
+
+    def child(self):
+        """Создаёт счётчик для одного набора меток."""
+        return Value()
+
+    def inc(self, amount=1):
+        """Увеличивает счётчик без меток."""
+        self.children[()].inc(amount)
+
+
+class Gauge(Metric):
+    """Значение, которое может как расти, так и уменьшаться."""
+
+    kind = 'gauge'
+
+    def child(self):
+        """Создаёт значение для одного набора меток."""
+        return Value()
+
+    def set(self, value):
+        """Устанавливает значение без меток."""
+        self.children[()].set(value)
+
+
+class Buckets:
+    """Распределение наблюдений по корзинам гистограммы."""
+
+    def __init__(self, bounds):
+        self.lock = threading.Lock()
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0
+
+    def observe(self, value):
+        """Добавляет наблюдение."""
+        index = bisect.bisect_left(self.bounds, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self):
+        """Измеряет длительность блока кода в секундах."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    def samples(self, name, labelnames, values):
+        """Возвращает строки корзин, суммы и количества наблюдений."""
+        total = 0
+        for bound, count in zip(self.bounds + ('+Inf',), self.counts):
+            total += count
+            labels = format_labels(labelnames, values, f'le="{bound}"')
+            yield f'{name}_bucket{labels} {total}'
+        labels = format_labels(labelnames, values)
+        yield f'{name}_sum{labels} {self.sum}'
+        yield f'{name}_count{labels} {total}'
+
+
+class Histogram(Metric):
+    """Гистограмма, например времени выполнения запросов."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(),
+                 buckets=DEFAULT_BUCKETS, registry=REGISTRY):
+        self.buckets = tuple(buckets)
+        super().__init__(name, documentation, labelnames, registry)
+
+    def child(self):
+        """Создаёт гистограмму для одного набора меток."""
+        return Buckets(self.buckets)
+
+    def observe(self, value):
+        """Добавляет наблюдение без меток."""
+        self.children[()].observe(value)
+
+    def time(self):
+        """Измеряет длительность блока кода в секундах."""
+        return self.children[()].time()
+
+
+API_LATENCY = Histogram(
+    'homework_api_request_seconds',
+    'Время запроса к API Практикум.Домашка'
+)
+API_RESPONSES = Counter(
+    'homework_api_responses_total',
+    'Ответы API Практикум.Домашка по статус коду',
+    ['code']
+)
+API_CONNECTIONS = Counter(
+    'homework_api_connections_total',
+    'Запросы к API по соединению: новое (new) или из пула (reused)',
+    ['kind']
+)
+API_SHORT_CIRCUITS = Counter(
+    'homework_api_short_circuits_total',
+    'Запросы к API, отклонённые разомкнутым предохранителем',
+    ['endpoint']
+)
+BREAKER_STATE = Gauge(
+    'homework_api_breaker_state',
+    'Состояние предохранителя API: 0 - замкнут, 1 - пробный, 2 - разомкнут',
+    ['endpoint']
+)
+BREAKER_TRANSITIONS = Counter(
+    'homework_api_breaker_transitions_total',
+    'Переходы предохранителя API по новому состоянию',
+    ['endpoint', 'state']
+)
+VALIDATION_FAILURES = Counter(
+    'homework_validation_failures_total',
+    'Ответы API, не прошедшие проверку',
+    ['function']
+)
+ERRORS = Counter(
+    'homework_errors_total',
+    'Сбои опроса по отпечатку: тип исключения и источник',
+    ['fingerprint']
+)
+RESPONSE_CACHE = Counter(
+    'homework_response_cache_total',
+    'Ответы API: не изменились (hit, not_modified) или разобраны (miss)',
+    ['result']
+)
+SEND_LATENCY = Histogram(
+    'homework_telegram_send_seconds',
+    'Время отправки сообщения в Telegram'
+)
+MESSAGES_SENT = Counter(
+    'homework_messages_sent_total',
+    'Сообщения, доставленные в Telegram'
+)
+MESSAGES_DEDUPLICATED = Counter(
+    'homework_messages_deduplicated_total',
+    'Сообщения, не отправленные повторно'
+)
+COMMANDS = Counter(
+    'homework_commands_total',
+    'Команды, полученные ботом',
+    ['command']
+)
+COMMAND_LATENCY = Histogram(
+    'homework_command_seconds',
+    'Время подготовки ответа на команду бота',
+    buckets=(0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05)
+)
+LOG_RECORDS_DROPPED = Counter(
+    'homework_log_records_dropped_total',
+    'Записи лога, отброшенные при переполнении очереди',
+    ['level']
+)
+POLL_LAG = Gauge(
+    'homework_poll_lag_seconds',
+    'Насколько позже расписания начался последний цикл опроса'
+)
+
+
+def make_handler(registry=REGISTRY):
+    """
+    Создаёт обработчик HTTP запросов, отдающий метрики по адресу /metrics.
+    http.server импортируется здесь, а не при импорте модуля.
+    """
+    from http.server import BaseHTTPRequestHandler
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        """Отдаёт метрики по адресу /metrics."""
+
+        def do_GET(self):
+            """Отвечает на запрос метрик."""
+            if self.path != '/metrics':
+                self.send_error(404)
+                return
+            body = registry.render().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            """Не логирует запросы метрик."""
+
+    return MetricsHandler
+
+
+def start_http_server(port, host='0.0.0.0'):
+    """Запускает HTTP сервер метрик в отдельном потоке."""
+    from http.server import ThreadingHTTPServer
+    server = ThreadingHTTPServer((host, int(port)), make_handler())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
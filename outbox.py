@@ -0,0 +1,298 @@
+import asyncio
+import fcntl
+import glob
+import heapq
+import json
+import logging
+import os
+import threading
+import time
+
+from exceptions import OutboxLocked
+
+OUTBOX_FILE = os.getenv('OUTBOX_FILE', 'outbox.jsonl')
+OUTBOX_SYNC_INTERVAL = float(os.getenv('OUTBOX_SYNC_INTERVAL', 0.05))
+OUTBOX_RETRY_DELAY = float(os.getenv('OUTBOX_RETRY_DELAY', 5))
+OUTBOX_MAX_RETRY_DELAY = float(os.getenv('OUTBOX_MAX_RETRY_DELAY', 600))
+OUTBOX_COMPACT_AFTER = int(os.getenv('OUTBOX_COMPACT_AFTER', 10000))
+
+logger = logging.getLogger(__name__)
+
+
+def outbox_path(worker=None, path=OUTBOX_FILE):
+    """
+    Возвращает путь журнала процесса.
+    При шардировании у каждого процесса свой журнал: имя процесса
+    worker добавляется к имени файла.
+    """
+    if worker is None:
+        return path
+    root, extension = os.path.splitext(path)
+    name = ''.join(char if char.isalnum() or char in '-_.' else '_'
+                   for char in worker)
+    return f'{root}-{name}{extension}'
+
+
+def lock_journal(path):
+    """Захватывает журнал path: блокирует файл рядом с ним."""
+    # Блокируется отдельный файл: сам журнал compact заменяет новым.
+    lock_file = open(f'{path}.lock', 'a')
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock_file.close()
+        raise OutboxLocked(path)
+    return lock_file
+
+
+def read_journal(path):
+    """
+    Читает журнал path.
+    Возвращает недоставленные сообщения {id: Entry} и следующий id.
+    """
+    pending = {}
+    next_id = 1
+    if not os.path.exists(path):
+        return pending, next_id
+    with open(path, encoding='utf-8') as file:
+        for line in file:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                logger.warning(f'Пропущена повреждённая запись '
+                               f'журнала {path}')
+                continue
+            next_id = max(next_id, record['id'] + 1)
+            if record['op'] == 'add':
+                pending[record['id']] = Entry(
+                    record['id'], record['chat_id'], record['message']
+                )
+            else:
+                pending.pop(record['id'], None)
+    return pending, next_id
+
+
+class Entry:
+    """Сообщение в исходящем журнале."""
+
+    __slots__ = ('id', 'chat_id', 'message', 'attempts', 'on_delivered')
+
+    def __init__(self, id, chat_id, message, on_delivered=None):
+        self.id = id
+        self.chat_id = chat_id
+        self.message = message
+        self.attempts = 0
+        self.on_delivered = on_delivered
+
+
+class Outbox:
+    """
+    Журнал исходящих сообщений в файле, в который только дописывают.
+    Сообщение записывается до попытки отправки и отмечается после
+    доставки. Запись на диск (fsync) выполняется группами раз в
+    sync_interval секунд, а не для каждого сообщения.
+    Недоставленные сообщения повторяются с растущей задержкой и
+    отправляются заново после перезапуска.
+    Журнал может открыть только один процесс: второй получит OutboxLocked,
+    иначе он отправил бы чужие сообщения повторно, а сжатие подменило бы
+    файл, в который пишет первый.
+    """
+
+    def __init__(self, path=OUTBOX_FILE, sync_interval=OUTBOX_SYNC_INTERVAL,
+                 retry_delay=OUTBOX_RETRY_DELAY,
+                 max_retry_delay=OUTBOX_MAX_RETRY_DELAY,
+                 compact_after=OUTBOX_COMPACT_AFTER):
+        self.path = path
+        self.sync_interval = sync_interval
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.compact_after = compact_after
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.uncommitted = []
+        self.ready = []
+        self.retries = []
+        self.closed_records = 0
+        self.next_id = 1
+        self.lock_file = self.acquire()
+        self.replay()
+        self.file = None
+        self.compact()
+        self.ready = list(self.pending.values())
+
+    def acquire(self):
+        """Захватывает журнал: блокирует файл рядом с ним."""
+        return lock_journal(self.path)
+
+    def release(self):
+        """Освобождает журнал для другого процесса."""
+        self.lock_file.close()
+
+    def replay(self):
+        """Читает журнал и восстанавливает недоставленные сообщения."""
+        self.pending, self.next_id = read_journal(self.path)
+        if self.pending:
+            logger.info(f'Из журнала {self.path} восстановлено '
+                        f'{len(self.pending)} недоставленных сообщений')
+
+    def adopt_orphans(self, path=OUTBOX_FILE):
+        """
+        Забирает сообщения журналов процессов, которые уже не работают.
+        Журнал процесса называется по его имени (outbox_path), а имя
+        по умолчанию меняется при перезапуске, поэтому после перезапуска
+        прежний журнал никто не откроет. Журналы path и outbox_path(...)
+        для path, которые не заблокированы ни одним процессом, переносятся
+        в этот журнал и удаляются. Возвращает число перенесённых сообщений.
+        """
+        root, extension = os.path.splitext(path)
+        candidates = [path, *glob.glob(f'{glob.escape(root)}-*{extension}')]
+        adopted = 0
+        for orphan in candidates:
+            if os.path.abspath(orphan) == os.path.abspath(self.path):
+                continue
+            try:
+                lock_file = lock_journal(orphan)
+            except OutboxLocked:
+                continue
+            try:
+                entries, _ = read_journal(orphan)
+                for entry in entries.values():
+                    self.add(entry.chat_id, entry.message)
+                # Сообщения удаляются из прежнего журнала только после
+                # записи на диск в этот.
+                self.commit()
+                if os.path.exists(orphan):
+                    os.remove(orphan)
+                os.remove(f'{orphan}.lock')
+            finally:
+                lock_file.close()
+            if entries:
+                logger.info(f'Из журнала {orphan} перенесено '
+                            f'{len(entries)} недоставленных сообщений')
+            adopted += len(entries)
+        return adopted
+
+    def compact(self):
+        """Переписывает журнал, оставляя только недоставленные сообщения."""
+        temporary = f'{self.path}.tmp'
+        with self.lock:
+            with open(temporary, 'w', encoding='utf-8') as file:
+                for entry in self.pending.values():
+                    file.write(self.dumps('add', entry))
+                file.flush()
+                os.fsync(file.fileno())
+            if self.file is not None:
+                self.file.close()
+            os.replace(temporary, self.path)
+            self.file = open(self.path, 'a', encoding='utf-8')
+            self.closed_records = 0
+
+    @staticmethod
+    def dumps(op, entry):
+        """Возвращает строку журнала для операции над сообщением."""
+        record = {'op': op, 'id': entry.id}
+        if op == 'add':
+            record['chat_id'] = entry.chat_id
+            record['message'] = entry.message
+        return json.dumps(record, ensure_ascii=False) + '\n'
+
+    def add(self, chat_id, message, on_delivered=None):
+        """
+        Записывает сообщение в журнал, можно вызывать из любого потока.
+        Сообщение уйдёт в Telegram после ближайшей записи журнала на диск.
+        """
+        with self.lock:
+            entry = Entry(self.next_id, chat_id, message, on_delivered)
+            self.next_id += 1
+            self.file.write(self.dumps('add', entry))
+            self.pending[entry.id] = entry
+            self.uncommitted.append(entry)
+
+    def commit(self):
+        """
+        Записывает журнал на диск.
+        Записанные сообщения становятся готовыми к отправке.
+        """
+        with self.lock:
+            self.file.flush()
+            batch, self.uncommitted = self.uncommitted, []
+            fileno = self.file.fileno()
+        os.fsync(fileno)
+        with self.lock:
+            self.ready.extend(batch)
+
+    def close_entry(self, entry, op):
+        """Отмечает, что сообщение больше не нужно отправлять."""
+        with self.lock:
+            self.file.write(self.dumps(op, entry))
+            self.pending.pop(entry.id, None)
+            self.closed_records += 1
+
+    def delivered(self, entry):
+        """Отмечает сообщение доставленным."""
+        self.close_entry(entry, 'done')
+        if entry.on_delivered:
+            entry.on_delivered(entry.message)
+
+    def failed(self, entry, rejected):
+        """Откладывает повтор сообщения или отбрасывает отклонённое."""
+        if rejected:
+            self.close_entry(entry, 'rejected')
+            return
+        entry.attempts += 1
+        delay = min(self.max_retry_delay,
+                    self.retry_delay * 2 ** (entry.attempts - 1))
+        heapq.heappush(self.retries,
+                       (time.monotonic() + delay, entry.id, entry))
+
+    def dispatch(self, sender, entries):
+        """Передаёт сообщения в очередь отправки."""
+        for entry in entries:
+            sender.submit(
+                entry.chat_id, entry.message,
+                on_delivered=lambda message, entry=entry: self.delivered(
+                    entry
+                ),
+                on_failed=lambda rejected, entry=entry: self.failed(
+                    entry, rejected
+                )
+            )
+
+    def dispatch_ready(self, sender):
+        """Передаёт в очередь отправки сообщения, записанные на диск."""
+        with self.lock:
+            ready, self.ready = self.ready, []
+        self.dispatch(sender, ready)
+
+    def due_retries(self, now):
+        """Забирает сообщения, которые пора отправить повторно."""
+        due = []
+        while self.retries and self.retries[0][0] <= now:
+            due.append(heapq.heappop(self.retries)[2])
+        return due
+
+    async def run(self, sender):
+        """Периодически пишет журнал на диск и отправляет сообщения."""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            await loop.run_in_executor(None, self.commit)
+            self.dispatch_ready(sender)
+            self.dispatch(sender, self.due_retries(time.monotonic()))
+            if self.closed_records > self.compact_after:
+                await loop.run_in_executor(None, self.compact)
+
+    async def close(self, sender, timeout=None):
+        """
+        Отправляет записанные сообщения и закрывает журнал.
+        Перед закрытием ждёт опустошения очереди отправки, но не дольше
+        timeout секунд: неотправленные сообщения остаются в журнале.
+        """
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.commit)
+        self.dispatch_ready(sender)
+        await sender.stop(timeout)
+        await loop.run_in_executor(None, self.commit)
+        with self.lock:
+            self.file.close()
+        self.release()
@@ -0,0 +1,172 @@
+import bisect
+import time
+from array import array
+from collections.abc import MutableMapping
+from datetime import datetime, timezone
+
+
+class StatusCodes:
+    """
+    Статусы работ, закодированные числами 0-255.
+    Известные статусы получают коды в порядке statuses, неизвестные -
+    следующие свободные коды при первой встрече.
+    """
+
+    def __init__(self, statuses=()):
+        self.statuses = []
+        self.codes = {}
+        for status in statuses:
+            self.code(status)
+
+    def code(self, status):
+        """Возвращает код статуса."""
+        code = self.codes.get(status)
+        if code is None:
+            code = self.codes[status] = len(self.statuses)
+            self.statuses.append(status)
+        return code
+
+    def status(self, code):
+        """Возвращает статус по коду."""
+        return self.statuses[code]
+
+
+def parse_timestamp(value):
+    """
+    Возвращает время в секундах из строки вида 2022-06-03T14:40:57Z.
+    Если строки нет или она не разбирается, возвращает текущее время.
+    """
+    try:
+        # fromisoformat принимает суффикс Z только с Python 3.11.
+        return int(datetime.strptime(value, '%Y-%m-%dT%H:%M:%SZ')
+                   .replace(tzinfo=timezone.utc).timestamp())
+    except (TypeError, ValueError):
+        return int(time.time())
+
+
+class HomeworkTable(MutableMapping):
+    """
+    Последние известные статусы работ студента: {id работы: статус}.
+    Работы хранятся колонками в массивах, отсортированных по id:
+    id (8 байт), код статуса (1 байт), время обновления (4 байта)
+    и смещение имени в общем буфере UTF-8. Работы с нечисловым id
+    (в ответах API их не бывает) хранятся в обычном словаре.
+    """
+
+    __slots__ = ('codes', 'ids', 'statuses', 'updated', 'offsets',
+                 'lengths', 'names', 'other')
+
+    def __init__(self, codes):
+        self.codes = codes
+        self.ids = array('q')
+        self.statuses = array('B')
+        self.updated = array('I')
+        self.offsets = array('I')
+        self.lengths = array('H')
+        self.names = bytearray()
+        self.other = {}
+
+    def find(self, homework_id):
+        """Возвращает номер строки работы или None."""
+        if not homework_id.isdigit():
+            return None
+        number = int(homework_id)
+        row = bisect.bisect_left(self.ids, number)
+        if row < len(self.ids) and self.ids[row] == number:
+            return row
+        return None
+
+    def __getitem__(self, homework_id):
+        row = self.find(homework_id)
+        if row is not None:
+            return self.codes.status(self.statuses[row])
+        return self.other[homework_id][0]
+
+    def __setitem__(self, homework_id, status):
+        self.set(homework_id, status)
+
+    def set(self, homework_id, status, name=None, updated=None):
+        """Запоминает статус, имя и время обновления работы."""
+        if updated is None:
+            updated = int(time.time())
+        if not homework_id.isdigit():
+            self.other[homework_id] = (status, name, updated)
+            return
+        encoded = (name or '').encode()[:0xFFFF]
+        number = int(homework_id)
+        row = bisect.bisect_left(self.ids, number)
+        if row < len(self.ids) and self.ids[row] == number:
+            self.statuses[row] = self.codes.code(status)
+            self.updated[row] = updated
+            if name is not None and encoded != self.name_bytes(row):
+                self.offsets[row] = len(self.names)
+                self.lengths[row] = len(encoded)
+                self.names += encoded
+            return
+        self.ids.insert(row, number)
+        self.statuses.insert(row, self.codes.code(status))
+        self.updated.insert(row, updated)
+        self.offsets.insert(row, len(self.names))
+        self.lengths.insert(row, len(encoded))
+        self.names += encoded
+
+    def __delitem__(self, homework_id):
+        row = self.find(homework_id)
+        if row is None:
+            del self.other[homework_id]
+            return
+        for column in (self.ids, self.statuses, self.updated,
+                       self.offsets, self.lengths):
+            del column[row]
+
+    def __iter__(self):
+        for number in self.ids:
+            yield str(number)
+        yield from self.other
+
+    def __len__(self):
+        return len(self.ids) + len(self.other)
+
+    def __contains__(self, homework_id):
+        return (self.find(homework_id) is not None
+                or homework_id in self.other)
+
+    def has_status(self, status):
+        """Проверяет, есть ли работа с таким статусом."""
+        code = self.codes.codes.get(status)
+        return (code is not None and code in self.statuses
+                or any(row[0] == status for row in self.other.values()))
+
+    def name_bytes(self, row):
+        """Возвращает имя работы в строке row в кодировке UTF-8."""
+        offset = self.offsets[row]
+        return bytes(self.names[offset:offset + self.lengths[row]])
+
+    def name(self, homework_id):
+        """Возвращает имя работы, а если оно неизвестно - её id."""
+        row = self.find(homework_id)
+        if row is not None:
+            return self.name_bytes(row).decode() or homework_id
+        if homework_id in self.other:
+            return self.other[homework_id][1] or homework_id
+        return homework_id
+
+    def last(self, count):
+        """Возвращает count последних работ: (id, статус, имя)."""
+        rows = []
+        for row in range(max(len(self.ids) - count, 0), len(self.ids)):
+            homework_id = str(self.ids[row])
+            rows.append((homework_id,
+                         self.codes.status(self.statuses[row]),
+                         self.name_bytes(row).decode() or homework_id))
+        rows.extend((homework_id, status, name or homework_id)
+                    for homework_id, (status, name, updated)
+                    in self.other.items())
+        return rows[-count:]
+
+    def updated_at(self, homework_id):
+        """Возвращает время последнего обновления работы в секундах."""
+        row = self.find(homework_id)
+        if row is not None:
+            return self.updated[row]
+        return self.other[homework_id][2]
@@ -0,0 +1,131 @@
+import heapq
+import itertools
+import os
+import random
+import time
+
+from homework import RETRY_PERIOD
+
+REVIEWING_PERIOD = int(os.getenv('REVIEWING_PERIOD', 120))
+IDLE_PERIOD = int(os.getenv('IDLE_PERIOD', 1800))
+IDLE_AFTER = int(os.getenv('IDLE_AFTER', 3 * 24 * 60 * 60))
+MAX_BACKOFF = int(os.getenv('MAX_BACKOFF', 3600))
+API_QUOTA = float(os.getenv('API_QUOTA', 0))
+JITTER = 0.1
+
+
+class Scheduler:
+    """
+    Выбирает время следующего опроса API для каждого студента.
+    Работы на проверке опрашиваются чаще, студенты без изменений - реже,
+    при ошибках интервал растёт экспоненциально со случайным разбросом.
+    API_QUOTA ограничивает общее число запросов в секунду (0 - без
+    ограничения).
+    """
+
+    def __init__(self, period=RETRY_PERIOD, reviewing_period=REVIEWING_PERIOD,
+                 idle_period=IDLE_PERIOD, idle_after=IDLE_AFTER,
+                 max_backoff=MAX_BACKOFF, quota=API_QUOTA, rng=None):
+        self.period = period
+        self.reviewing_period = reviewing_period
+        self.idle_period = idle_period
+        self.idle_after = idle_after
+        self.max_backoff = max_backoff
+        self.quota = quota
+        self.rng = rng or random.Random()
+        self.queue = []
+        self.counter = itertools.count()
+        self.entries = {}
+        self.members = set()
+
+    @property
+    def size(self):
+        """Число студентов в расписании."""
+        return len(self.members)
+
+    @property
+    def min_interval(self):
+        """Минимальный интервал опроса студента с учётом квоты API."""
+        if not self.quota:
+            return 0
+        return self.size / self.quota
+
+    def delay(self, tenant, now=None):
+        """Возвращает, через сколько секунд снова опросить студента."""
+        if now is None:
+            now = time.time()
+        if tenant.failures:
+            cap = min(self.max_backoff,
+                      self.period * 2 ** (tenant.failures - 1))
+            return max(self.min_interval,
+                       cap / 2 + self.rng.uniform(0, cap / 2))
+        if tenant.last_status == 'reviewing':
+            period = self.reviewing_period
+        elif (tenant.changed_at is not None
+              and now - tenant.changed_at > self.idle_after):
+            period = self.idle_period
+        else:
+            period = self.period
+        period = max(period, self.min_interval)
+        return period * self.rng.uniform(1 - JITTER, 1 + JITTER)
+
+    def add(self, tenants, now):
+        """Равномерно распределяет первые опросы студентов по периоду."""
+        tenants = [tenant for tenant in tenants
+                   if id(tenant) not in self.members]
+        self.members.update(map(id, tenants))
+        step = max(self.period, self.min_interval) / max(len(tenants), 1)
+        for number, tenant in enumerate(tenants):
+            self.push(tenant, now + number * step)
+
+    def discard(self, tenants):
+        """
+        Убирает студентов из расписания.
+        Их записи в очереди пропускаются, а студенты, которых опрашивают
+        прямо сейчас, не планируются снова.
+        """
+        for tenant in tenants:
+            self.members.discard(id(tenant))
+            self.entries.pop(id(tenant), None)
+
+    def push(self, tenant, due):
+        """Ставит опрос студента в очередь на время due."""
+        number = next(self.counter)
+        self.entries[id(tenant)] = number
+        heapq.heappush(self.queue, (due, number, tenant))
+
+    def reschedule(self, tenants, now):
+        """Планирует следующие опросы студентов после текущего."""
+        for tenant in tenants:
+            if id(tenant) in self.members:
+                self.push(tenant, now + self.delay(tenant))
+
+    def is_stale(self, entry):
+        """Проверяет, что запись очереди заменена или студент убран."""
+        _, number, tenant = entry
+        return self.entries.get(id(tenant)) != number
+
+    def next_due(self):
+        """Возвращает время ближайшего опроса."""
+        while self.queue and self.is_stale(self.queue[0]):
+            heapq.heappop(self.queue)
+        if not self.queue:
+            return None
+        return self.queue[0][0]
+
+    def wait_time(self, now):
+        """Возвращает, сколько секунд осталось до ближайшего опроса."""
+        next_due = self.next_due()
+        if next_due is None:
+            return None
+        return max(0, next_due - now)
+
+    def pop_due(self, now):
+        """Забирает из очереди студентов, которых пора опросить."""
+        due = []
+        while self.queue and self.queue[0][0] <= now:
+            entry = heapq.heappop(self.queue)
+            if not self.is_stale(entry):
+                del self.entries[id(entry[2])]
+                due.append(entry[2])
+        return due
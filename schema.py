@@ -0,0 +1,96 @@
+from collections import namedtuple
+
+Field = namedtuple('Field', 'name types choices required missing invalid',
+                   defaults=(None, None, True, None, None))
+Field.__doc__ = """
+Поле записи в ответе API.
+types - допустимые типы значения, choices - допустимые значения;
+missing и invalid - тексты ошибок для отсутствующего и неверного поля.
+"""
+
+_validators = {}
+
+
+def field_checks(number, field):
+    """Возвращает строки кода с проверками поля номер number."""
+    lines = []
+    key = repr(field.name)
+    if field.required:
+        lines += [
+            f'        if {key} not in entry:',
+            f'            errors.append((index, KeyError(MISSING_{number})))',
+            '            continue',
+        ]
+        value = f'entry[{key}]'
+    else:
+        lines.append(f'        value = entry.get({key}, ABSENT)')
+        value = 'value'
+    guard = '' if field.required else 'value is not ABSENT and '
+    if field.types is not None:
+        lines += [
+            f'        if {guard}not isinstance({value}, TYPES_{number}):',
+            '            errors.append((index, TypeError(',
+            f'                f"{{INVALID_{number}}}: {{type({value})}}"',
+            '            )))',
+            '            continue',
+        ]
+    if field.choices is not None:
+        # Нехешируемое значение (список, словарь) не входит в choices:
+        # TypeError из проверки не должен прерывать проход по записям.
+        lines += [
+            '        try:',
+            f'            invalid = {guard}{value} not in CHOICES_{number}',
+            '        except TypeError:',
+            '            invalid = True',
+            '        if invalid:',
+            f'            errors.append((index, KeyError(INVALID_{number})))',
+            '            continue',
+        ]
+    return lines
+
+
+def compile_validator(fields):
+    """
+    Собирает из описания полей функцию validate(entries, errors).
+    Это генератор: за один проход по entries он отдаёт записи, прошедшие
+    все проверки, а для остальных добавляет в errors пары (номер записи,
+    исключение). Проверки записываются в код функции, без цикла по полям.
+    """
+    namespace = {'ABSENT': object()}
+    for number, field in enumerate(fields):
+        namespace.update({
+            f'TYPES_{number}': field.types,
+            f'CHOICES_{number}': field.choices,
+            f'MISSING_{number}': field.missing or f'Нет поля <{field.name}>',
+            f'INVALID_{number}': (field.invalid
+                                  or f'Неверное поле <{field.name}>'),
+        })
+    # Константы передаются значениями по умолчанию: так они локальные
+    # переменные функции, и обращение к ним быстрее, чем к глобальным.
+    constants = ', '.join(f'{name}={name}' for name in namespace)
+    lines = [
+        f'def validate(entries, errors, {constants}):',
+        '    for index, entry in enumerate(entries):',
+        '        if not isinstance(entry, dict):',
+        '            errors.append((index, TypeError(',
+        '                f"Запись должна быть <dict>, получен {type(entry)}"',
+        '            )))',
+        '            continue',
+    ]
+    for number, field in enumerate(fields):
+        lines += field_checks(number, field)
+    lines.append('        yield entry')
+    source = '\n'.join(lines)
+    exec(compile(source, f'<schema {fields[0].name}>', 'exec'), namespace)
+    validate = namespace['validate']
+    validate.source = source
+    return validate
+
+
+def get_validator(fields):
+    """Возвращает скомпилированный валидатор, собирая его один раз."""
+    fields = tuple(fields)
+    validator = _validators.get(fields)
+    if validator is None:
+        validator = _validators[fields] = compile_validator(fields)
+    return validator
@@ -0,0 +1,194 @@
+import asyncio
+import inspect
+import logging
+import os
+import time
+
+import telegram
+
+from metrics import MESSAGES_SENT, SEND_LATENCY
+from tracing import tracer
+
+TELEGRAM_RATE = float(os.getenv('TELEGRAM_RATE', 30))
+TELEGRAM_CHAT_RATE = float(os.getenv('TELEGRAM_CHAT_RATE', 1))
+SEND_WORKERS = int(os.getenv('SEND_WORKERS', 8))
+SEND_RETRIES = int(os.getenv('SEND_RETRIES', 5))
+
+DELIVERED = 'delivered'
+FAILED = 'failed'
+REJECTED = 'rejected'
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Ограничитель частоты: rate событий в секунду, всплеск до capacity.
+    Токены можно брать в долг, тогда возвращается время ожидания.
+    """
+
+    def __init__(self, rate, capacity=1, now=None):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic() if now is None else now
+
+    def refill(self, now):
+        """Добавляет токены, накопившиеся с прошлого обращения."""
+        self.tokens = min(self.capacity,
+                          self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, now):
+        """Берёт токен и возвращает, сколько секунд ждать до его появления."""
+        self.refill(now)
+        self.tokens -= 1
+        if self.tokens >= 0:
+            return 0
+        return -self.tokens / self.rate
+
+    def pause(self, now, seconds):
+        """Не выдаёт токены ближайшие seconds секунд."""
+        self.refill(now)
+        self.tokens = min(self.tokens, 0) - seconds * self.rate
+
+    def is_full(self, now):
+        """Проверяет, что ограничитель простаивает."""
+        self.refill(now)
+        return self.tokens >= self.capacity
+
+
+class OutboundQueue:
+    """
+    Очередь исходящих сообщений Telegram.
+    bot - telegram.Bot или aiotransport.AsyncBot.
+    Соблюдает общий лимит бота и лимит на чат, при ответе 429 ждёт
+    retry_after и повторяет отправку.
+    """
+
+    def __init__(self, bot, rate=TELEGRAM_RATE, chat_rate=TELEGRAM_CHAT_RATE,
+                 workers=SEND_WORKERS, retries=SEND_RETRIES):
+        self.bot = bot
+        self.is_async = inspect.iscoroutinefunction(bot.send_message)
+        self.rate = rate
+        self.chat_rate = chat_rate
+        self.workers = workers
+        self.retries = retries
+        self.bucket = TokenBucket(rate, capacity=rate)
+        self.chat_buckets = {}
+        self.queue = None
+        self.loop = None
+        self.tasks = []
+
+    async def start(self):
+        """Запускает отправляющие сообщения задачи."""
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+        self.tasks = [asyncio.create_task(self.work())
+                      for _ in range(self.workers)]
+
+    async def stop(self, timeout=None):
+        """
+        Дожидается отправки всех сообщений и останавливает задачи.
+        Если задан timeout, ждёт не дольше timeout секунд.
+        """
+        # Даём выполниться постановкам в очередь из submit.
+        await asyncio.sleep(0)
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f'За {timeout} с не отправлено '
+                           f'{self.queue.qsize()} сообщений')
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+
+    def submit(self, chat_id, message, on_delivered=None, on_failed=None):
+        """
+        Ставит сообщение в очередь, можно вызывать из любого потока.
+        После доставки вызывается on_delivered(message), после неудачной
+        отправки - on_failed(rejected), где rejected означает, что
+        Telegram отказался принимать сообщение и повторять бесполезно.
+        """
+        self.loop.call_soon_threadsafe(
+            self.queue.put_nowait,
+            (chat_id, message, on_delivered, on_failed)
+        )
+
+    def chat_bucket(self, chat_id, now):
+        """Возвращает ограничитель чата, удаляя простаивающие."""
+        if chat_id not in self.chat_buckets:
+            if len(self.chat_buckets) > 10 * self.rate:
+                self.chat_buckets = {
+                    key: bucket for key, bucket in self.chat_buckets.items()
+                    if not bucket.is_full(now)
+                }
+            self.chat_buckets[chat_id] = TokenBucket(self.chat_rate, now=now)
+        return self.chat_buckets[chat_id]
+
+    async def acquire(self, chat_id):
+        """Ждёт, пока лимиты позволят отправить сообщение в чат."""
+        now = time.monotonic()
+        await asyncio.sleep(self.chat_bucket(chat_id, now).reserve(now))
+        await asyncio.sleep(self.bucket.reserve(time.monotonic()))
+
+    async def send(self, chat_id, message):
+        """
+        Отправляет сообщение с учётом лимитов.
+        Возвращает DELIVERED, FAILED или REJECTED.
+        """
+        for _ in range(self.retries):
+            await self.acquire(chat_id)
+            started = time.perf_counter()
+            try:
+                with tracer.span('send_message', track=chat_id):
+                    if self.is_async:
+                        await self.bot.send_message(chat_id=chat_id,
+                                                    text=message)
+                    else:
+                        await self.loop.run_in_executor(
+                            None,
+                            lambda: self.bot.send_message(chat_id=chat_id,
+                                                          text=message)
+                        )
+            except telegram.error.RetryAfter as error:
+                logger.warning(f'Telegram просит подождать '
+                               f'{error.retry_after} с: {message}')
+                now = time.monotonic()
+                self.chat_bucket(chat_id, now).pause(now, error.retry_after)
+            except (telegram.error.BadRequest,
+                    telegram.error.Unauthorized) as error:
+                logger.error(f'сбой при отправке сообщения: {message} - '
+                             f'{error}')
+                return REJECTED
+            except telegram.error.TelegramError as error:
+                logger.error(f'сбой при отправке сообщения: {message} - '
+                             f'{error}')
+                return FAILED
+            else:
+                MESSAGES_SENT.inc()
+                logger.debug(f'В Телеграм отправлено сообщение: {message}')
+                return DELIVERED
+            finally:
+                SEND_LATENCY.observe(time.perf_counter() - started)
+        logger.error(f'сбой при отправке сообщения: {message} - '
+                     f'превышено число попыток')
+        return FAILED
+
+    async def work(self):
+        """Забирает сообщения из очереди и отправляет их."""
+        while True:
+            chat_id, message, on_delivered, on_failed = await self.queue.get()
+            try:
+                result = await self.send(chat_id, message)
+            except Exception as error:
+                logger.error(f'сбой при отправке сообщения: {message} - '
+                             f'{error}')
+                result = FAILED
+            try:
+                if result == DELIVERED and on_delivered:
+                    on_delivered(message)
+                elif result != DELIVERED and on_failed:
+                    on_failed(result == REJECTED)
+            finally:
+                self.queue.task_done()
@@ -0,0 +1,156 @@
+import bisect
+import hashlib
+import os
+import socket
+import sqlite3
+import threading
+
+SHARD_DB = os.getenv('SHARD_DB')
+WORKER_ID = os.getenv('WORKER_ID', f'{socket.gethostname()}:{os.getpid()}')
+WORKER_TTL = float(os.getenv('WORKER_TTL', 30))
+HEARTBEAT_INTERVAL = float(os.getenv('HEARTBEAT_INTERVAL', 10))
+VIRTUAL_NODES = int(os.getenv('VIRTUAL_NODES', 100))
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS workers ('
+    'worker TEXT PRIMARY KEY, '
+    'heartbeat REAL NOT NULL)',
+)
+
+
+def ring_hash(value):
+    """Возвращает положение строки на кольце хешей."""
+    return int.from_bytes(hashlib.md5(value.encode()).digest()[:8], 'big')
+
+
+class HashRing:
+    """
+    Консистентное хеширование студентов по процессам.
+    У каждого процесса virtual_nodes точек на кольце, поэтому при
+    добавлении или уходе процесса переезжает только ~1/N студентов.
+    """
+
+    def __init__(self, workers, virtual_nodes=VIRTUAL_NODES):
+        points = sorted(
+            (ring_hash(f'{worker}#{number}'), worker)
+            for worker in workers for number in range(virtual_nodes)
+        )
+        self.hashes = [point for point, _ in points]
+        self.workers = [worker for _, worker in points]
+
+    def owner(self, key):
+        """Возвращает процесс, который опрашивает студента с ключом key."""
+        if not self.hashes:
+            return None
+        index = bisect.bisect(self.hashes, ring_hash(key))
+        return self.workers[index % len(self.workers)]
+
+
+class ShardRegistry:
+    """
+    Список живых процессов в общем файле SQLite (режим WAL).
+    Процесс считается живым, пока обновляет heartbeat не реже ttl секунд.
+    """
+
+    def __init__(self, path=SHARD_DB, ttl=WORKER_TTL):
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, timeout=30,
+                                          check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        with self.connection:
+            for statement in SCHEMA:
+                self.connection.execute(statement)
+
+    def heartbeat(self, worker, now):
+        """Отмечает, что процесс worker жив."""
+        with self.lock, self.connection:
+            self.connection.execute(
+                'INSERT INTO workers (worker, heartbeat) VALUES (?, ?) '
+                'ON CONFLICT (worker) DO UPDATE '
+                'SET heartbeat = excluded.heartbeat',
+                (worker, now)
+            )
+
+    def leave(self, worker):
+        """Удаляет процесс из списка, его студенты переходят к другим."""
+        with self.lock, self.connection:
+            self.connection.execute('DELETE FROM workers WHERE worker = ?',
+                                    (worker,))
+
+    def alive(self, now):
+        """Возвращает отсортированный список живых процессов."""
+        with self.lock:
+            rows = self.connection.execute(
+                'SELECT worker FROM workers WHERE heartbeat >= ? '
+                'ORDER BY worker', (now - self.ttl,)
+            )
+            return [worker for worker, in rows]
+
+    def close(self):
+        """Закрывает соединение с базой."""
+        with self.lock:
+            self.connection.close()
+
+
+class Shard:
+    """
+    Часть студентов, которую опрашивает этот процесс.
+    Состав пересчитывается при каждом rebalance по списку живых процессов.
+    Новых студентов процесс берёт через grace секунд, чтобы прежний
+    владелец успел отпустить их и сохранить их состояние.
+    """
+
+    def __init__(self, registry, tenants, worker=WORKER_ID,
+                 interval=HEARTBEAT_INTERVAL, virtual_nodes=VIRTUAL_NODES):
+        self.registry = registry
+        self.tenants = {tenant.key: tenant for tenant in tenants}
+        self.worker = worker
+        self.interval = interval
+        self.grace = 2 * interval
+        self.virtual_nodes = virtual_nodes
+        self.workers = ()
+        self.owned = set()
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.left = False
+
+    def rebalance(self, now):
+        """
+        Отмечает процесс живым и пересчитывает его часть студентов.
+        Возвращает студентов, которых процесс начинает и перестаёт опрашивать.
+        """
+        with self.lock:
+            if self.left:
+                return [], []
+            self.registry.heartbeat(self.worker, now)
+            workers = tuple(self.registry.alive(now))
+            released = []
+            if workers != self.workers:
+                self.workers = workers
+                ring = HashRing(workers, self.virtual_nodes)
+                assigned = {key for key in self.tenants
+                            if ring.owner(key) == self.worker}
+                for key in assigned - self.owned:
+                    self.pending.setdefault(key, now + self.grace)
+                for key in set(self.pending) - assigned:
+                    del self.pending[key]
+                released = self.owned - assigned
+                self.owned -= released
+            acquired = [key for key, ready in self.pending.items()
+                        if ready <= now]
+            for key in acquired:
+                del self.pending[key]
+            self.owned.update(acquired)
+            return ([self.tenants[key] for key in acquired],
+                    [self.tenants[key] for key in released])
+
+    def leave(self):
+        """
+        Уходит из списка живых процессов.
+        Сначала дожидается rebalance, начатого в другом потоке, а после
+        ухода rebalance ничего не меняет и не отпускает студентов.
+        """
+        with self.lock:
+            self.left = True
+            self.registry.leave(self.worker)
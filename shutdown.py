@@ -0,0 +1,74 @@
+import os
+import signal
+import threading
+from contextlib import contextmanager
+
+SHUTDOWN_TIMEOUT = float(os.getenv('SHUTDOWN_TIMEOUT', 20))
+STOP_SIGNALS = (signal.SIGTERM, signal.SIGINT)
+
+
+class Shutdown(BaseException):
+    """
+    Программа завершается по сигналу.
+    Наследует BaseException, чтобы не считаться сбоем опроса.
+    """
+
+
+class GracefulExit:
+    """
+    Завершение синхронного цикла опроса по SIGTERM и SIGINT.
+    Внутри deferred() сигнал только запоминается, а Shutdown выбрасывается
+    после выхода из блока: начатые отправка сообщений и запись состояния
+    доводятся до конца. Вне блока, например в паузе между циклами,
+    Shutdown выбрасывается сразу. Если через timeout секунд после сигнала
+    программа ещё работает (или пришёл второй сигнал), Shutdown
+    выбрасывается и внутри deferred().
+    Обработчики сигналов действуют внутри with и работают только
+    в основном потоке.
+    """
+
+    def __init__(self, timeout=SHUTDOWN_TIMEOUT):
+        self.timeout = timeout
+        self.requested = threading.Event()
+        self.reason = None
+        self.deferring = False
+        self.previous = {}
+
+    def __enter__(self):
+        for signum in STOP_SIGNALS:
+            self.previous[signum] = signal.signal(signum, self.request)
+        self.previous[signal.SIGALRM] = signal.signal(signal.SIGALRM,
+                                                      self.expire)
+        return self
+
+    def __exit__(self, *args):
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        for signum, handler in self.previous.items():
+            signal.signal(signum, handler)
+
+    def request(self, signum, frame):
+        """Обрабатывает сигнал завершения."""
+        reason = f'получен сигнал {signal.Signals(signum).name}'
+        if self.requested.is_set():
+            raise Shutdown(reason)
+        self.reason = reason
+        self.requested.set()
+        signal.setitimer(signal.ITIMER_REAL, self.timeout)
+        if not self.deferring:
+            raise Shutdown(reason)
+
+    def expire(self, signum, frame):
+        """Прерывает работу, не завершившуюся за timeout секунд."""
+        raise Shutdown(f'{self.reason}, за {self.timeout} с '
+                       f'программа не завершилась')
+
+    @contextmanager
+    def deferred(self):
+        """Откладывает завершение по сигналу до конца блока."""
+        self.deferring = True
+        try:
+            yield
+        finally:
+            self.deferring = False
+        if self.requested.is_set():
+            raise Shutdown(self.reason)
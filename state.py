@@ -0,0 +1,178 @@
+import os
+import sqlite3
+import threading
+from collections import defaultdict
+
+STATE_DB = os.getenv('STATE_DB', 'homework_state.sqlite3')
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS cursors ('
+    'tenant TEXT PRIMARY KEY, '
+    'cursor INTEGER NOT NULL)',
+    'CREATE TABLE IF NOT EXISTS statuses ('
+    'tenant TEXT NOT NULL, '
+    'homework_id TEXT NOT NULL, '
+    'status TEXT NOT NULL, '
+    'homework_name TEXT, '
+    'PRIMARY KEY (tenant, homework_id)) WITHOUT ROWID',
+    'CREATE TABLE IF NOT EXISTS sent_messages ('
+    'id INTEGER PRIMARY KEY, '
+    'tenant TEXT NOT NULL, '
+    'message TEXT NOT NULL, '
+    'sent_at INTEGER NOT NULL)',
+)
+
+# Колонки, добавленные после создания таблиц: {таблица: [(колонка, тип)]}.
+# В базах, созданных раньше, они добавляются при открытии.
+ADDED_COLUMNS = {
+    'statuses': [('homework_name', 'TEXT')],
+}
+
+
+class StateStore:
+    """
+    Хранит состояние бота в SQLite в режиме WAL.
+    Это курсоры опроса API, последние известные статусы и имена домашних
+    работ и журнал отправленных сообщений.
+    """
+
+    def __init__(self, path=STATE_DB):
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        with self.connection:
+            for statement in SCHEMA:
+                self.connection.execute(statement)
+            self.add_columns()
+
+    def add_columns(self):
+        """Добавляет в таблицы старой базы недостающие колонки."""
+        for table, columns in ADDED_COLUMNS.items():
+            existing = {row[1] for row in self.connection.execute(
+                f'PRAGMA table_info({table})'
+            )}
+            for column, kind in columns:
+                if column not in existing:
+                    self.connection.execute(
+                        f'ALTER TABLE {table} ADD COLUMN {column} {kind}'
+                    )
+
+    def load_cursors(self):
+        """Возвращает курсоры всех студентов: {ключ студента: курсор}."""
+        with self.lock:
+            return dict(self.connection.execute(
+                'SELECT tenant, cursor FROM cursors'
+            ))
+
+    def load_statuses(self):
+        """
+        Возвращает последние известные статусы и имена работ.
+        Формат: {ключ студента: {id работы: (статус, имя)}}.
+        """
+        statuses = defaultdict(dict)
+        with self.lock:
+            rows = self.connection.execute(
+                'SELECT tenant, homework_id, status, homework_name '
+                'FROM statuses'
+            )
+            for tenant, homework_id, status, name in rows:
+                statuses[tenant][homework_id] = (status, name)
+        return statuses
+
+    def load_sent_messages(self, tenant, limit=10):
+        """Возвращает последние отправленные студенту сообщения."""
+        with self.lock:
+            rows = self.connection.execute(
+                'SELECT message, sent_at FROM sent_messages '
+                'WHERE tenant = ? ORDER BY id DESC LIMIT ?',
+                (tenant, limit)
+            ).fetchall()
+        return rows[::-1]
+
+    def load_recent_messages(self, limit=10):
+        """
+        Возвращает последние отправленные сообщения всех студентов.
+        Формат: {ключ студента: [(сообщение, время отправки), ...]}.
+        """
+        messages = defaultdict(list)
+        with self.lock:
+            rows = self.connection.execute(
+                'SELECT tenant, message, sent_at FROM ('
+                'SELECT id, tenant, message, sent_at, ROW_NUMBER() OVER ('
+                'PARTITION BY tenant ORDER BY id DESC) AS number '
+                'FROM sent_messages) WHERE number <= ? ORDER BY id',
+                (limit,)
+            )
+            for tenant, message, sent_at in rows:
+                messages[tenant].append((message, sent_at))
+        return messages
+
+    def restore(self, tenants):
+        """
+        Восстанавливает сохранённое состояние студентов.
+        Это курсоры, статусы работ и последние отправленные сообщения.
+        """
+        tenants = list(tenants)
+        cursors = self.load_cursors()
+        statuses = self.load_statuses()
+        limit = max((tenant.history.maxlen for tenant in tenants), default=0)
+        messages = self.load_recent_messages(limit) if limit else {}
+        for tenant in tenants:
+            tenant.restore(cursors.get(tenant.key),
+                           statuses.get(tenant.key, {}),
+                           messages.get(tenant.key, ()))
+
+    def save_cursors(self, cursors):
+        """Сохраняет курсоры студентов одной транзакцией."""
+        self.write(cursors, [], [])
+
+    def flush(self, tenants):
+        """
+        Сохраняет изменения студентов, накопленные за цикл опроса.
+        Все изменения записываются одной транзакцией.
+        """
+        cursors = {}
+        statuses = []
+        sent_messages = []
+        for tenant in tenants:
+            cursor, changed_statuses, messages = tenant.take_changes()
+            if cursor is not None:
+                cursors[tenant.key] = cursor
+            statuses.extend(
+                (tenant.key, homework_id, status, name)
+                for homework_id, (status, name) in changed_statuses.items()
+            )
+            sent_messages.extend(
+                (tenant.key, message, sent_at)
+                for message, sent_at in messages
+            )
+        if cursors or statuses or sent_messages:
+            self.write(cursors, statuses, sent_messages)
+
+    def write(self, cursors, statuses, sent_messages):
+        """Записывает курсоры, статусы и отправленные сообщения."""
+        with self.lock, self.connection:
+            self.connection.executemany(
+                'INSERT INTO cursors (tenant, cursor) VALUES (?, ?) '
+                'ON CONFLICT (tenant) DO UPDATE SET cursor = excluded.cursor',
+                cursors.items()
+            )
+            self.connection.executemany(
+                'INSERT INTO statuses (tenant, homework_id, status, '
+                'homework_name) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT (tenant, homework_id) '
+                'DO UPDATE SET status = excluded.status, homework_name = '
+                'coalesce(excluded.homework_name, homework_name)',
+                statuses
+            )
+            self.connection.executemany(
+                'INSERT INTO sent_messages (tenant, message, sent_at) '
+                'VALUES (?, ?, ?)',
+                sent_messages
+            )
+
+    def close(self):
+        """Закрывает соединение с базой."""
+        with self.lock:
+            self.connection.close()
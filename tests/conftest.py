@@ -1,6 +1,8 @@
 import sys
 import os
 
+import pytest
+
 
 root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(root_dir)
@@ -21,3 +23,64 @@ if (
 pytest_plugins = [
     'tests.fixtures.fixture_data'
 ]
+
+
+class RequestsGetSession:
+    """
+    Сессия API, отправляющая запросы через requests.get.
+    Заменителям ответа добавляются сырое тело и заголовки,
+    как у requests.Response.
+    """
+
+    def get(self, url, **kwargs):
+        import json
+
+        import requests
+        response = requests.get(url, **kwargs)
+        if response is not None and not hasattr(response, 'content'):
+            response.content = json.dumps(response.json()).encode()
+            response.headers = {}
+        return response
+
+
+@pytest.fixture
+def requests_get_session():
+    """
+    Бот запрашивает API через общую сессию с пулом соединений
+    (transport.get_session), а не через requests.get. Тестам, которые
+    подменяют requests.get, эта фикстура подставляет вместо общей сессии
+    RequestsGetSession через transport.set_session.
+    """
+    import transport
+    session = RequestsGetSession()
+    previous = transport.set_session(session)
+    yield session
+    transport.set_session(previous)
+
+
+@pytest.fixture(autouse=True)
+def state_db_in_tmp_path(monkeypatch, tmp_path):
+    """Состояние бота в тестах хранится во временной директории."""
+    import homework
+    monkeypatch.setattr(homework, 'STATE_DB', str(tmp_path / 'state.db'))
+
+
+@pytest.fixture(autouse=True)
+def fresh_breakers(monkeypatch):
+    """Каждый тест начинает с замкнутыми предохранителями API."""
+    import breaker
+    monkeypatch.setattr(breaker, '_breakers', {})
+
+
+@pytest.fixture(autouse=True)
+def root_logger():
+    """
+    Запуск бота (main) настраивает вывод лога на корневом логгере.
+    После теста прежние обработчики и уровень возвращаются.
+    """
+    import logging
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+    yield root
+    root.handlers = handlers
+    root.setLevel(level)
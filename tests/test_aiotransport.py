@@ -0,0 +1,237 @@
+import asyncio
+
+import pytest
+import telegram
+from aiohttp import web
+
+from aiotransport import (AsyncTransport, async_check_updates,
+                          async_send_chat_message)
+from breaker import get_breaker
+from homework import Tenant
+from sender import OutboundQueue
+from traffic import TrafficLog, read_traffic, replay
+
+
+class FakeServers:
+    """Поддельные API Практикума и Telegram Bot API."""
+
+    def __init__(self):
+        self.sent = []
+        self.answers = []
+        self.not_modified = 0
+
+    async def homework_statuses(self, request):
+        token = request.headers['Authorization'].split()[1]
+        if token == 'bad':
+            return web.json_response({'code': 'not_authenticated'},
+                                     status=401)
+        if token == 'slow':
+            await asyncio.sleep(10)
+        if token == 'etag':
+            if request.headers.get('If-None-Match') == '"v1"':
+                self.not_modified += 1
+                return web.Response(status=304)
+            return web.json_response({'homeworks': [], 'current_date': 1},
+                                     headers={'ETag': '"v1"'})
+        return web.json_response({
+            'homeworks': [{'id': 1, 'homework_name': f'hw_{token}',
+                           'status': 'approved'}],
+            'current_date': int(request.query['from_date']) + 1
+        })
+
+    async def send_message(self, request):
+        data = await request.json()
+        if self.answers:
+            return web.json_response(self.answers.pop(0))
+        self.sent.append((data['chat_id'], data['text']))
+        return web.json_response({'ok': True, 'result': {}})
+
+    async def get_updates(self, request):
+        data = await request.json()
+        return web.json_response({'ok': True, 'result': [
+            {'update_id': data['offset'],
+             'message': {'chat': {'id': 1}, 'text': '/status'}}
+        ]})
+
+    async def __aenter__(self):
+        app = web.Application()
+        app.router.add_get('/homework_statuses/', self.homework_statuses)
+        app.router.add_post('/bot{token}/sendMessage', self.send_message)
+        app.router.add_post('/bot{token}/getUpdates', self.get_updates)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, '127.0.0.1', 0)
+        await site.start()
+        port = self.runner.addresses[0][1]
+        self.url = f'http://127.0.0.1:{port}'
+        return self
+
+    async def __aexit__(self, *args):
+        await self.runner.cleanup()
+
+
+def run(coroutine_function):
+    async def wrapper():
+        async with FakeServers() as servers:
+            transport = AsyncTransport(
+                endpoint=f'{servers.url}/homework_statuses/',
+                telegram_url=servers.url
+            )
+            async with transport:
+                return await coroutine_function(servers, transport)
+    return asyncio.run(wrapper())
+
+
+class TestAsyncTransport:
+
+    def test_request_api(self):
+        async def check(servers, transport):
+            return await transport.request_api(
+                {'Authorization': 'OAuth token'}, 100
+            )
+
+        response = run(check)
+        assert response['current_date'] == 101
+        assert response['homeworks'][0]['homework_name'] == 'hw_token'
+
+    def test_request_api_not_200(self):
+        async def check(servers, transport):
+            with pytest.raises(ConnectionError):
+                await transport.request_api({'Authorization': 'OAuth bad'},
+                                            100)
+
+        run(check)
+
+    @pytest.mark.parametrize('state', ['closed', 'open'])
+    def test_cancelled_requests_are_not_failures(self, state):
+        async def check(servers, transport):
+            breaker = get_breaker(transport.endpoint)
+            if state == 'open':
+                # Через reset_timeout первый запрос станет пробным.
+                breaker.transition('open', 0)
+            tasks = [asyncio.create_task(transport.request_api(
+                {'Authorization': 'OAuth slow'}, 100
+            )) for _ in range(6)]
+            await asyncio.sleep(0.2)
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            return breaker
+
+        breaker = run(check)
+        assert breaker.state == {'closed': 'closed',
+                                 'open': 'half_open'}[state]
+        assert breaker.in_flight == 0
+        assert breaker.failures == 0
+
+    def test_conditional_request(self):
+        async def check(servers, transport):
+            tenant = Tenant('etag', 1, timestamp=100)
+            first = await transport.request_api(
+                tenant.conditional_headers(), tenant.timestamp, tenant
+            )
+            second = await transport.request_api(
+                tenant.conditional_headers(), tenant.timestamp, tenant
+            )
+            return first, second, tenant.etag, servers.not_modified
+
+        assert run(check) == ({'homeworks': [], 'current_date': 1}, None,
+                              '"v1"', 1)
+
+    @pytest.mark.parametrize('answer, error', [
+        ({'ok': False, 'error_code': 429, 'description': 'Too Many',
+          'parameters': {'retry_after': 3}}, telegram.error.RetryAfter),
+        ({'ok': False, 'error_code': 400,
+          'description': 'chat not found'}, telegram.error.BadRequest),
+        ({'ok': False, 'error_code': 403,
+          'description': 'bot was blocked'}, telegram.error.Unauthorized),
+    ])
+    def test_bot_errors(self, answer, error):
+        async def check(servers, transport):
+            servers.answers.append(answer)
+            with pytest.raises(error):
+                await transport.bot('123:abc').send_message(chat_id=1,
+                                                            text='text')
+
+        run(check)
+
+    def test_get_updates(self):
+        async def check(servers, transport):
+            return await transport.bot('123:abc').get_updates(offset=5,
+                                                              timeout=1)
+
+        assert run(check)[0]['update_id'] == 5
+
+    def test_async_send_chat_message(self):
+        async def check(servers, transport):
+            bot = transport.bot('123:abc')
+            servers.answers.append({'ok': False, 'error_code': 400,
+                                    'description': 'chat not found'})
+            failed = await async_send_chat_message(bot, 1, 'lost')
+            delivered = await async_send_chat_message(bot, 1, 'text')
+            return failed, delivered, servers.sent
+
+        assert run(check) == (False, True, [(1, 'text')])
+
+    def test_engine_on_single_event_loop(self):
+        import engine
+        from scheduler import Scheduler
+
+        async def check(servers, transport):
+            tenants = [engine.Tenant(f'token{i}', i) for i in range(10)]
+            await engine.serve(
+                transport.bot('123:abc'), tenants, transport=transport,
+                scheduler=Scheduler(period=0, reviewing_period=0,
+                                    idle_period=0),
+                cycles=1
+            )
+            return tenants, servers.sent
+
+        tenants, sent = run(check)
+        assert sorted(chat_id for chat_id, _ in sent) == list(range(10))
+        assert tenants[3].timestamp > 0
+
+    def test_traffic_is_recorded(self, tmp_path):
+        path = tmp_path / 'traffic.jsonl.gz'
+        log = TrafficLog(path)
+
+        async def record():
+            async with FakeServers() as servers:
+                transport = AsyncTransport(
+                    endpoint=f'{servers.url}/homework_statuses/',
+                    telegram_url=servers.url, log=log
+                )
+                async with transport:
+                    tenant = Tenant('token', 42, timestamp=100)
+                    sender = OutboundQueue(transport.bot('123:abc'))
+                    await sender.start()
+                    await async_check_updates(
+                        transport, tenant,
+                        lambda message: sender.submit(tenant.chat_id, message)
+                    )
+                    await sender.stop()
+
+        asyncio.run(record())
+        log.close()
+        records = list(read_traffic(path))
+        assert [record['k'] for record in records] == ['api', 'send']
+        assert records[0]['c'] == 42 and records[0]['from'] == 100
+        assert records[0]['s'] == 200
+        assert 'hw_token' in records[1]['m']
+        # Запись асинхронного опроса воспроизводится так же, как запись main.
+        assert replay(path).diverged == []
+
+    def test_failed_request_is_recorded(self, tmp_path):
+        path = tmp_path / 'traffic.jsonl.gz'
+        log = TrafficLog(path)
+
+        async def record():
+            async with AsyncTransport(endpoint='http://127.0.0.1:1/',
+                                      retries=0, log=log) as transport:
+                with pytest.raises(ConnectionError):
+                    await transport.request_api({}, 100)
+
+        asyncio.run(record())
+        log.close()
+        [record] = read_traffic(path)
+        assert record['from'] == 100 and 'ClientConnectorError' in record['e']
@@ -147,6 +147,7 @@ class TestHomework:
             '(`logging.getLogger()`).'
         )
 
+    @pytest.mark.usefixtures('requests_get_session')
     def test_request_get_call(self, monkeypatch, current_timestamp,
                               homework_module):
         func_name = 'get_api_answer'
@@ -200,6 +201,7 @@ class TestHomework:
         except Exception:
             pass
 
+    @pytest.mark.usefixtures('requests_get_session')
     def test_get_api_answers(self, monkeypatch, random_timestamp,
                              current_timestamp, homework_module):
         func_name = 'get_api_answer'
@@ -222,6 +224,7 @@ class TestHomework:
             f'Проверьте, что функция `{func_name}` возвращает словарь.'
         )
 
+    @pytest.mark.usefixtures('requests_get_session')
     @pytest.mark.parametrize('response', NOT_OK_RESPONSES.values())
     def test_get_not_200_status_response(self,
                                          monkeypatch,
@@ -246,6 +249,7 @@ class TestHomework:
                 'ситуация, когда API домашки возвращает код, отличный от 200.'
             )
 
+    @pytest.mark.usefixtures('requests_get_session')
     def test_get_api_answer_with_request_exception(self, current_timestamp,
                                                    monkeypatch,
                                                    homework_module):
@@ -619,6 +623,7 @@ class TestHomework:
             except Exception:
                 pass
 
+    @pytest.mark.usefixtures('requests_get_session')
     def test_main_send_request_to_api(self, monkeypatch, random_timestamp,
                                       current_timestamp, random_message,
                                       caplog, homework_module):
@@ -645,6 +650,7 @@ class TestHomework:
                     'для отправки запроса к API домашки.'
                 )
 
+    @pytest.mark.usefixtures('requests_get_session')
     def test_main_check_response_is_called(self, monkeypatch,
                                            random_timestamp,
                                            current_timestamp,
@@ -696,6 +702,7 @@ class TestHomework:
                     f'бот использует функцию `{func_name}`.'
                 )
 
+    @pytest.mark.usefixtures('requests_get_session')
     def test_main_send_message_with_new_status(self, monkeypatch,
                                                random_timestamp,
                                                current_timestamp,
@@ -0,0 +1,134 @@
+import logging
+from http import HTTPStatus
+
+import pytest
+import requests
+
+import utils
+from breaker import CircuitBreaker, get_breaker, is_available
+from exceptions import CircuitOpen
+from metrics import API_SHORT_CIRCUITS, BREAKER_STATE
+
+pytestmark = pytest.mark.usefixtures('requests_get_session')
+
+
+def fail(breaker, times, now=0):
+    for _ in range(times):
+        breaker.release(breaker.acquire(now), ok=False, now=now)
+
+
+class TestCircuitBreaker:
+
+    def test_opens_after_consecutive_failures(self):
+        breaker = CircuitBreaker('test', failures=3, reset_timeout=10)
+        fail(breaker, 2)
+        breaker.release(breaker.acquire(0), ok=True, now=0)
+        fail(breaker, 2)
+        assert breaker.state == 'closed'
+        fail(breaker, 1)
+        assert breaker.state == 'open'
+        with pytest.raises(CircuitOpen):
+            breaker.acquire(9)
+
+    def test_half_open_caps_probes(self):
+        breaker = CircuitBreaker('test', failures=1, reset_timeout=10,
+                                 probes=2)
+        fail(breaker, 1)
+        assert breaker.acquire(10) is True
+        assert breaker.acquire(10) is True
+        assert breaker.state == 'half_open'
+        with pytest.raises(CircuitOpen):
+            breaker.acquire(10)
+
+    def test_successful_probe_closes(self):
+        breaker = CircuitBreaker('test', failures=1, reset_timeout=10)
+        fail(breaker, 1)
+        breaker.release(breaker.acquire(10), ok=True, now=10)
+        assert breaker.state == 'closed'
+        assert breaker.acquire(10) is False
+
+    def test_failed_probe_reopens(self):
+        breaker = CircuitBreaker('test', failures=1, reset_timeout=10)
+        fail(breaker, 1)
+        breaker.release(breaker.acquire(10), ok=False, now=10)
+        assert breaker.state == 'open'
+        with pytest.raises(CircuitOpen):
+            breaker.acquire(19)
+        assert breaker.acquire(20) is True
+
+    def test_late_results_are_ignored(self):
+        breaker = CircuitBreaker('test', failures=1, reset_timeout=10)
+        late = breaker.acquire(0)
+        fail(breaker, 1)
+        breaker.release(late, ok=True, now=1)
+        assert breaker.state == 'open'
+
+    def test_time_comes_from_clock(self):
+        now = [0]
+        breaker = CircuitBreaker('test', failures=1, reset_timeout=10,
+                                 clock=lambda: now[0])
+        breaker.release(breaker.acquire(), ok=False)
+        now[0] = 9
+        with pytest.raises(CircuitOpen):
+            breaker.acquire()
+        now[0] = 10
+        assert breaker.acquire() is True
+
+    def test_abandoned_probe_frees_slot(self):
+        breaker = CircuitBreaker('test', failures=1, reset_timeout=10)
+        fail(breaker, 1)
+        probe = breaker.acquire(now=20)
+        breaker.abandon(probe)
+        assert breaker.state == 'half_open'
+        assert breaker.acquire(now=20) is True
+
+    def test_transitions_are_logged_and_measured(self, caplog):
+        breaker = CircuitBreaker('metrics-test', failures=1)
+        with caplog.at_level(logging.WARNING):
+            fail(breaker, 1)
+        assert 'closed -> open' in caplog.text
+        assert BREAKER_STATE.labels('metrics-test').value == 2
+
+    @pytest.mark.parametrize('code, available', [
+        ('error', False), (500, False), (503, False), (429, False),
+        (200, True), (304, True), (401, True), (404, True),
+    ])
+    def test_is_available(self, code, available):
+        assert is_available(code) is available
+
+
+class TestRequestApi:
+
+    def test_open_breaker_short_circuits_all_tenants(self, monkeypatch):
+        import homework
+        calls = []
+
+        def broken(url, **kwargs):
+            calls.append(url)
+            return utils.MockResponseGET(
+                http_status=HTTPStatus.SERVICE_UNAVAILABLE
+            )
+
+        monkeypatch.setattr(requests, 'get', broken)
+        breaker = get_breaker(homework.ENDPOINT)
+        before = API_SHORT_CIRCUITS.labels(homework.ENDPOINT).value
+        tenants = [homework.Tenant(f'token{i}', i) for i in range(10)]
+        for tenant in tenants:
+            homework.check_updates(tenant, lambda message: True)
+
+        assert len(calls) == breaker.max_failures
+        assert breaker.state == 'open'
+        assert all(tenant.failures == 1 for tenant in tenants)
+        assert API_SHORT_CIRCUITS.labels(homework.ENDPOINT).value == (
+            before + len(tenants) - breaker.max_failures
+        )
+
+    def test_client_errors_do_not_open(self, monkeypatch):
+        import homework
+        monkeypatch.setattr(requests, 'get', lambda url, **kwargs: (
+            utils.MockResponseGET(http_status=HTTPStatus.UNAUTHORIZED)
+        ))
+        for _ in range(10):
+            with pytest.raises(ConnectionError):
+                homework.get_api_answer(0)
+        assert get_breaker(homework.ENDPOINT).state == 'closed'
@@ -0,0 +1,110 @@
+import asyncio
+import time
+
+import pytest
+import requests
+
+from commands import UNKNOWN_CHAT, CommandHandler
+from homework import Tenant
+
+pytestmark = pytest.mark.usefixtures('requests_get_session')
+
+
+def make_tenant():
+    tenant = Tenant('token', 1)
+    tenant.update_status({'id': 1, 'homework_name': 'hw1',
+                          'status': 'approved'})
+    tenant.update_status({'id': 2, 'homework_name': 'hw2',
+                          'status': 'reviewing'})
+    tenant.record_sent('Изменился статус проверки работы "hw1".')
+    return tenant
+
+
+class FakeBot:
+
+    def __init__(self, batches):
+        self.batches = batches
+        self.offsets = []
+
+    async def get_updates(self, offset=None, timeout=0):
+        self.offsets.append(offset)
+        if self.batches:
+            return self.batches.pop(0)
+        await asyncio.sleep(3600)
+
+
+class FakeSender:
+
+    def __init__(self):
+        self.sent = []
+
+    def submit(self, chat_id, message, on_delivered=None, on_failed=None):
+        self.sent.append((chat_id, message))
+
+
+class TestCommandHandler:
+
+    def test_status(self):
+        handler = CommandHandler(None, [make_tenant()])
+        reply = handler.answer(1, '/status')
+        assert reply.splitlines() == [
+            '"hw1": Работа проверена: ревьюеру всё понравилось. Ура!',
+            '"hw2": Работа взята на проверку ревьюером.',
+        ]
+        assert handler.answer(1, '/status@homework_bot') == reply
+
+    def test_history(self):
+        handler = CommandHandler(None, [make_tenant()])
+        assert handler.answer(1, '/history').endswith(
+            'Изменился статус проверки работы "hw1".'
+        )
+
+    def test_unknown_chat_and_command(self):
+        handler = CommandHandler(None, [make_tenant()])
+        assert handler.answer(2, '/status') == UNKNOWN_CHAT
+        assert '/status' in handler.answer(1, '/unknown')
+        assert handler.answer(1, 'привет') is None
+
+    def test_status_is_fast(self):
+        tenant = Tenant('token', 1)
+        for number in range(1000):
+            tenant.update_status({'id': number,
+                                  'homework_name': f'hw{number}',
+                                  'status': 'approved'})
+        handler = CommandHandler(None, [tenant])
+        started = time.perf_counter()
+        for _ in range(100):
+            handler.answer(1, '/status')
+        assert (time.perf_counter() - started) / 100 < 0.001
+
+    def test_run_answers_without_api_requests(self, monkeypatch):
+        def forbidden_get(*args, **kwargs):
+            raise AssertionError('Команда не должна запрашивать API')
+
+        monkeypatch.setattr(requests, 'get', forbidden_get)
+        bot = FakeBot([[
+            {'update_id': 10,
+             'message': {'chat': {'id': 1}, 'text': '/status'}},
+            {'update_id': 11,
+             'message': {'chat': {'id': 1}, 'text': 'спасибо'}},
+        ]])
+        sender = FakeSender()
+        handler = CommandHandler(bot, [make_tenant()])
+
+        async def run():
+            task = asyncio.create_task(handler.run(sender))
+            await asyncio.sleep(0.01)
+            task.cancel()
+
+        asyncio.run(run())
+        assert bot.offsets == [None, 12]
+        assert len(sender.sent) == 1 and '"hw2"' in sender.sent[0][1]
+
+    @pytest.mark.parametrize('update', [
+        {'update_id': 1},
+        {'update_id': 1, 'message': {'chat': {'id': 1}}},
+    ])
+    def test_update_without_text(self, update):
+        sender = FakeSender()
+        CommandHandler(None, [make_tenant()]).handle(update, sender)
+        assert sender.sent == []
@@ -0,0 +1,67 @@
+import json
+import sys
+import time
+
+import pytest
+
+import decoder
+from homework import check_response
+
+RESPONSE = {
+    'homeworks': [
+        {'id': 2, 'homework_name': 'hw2', 'status': 'approved',
+         'reviewer_comment': 'Скобки {} и "кавычки" в тексте'},
+        {'id': 1, 'homework_name': 'hw1', 'status': 'rejected',
+         'reviewer_comment': ''},
+    ],
+    'current_date': 1654268458,
+}
+
+
+class TestDecoder:
+
+    @pytest.mark.parametrize('lazy', [False, True])
+    def test_decode(self, lazy):
+        body = json.dumps(RESPONSE, ensure_ascii=False).encode()
+        response = decoder.decode(body, lazy=lazy)
+        assert response == RESPONSE
+        assert check_response(response) == RESPONSE['homeworks']
+
+    def test_lazy_homeworks(self):
+        body = json.dumps(RESPONSE).encode()
+        homeworks = decoder.decode(body, lazy=True)['homeworks']
+        assert isinstance(homeworks, decoder.LazyHomeworks)
+        assert len(homeworks) == 2
+        assert homeworks[1]['homework_name'] == 'hw1'
+        assert [homework['id'] for homework in reversed(homeworks)] == [1, 2]
+
+    def test_lazy_empty_homeworks(self):
+        response = decoder.decode(b'{"homeworks": [], "current_date": 1}',
+                                  lazy=True)
+        assert not response['homeworks']
+        assert response['current_date'] == 1
+
+    def test_lazy_nested_objects(self):
+        homeworks = [
+            {'id': 1, 'lesson': {'id': 2, 'tags': ['{', '}']},
+             'scores': list(range(50))},
+            {'id': 2, 'reviewer_comment': 'кавычка \\" и {'},
+        ]
+        body = json.dumps({'homeworks': homeworks}, indent=4).encode()
+        started = time.perf_counter()
+        response = decoder.decode(body, lazy=True)
+        assert isinstance(response['homeworks'], decoder.LazyHomeworks)
+        assert response['homeworks'] == homeworks
+        assert time.perf_counter() - started < 0.1
+
+    def test_lazy_falls_back_on_broken_body(self):
+        with pytest.raises(ValueError):
+            decoder.decode(b'{"homeworks": [{"id": "1}]}', lazy=True)
+        response = decoder.decode(b'{"homeworks": [1, 2]}', lazy=True)
+        assert response['homeworks'] == [1, 2]
+
+    def test_stdlib_backend_without_orjson(self, monkeypatch):
+        monkeypatch.setitem(sys.modules, 'orjson', None)
+        assert decoder.get_backend('auto') is json
+        with pytest.raises(ImportError):
+            decoder.get_backend('orjson')
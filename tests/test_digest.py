@@ -0,0 +1,110 @@
+import itertools
+import time
+from http import HTTPStatus
+
+import pytest
+import requests
+
+import utils
+from digest import ErrorDigest, error_fingerprint
+from exceptions import StatusCodeNotOk
+
+pytestmark = pytest.mark.usefixtures('requests_get_session')
+
+
+def wrapped(error):
+    try:
+        try:
+            raise error
+        except Exception as cause:
+            raise ConnectionError('Ошибка при запросе') from cause
+    except ConnectionError as error:
+        return error
+
+
+class TestErrorFingerprint:
+
+    def test_status_code_is_part_of_fingerprint(self):
+        assert error_fingerprint(wrapped(StatusCodeNotOk(503))) == (
+            'StatusCodeNotOk (503)'
+        )
+        assert error_fingerprint(wrapped(StatusCodeNotOk(502))) == (
+            'StatusCodeNotOk (502)'
+        )
+
+    def test_origin_ignores_message_text(self):
+        from homework import parse_status
+        fingerprints = set()
+        for homework in ({'status': 'approved'},
+                         {'homework_name': 'hw', 'status': 'unknown'}):
+            with pytest.raises(KeyError) as error:
+                parse_status(homework)
+            fingerprints.add(error_fingerprint(error.value))
+        assert fingerprints == {'KeyError (parse_status)'}
+
+
+class TestErrorDigest:
+
+    def test_repeats_are_summarized(self):
+        errors = ErrorDigest(period=60)
+        assert errors.record('A', 0) is True
+        assert errors.record('A', 1) is False
+        assert errors.record('B', 2) is True
+        for moment in range(3, 40):
+            errors.record('A', moment)
+        assert errors.digest(59) is None
+        digest = errors.digest(60)
+        assert ' - A ×38' in digest
+        assert 'B' not in digest
+        assert errors.digest(120) is None
+
+    def test_forgotten_after_ttl(self):
+        errors = ErrorDigest(ttl=10)
+        errors.record('A', 0)
+        assert errors.record('A', 9) is False
+        assert errors.record('A', 19) is True
+
+    def test_table_is_bounded(self):
+        errors = ErrorDigest(size=2)
+        for name in 'ABC':
+            errors.record(name, 0)
+        assert list(errors.entries) == ['B', 'C']
+        assert errors.record('A', 0) is True
+
+
+class TestOutage:
+
+    def test_outage_sends_few_messages(self, monkeypatch):
+        import homework
+        # Сбои API чередуются с ответами без ключа homeworks.
+        codes = itertools.cycle([HTTPStatus.SERVICE_UNAVAILABLE,
+                                 HTTPStatus.OK])
+
+        def get(url, **kwargs):
+            response = utils.MockResponseGET(http_status=next(codes))
+            response.json = lambda: {'current_date': 1}
+            return response
+
+        monkeypatch.setattr(requests, 'get', get)
+        now = [time.time()]
+        tenant = homework.Tenant('token', '1')
+        tenant.errors.clock = lambda: now[0]
+        sent = []
+
+        def notify(message):
+            sent.append(message)
+            return True
+
+        # Два часа опросов раз в минуту.
+        for _ in range(120):
+            homework.check_updates(tenant, notify)
+            now[0] += 60
+
+        failures = [message for message in sent
+                    if message.startswith('Сбой')]
+        digests = [message for message in sent
+                   if message.startswith('Повторы')]
+        assert len(failures) == 2
+        assert len(digests) == 1
+        assert 'StatusCodeNotOk (503) ×30' in digests[0]
+        assert 'KeyError (check_response) ×29' in digests[0]
@@ -0,0 +1,208 @@
+import asyncio
+import json
+import threading
+import time
+from http import HTTPStatus
+
+import pytest
+import requests
+
+import utils
+from scheduler import Scheduler
+from sender import OutboundQueue
+
+pytestmark = pytest.mark.usefixtures('requests_get_session')
+
+
+def fast_scheduler():
+    return Scheduler(period=0, reviewing_period=0, idle_period=0)
+
+
+def mock_response_get_for_tokens(data_by_token):
+    def mocked_response(url, headers=None, **kwargs):
+        token = headers['Authorization'].split()[1]
+        response = utils.MockResponseGET(http_status=HTTPStatus.OK)
+        response.json = lambda: data_by_token[token]
+        return response
+    return mocked_response
+
+
+class TestEngine:
+
+    def test_load_tenants(self, tmp_path):
+        import engine
+        path = tmp_path / 'tenants.json'
+        path.write_text(json.dumps([
+            {'practicum_token': 'token1', 'chat_id': '1'},
+            {'practicum_token': 'token2', 'chat_id': '2'},
+        ]))
+        tenants = engine.load_tenants(path)
+        assert [tenant.chat_id for tenant in tenants] == ['1', '2']
+        assert tenants[1].headers == {'Authorization': 'OAuth token2'}
+
+    def test_load_tenants_without_chat_id(self, tmp_path):
+        import engine
+        path = tmp_path / 'tenants.json'
+        path.write_text(json.dumps([{'practicum_token': 'token1'}]))
+        with pytest.raises(KeyError):
+            engine.load_tenants(path)
+
+    def test_serve_notifies_every_tenant(self, monkeypatch):
+        import engine
+        data_by_token = {
+            f'token{i}': {
+                'homeworks': [{'homework_name': f'hw{i}',
+                               'status': 'approved'}],
+                'current_date': 123246
+            }
+            for i in range(20)
+        }
+        monkeypatch.setattr(
+            requests, 'get', mock_response_get_for_tokens(data_by_token)
+        )
+        sent = {}
+        bot = utils.MockTelegramBot()
+        bot.send_message = lambda chat_id, text: sent.setdefault(chat_id, text)
+        tenants = [engine.Tenant(f'token{i}', str(i)) for i in range(20)]
+
+        asyncio.run(engine.serve(bot, tenants, scheduler=fast_scheduler(),
+                                 concurrency=4, cycles=1))
+
+        assert len(sent) == 20
+        assert '"hw7"' in sent['7']
+
+    def test_serve_respects_concurrency(self, monkeypatch):
+        import engine
+        lock = threading.Lock()
+        active = []
+        peak = []
+
+        def slow_get(*args, **kwargs):
+            with lock:
+                active.append(1)
+                peak.append(len(active))
+            time.sleep(0.01)
+            with lock:
+                active.pop()
+            response = utils.MockResponseGET(http_status=HTTPStatus.OK)
+            return response
+
+        monkeypatch.setattr(requests, 'get', slow_get)
+        tenants = [engine.Tenant(f'token{i}', str(i)) for i in range(30)]
+
+        asyncio.run(engine.serve(utils.MockTelegramBot(), tenants,
+                                 scheduler=fast_scheduler(),
+                                 concurrency=3, cycles=1))
+
+        assert max(peak) <= 3
+
+    def test_cursor_follows_current_date(self, monkeypatch, tmp_path):
+        import engine
+        from state import StateStore
+        requested = []
+
+        def mock_get(*args, params=None, **kwargs):
+            requested.append(params['from_date'])
+            response = utils.MockResponseGET(
+                random_timestamp=1000 + len(requested),
+                http_status=HTTPStatus.OK
+            )
+            return response
+
+        monkeypatch.setattr(requests, 'get', mock_get)
+        store = StateStore(tmp_path / 'state.db')
+        tenant = engine.Tenant('token', '1', timestamp=500)
+
+        asyncio.run(engine.serve(utils.MockTelegramBot(), [tenant], store,
+                                 scheduler=fast_scheduler(), cycles=2))
+        assert requested == [500, 1001]
+
+        restarted = engine.Tenant('token', '1')
+        store.restore([restarted])
+        assert restarted.timestamp == 1002
+
+    def test_every_changed_homework_is_notified(self, monkeypatch):
+        import engine
+        responses = [
+            [{'id': 1, 'homework_name': 'hw1', 'status': 'reviewing'},
+             {'id': 2, 'homework_name': 'hw2', 'status': 'reviewing'}],
+            [{'id': 1, 'homework_name': 'hw1', 'status': 'reviewing'},
+             {'id': 2, 'homework_name': 'hw2', 'status': 'reviewing'}],
+            [{'id': 2, 'homework_name': 'hw2', 'status': 'approved'}],
+        ]
+
+        def mock_get(*args, **kwargs):
+            response = utils.MockResponseGET(http_status=HTTPStatus.OK)
+            data = {'homeworks': responses.pop(0), 'current_date': 1}
+            response.json = lambda: data
+            return response
+
+        monkeypatch.setattr(requests, 'get', mock_get)
+        sent = []
+        bot = utils.MockTelegramBot()
+        bot.send_message = lambda chat_id, text: sent.append(text)
+        tenant = engine.Tenant('token', '1')
+
+        asyncio.run(engine.serve(bot, [tenant], scheduler=fast_scheduler(),
+                                 sender=OutboundQueue(bot, chat_rate=1000),
+                                 cycles=3))
+
+        assert len(sent) == 3
+        assert '"hw2"' in sent[0] and '"hw1"' in sent[1]
+        assert '"hw2"' in sent[2] and 'ревьюеру всё понравилось' in sent[2]
+        assert tenant.statuses == {'1': 'reviewing', '2': 'approved'}
+
+    def test_unchanged_response_is_not_parsed(self, monkeypatch):
+        import engine
+        import homework
+        checked = []
+        check_response = homework.check_response
+
+        def counting_check_response(response):
+            checked.append(response)
+            return check_response(response)
+
+        def mock_get(*args, params=None, **kwargs):
+            response = utils.MockResponseGET(http_status=HTTPStatus.OK)
+            data = {'homeworks': [{'id': 1, 'homework_name': 'hw1',
+                                   'status': 'reviewing'}],
+                    'current_date': params['from_date'] + 1}
+            response.json = lambda: data
+            return response
+
+        monkeypatch.setattr(homework, 'check_response',
+                            counting_check_response)
+        monkeypatch.setattr(requests, 'get', mock_get)
+        tenant = engine.Tenant('token', '1', timestamp=100)
+
+        asyncio.run(engine.serve(utils.MockTelegramBot(), [tenant],
+                                 scheduler=fast_scheduler(), cycles=3))
+
+        assert len(checked) == 1
+        assert tenant.timestamp == 103
+
+    def test_outbox_is_committed_before_state(self, monkeypatch, tmp_path):
+        import engine
+        from outbox import Outbox
+        from state import StateStore
+        monkeypatch.setattr(requests, 'get', mock_response_get_for_tokens({
+            'token': {'homeworks': [{'id': 1, 'homework_name': 'hw',
+                                     'status': 'approved'}],
+                      'current_date': 1000}
+        }))
+        path = tmp_path / 'outbox.jsonl'
+        outbox = Outbox(str(path), sync_interval=60)
+        store = StateStore(tmp_path / 'state.db')
+        journal_at_flush = []
+        flush = store.flush
+
+        def checked_flush(tenants):
+            journal_at_flush.append(path.read_text(encoding='utf-8'))
+            flush(tenants)
+
+        store.flush = checked_flush
+        tenant = engine.Tenant('token', '1', timestamp=500)
+        asyncio.run(engine.serve(utils.MockTelegramBot(), [tenant], store,
+                                 scheduler=fast_scheduler(), cycles=1,
+                                 outbox=outbox))
+        assert '"op": "add"' in journal_at_flush[0]
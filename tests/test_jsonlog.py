@@ -0,0 +1,100 @@
+import io
+import json
+import logging
+import os
+import queue
+import subprocess
+import sys
+
+from jsonlog import (CYCLE, TENANT, QueueHandler, configure_logging,
+                     queue_handler)
+from metrics import LOG_RECORDS_DROPPED
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def make_logger(handler):
+    logger = logging.getLogger(f'test_jsonlog.{id(handler)}')
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+    logger.addHandler(handler)
+    return logger
+
+
+class TestQueueLogging:
+
+    def test_records_are_json_with_context(self):
+        stream = io.StringIO()
+        handler = queue_handler(stream)
+        logger = make_logger(handler)
+        tenant, cycle = TENANT.set('42'), CYCLE.set(7)
+        try:
+            logger.info('Опрос %s', 'начат')
+        finally:
+            TENANT.reset(tenant)
+            CYCLE.reset(cycle)
+        try:
+            raise ValueError('сбой')
+        except ValueError:
+            logger.exception('Ошибка')
+        handler.listener.stop()
+
+        first, second = map(json.loads, stream.getvalue().splitlines())
+        assert first['message'] == 'Опрос начат'
+        assert first['level'] == 'INFO'
+        assert (first['tenant'], first['cycle']) == ('42', 7)
+        assert second['tenant'] is None
+        assert 'ValueError: сбой' in second['exception']
+
+    def test_overflow_drops_debug_first(self):
+        records = queue.Queue(4)
+        logger = make_logger(QueueHandler(records, debug_fill=0.5))
+        dropped = LOG_RECORDS_DROPPED.labels('DEBUG').value
+
+        for number in range(3):
+            logger.debug(f'debug {number}')
+        for number in range(3):
+            logger.info(f'info {number}')
+
+        kept = [records.get_nowait().message for _ in range(4)]
+        assert kept == ['debug 0', 'debug 1', 'info 0', 'info 1']
+        assert LOG_RECORDS_DROPPED.labels('DEBUG').value == dropped + 1
+
+    def test_check_updates_logs_tenant(self, monkeypatch):
+        import homework
+        tenants = []
+
+        def request_api(*args):
+            tenants.append(TENANT.get())
+            return None
+
+        monkeypatch.setattr(homework, 'request_api', request_api)
+        homework.check_updates(homework.Tenant('token', '5'), print)
+        assert tenants == ['5']
+        assert TENANT.get() is None
+
+    def test_async_mode_flushes_on_exit(self):
+        output = subprocess.run(
+            [sys.executable, '-c',
+             'import homework, jsonlog; jsonlog.configure_logging(); '
+             'homework.logger.debug("последняя запись")'],
+            cwd=ROOT_DIR, capture_output=True, text=True, check=True,
+            env=dict(os.environ, LOG_ASYNC='1'),
+        ).stdout
+        assert json.loads(output)['message'] == 'последняя запись'
+
+    def test_configure_logging_collects_module_records(self):
+        import engine  # noqa: F401 - модули создают свои логгеры
+        stream = io.StringIO()
+        handler = configure_logging(stream)
+        assert configure_logging(stream) is handler
+        assert logging.getLogger().handlers.count(handler) == 1
+        names = ('homework', 'breaker', 'tracing', 'transport', 'sender',
+                 'outbox', 'commands', 'aiotransport', 'engine')
+        for name in names:
+            assert sys.modules[name].logger is logging.getLogger(name)
+            sys.modules[name].logger.debug(f'запись {name}')
+        logging.getLogger('urllib3.connectionpool').debug('шум')
+        output = stream.getvalue()
+        assert all(f'запись {name}' in output for name in names)
+        assert 'шум' not in output
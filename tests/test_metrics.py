@@ -0,0 +1,81 @@
+import urllib.request
+from http import HTTPStatus
+
+import pytest
+import requests
+
+import metrics
+import utils
+from exceptions import InvalidHomeworks
+
+pytestmark = pytest.mark.usefixtures('requests_get_session')
+
+
+def value(metric, *labels):
+    return metric.labels(*labels).value
+
+
+class TestMetrics:
+
+    def test_render(self):
+        registry = metrics.Registry()
+        counter = metrics.Counter('test_total', 'Счётчик', ['code'],
+                                  registry=registry)
+        histogram = metrics.Histogram('test_seconds', 'Время',
+                                      buckets=(0.1, 1), registry=registry)
+        counter.labels(200).inc()
+        counter.labels(200).inc()
+        histogram.observe(0.05)
+        histogram.observe(0.5)
+        histogram.observe(5)
+
+        text = registry.render()
+
+        assert '# TYPE test_total counter' in text
+        assert 'test_total{code="200"} 2' in text
+        assert 'test_seconds_bucket{le="0.1"} 1' in text
+        assert 'test_seconds_bucket{le="1"} 2' in text
+        assert 'test_seconds_bucket{le="+Inf"} 3' in text
+        assert 'test_seconds_count 3' in text
+
+    def test_http_server(self):
+        server = metrics.start_http_server(0, host='127.0.0.1')
+        url = f'http://127.0.0.1:{server.server_port}/metrics'
+        with urllib.request.urlopen(url) as response:
+            body = response.read().decode()
+        server.shutdown()
+        assert 'homework_api_request_seconds_bucket' in body
+
+    def test_api_status_codes_are_counted(self, monkeypatch,
+                                          homework_module):
+        monkeypatch.setattr(
+            requests, 'get',
+            lambda *args, **kwargs: utils.MockResponseGET(
+                http_status=HTTPStatus.UNAUTHORIZED
+            )
+        )
+        before = value(metrics.API_RESPONSES, 401)
+        with pytest.raises(ConnectionError):
+            homework_module.get_api_answer(0)
+        assert value(metrics.API_RESPONSES, 401) == before + 1
+
+    def test_validation_failures_are_counted(self, homework_module):
+        tenant = homework_module.Tenant('token', '1')
+        before = value(metrics.VALIDATION_FAILURES, 'parse_status')
+        with pytest.raises(InvalidHomeworks):
+            homework_module.process_response(
+                tenant, {'homeworks': [{'homework_name': 'hw'}]},
+                lambda message: True
+            )
+        assert value(metrics.VALIDATION_FAILURES, 'parse_status') == (
+            before + 1
+        )
+
+    def test_deduplicated_messages_are_counted(self, homework_module):
+        tenant = homework_module.Tenant('token', '1')
+        response = {'homeworks': [{'homework_name': 'hw',
+                                   'status': 'approved'}]}
+        before = metrics.MESSAGES_DEDUPLICATED.labels().value
+        homework_module.process_response(tenant, response, lambda m: True)
+        homework_module.process_response(tenant, response, lambda m: True)
+        assert metrics.MESSAGES_DEDUPLICATED.labels().value == before + 1
@@ -0,0 +1,203 @@
+import asyncio
+import os
+
+import pytest
+
+import telegram
+
+import utils
+from exceptions import OutboxLocked
+from outbox import Outbox, outbox_path
+from sender import OutboundQueue
+
+pytestmark = pytest.mark.usefixtures('requests_get_session')
+
+
+def make_sender(fail_times=0, error=telegram.error.TimedOut):
+    bot = utils.MockTelegramBot()
+    bot.sent = []
+
+    def send_message(chat_id, text):
+        if send_message.failures < fail_times:
+            send_message.failures += 1
+            raise error()
+        bot.sent.append((chat_id, text))
+
+    send_message.failures = 0
+    bot.send_message = send_message
+    return bot, OutboundQueue(bot, rate=1000, chat_rate=1000)
+
+
+async def drain(outbox, sender, seconds=0.2):
+    await sender.start()
+    task = asyncio.create_task(outbox.run(sender))
+    await asyncio.sleep(seconds)
+    task.cancel()
+    await outbox.close(sender)
+
+
+class TestOutbox:
+
+    def test_delivered_messages_are_not_replayed(self, tmp_path):
+        path = str(tmp_path / 'outbox.jsonl')
+        outbox = Outbox(path, sync_interval=0.01)
+        delivered = []
+        outbox.add('1', 'first', delivered.append)
+        outbox.add('2', 'second')
+        bot, sender = make_sender()
+
+        asyncio.run(drain(outbox, sender))
+
+        assert sorted(bot.sent) == [('1', 'first'), ('2', 'second')]
+        assert delivered == ['first']
+        assert Outbox(path).pending == {}
+
+    def test_pending_messages_are_replayed_after_crash(self, tmp_path):
+        path = str(tmp_path / 'outbox.jsonl')
+        outbox = Outbox(path)
+        outbox.add('1', 'lost on crash')
+        outbox.commit()
+        with open(path, 'a', encoding='utf-8') as file:
+            file.write('{"op": "add", "id": 2, "chat')
+        # Блокировку упавшего процесса снимает система.
+        outbox.release()
+
+        restarted = Outbox(path, sync_interval=0.01)
+        assert [entry.message for entry in restarted.pending.values()] == [
+            'lost on crash'
+        ]
+        bot, sender = make_sender()
+        asyncio.run(drain(restarted, sender))
+        assert bot.sent == [('1', 'lost on crash')]
+
+    def test_failed_message_is_retried(self, tmp_path):
+        outbox = Outbox(str(tmp_path / 'outbox.jsonl'), sync_interval=0.01,
+                        retry_delay=0.05)
+        outbox.add('1', 'message')
+        bot, sender = make_sender(fail_times=2)
+
+        asyncio.run(drain(outbox, sender, seconds=0.5))
+
+        assert bot.sent == [('1', 'message')]
+        assert outbox.pending == {}
+
+    def test_rejected_message_is_dropped(self, tmp_path):
+        outbox = Outbox(str(tmp_path / 'outbox.jsonl'), sync_interval=0.01)
+        outbox.add('1', 'message')
+        bot, sender = make_sender(
+            fail_times=1,
+            error=lambda: telegram.error.BadRequest('Chat not found')
+        )
+
+        asyncio.run(drain(outbox, sender))
+
+        assert bot.sent == []
+        assert outbox.pending == {}
+
+    def test_group_commit(self, tmp_path, monkeypatch):
+        fsync_calls = []
+        fsync = os.fsync
+        monkeypatch.setattr(
+            os, 'fsync', lambda fd: fsync_calls.append(fd) or fsync(fd)
+        )
+        outbox = Outbox(str(tmp_path / 'outbox.jsonl'), sync_interval=0.05)
+        for number in range(2000):
+            outbox.add(str(number), 'message')
+        bot, sender = make_sender()
+
+        asyncio.run(drain(outbox, sender, seconds=0.3))
+
+        assert len(bot.sent) == 2000
+        assert len(fsync_calls) < 20
+
+    def test_compaction(self, tmp_path):
+        path = str(tmp_path / 'outbox.jsonl')
+        outbox = Outbox(path, sync_interval=0.01, compact_after=10)
+        for number in range(50):
+            outbox.add('1', f'message {number}')
+        bot, sender = make_sender()
+
+        asyncio.run(drain(outbox, sender, seconds=0.3))
+
+        assert len(bot.sent) == 50
+        with open(path, encoding='utf-8') as file:
+            assert len(file.readlines()) < 50
+
+    def test_second_process_is_refused(self, tmp_path):
+        path = str(tmp_path / 'outbox.jsonl')
+        outbox = Outbox(path)
+        outbox.add('1', 'pending')
+        outbox.commit()
+        with pytest.raises(OutboxLocked):
+            Outbox(path)
+        outbox.add('1', 'after refusal')
+        outbox.commit()
+        outbox.release()
+        assert [entry.message for entry in Outbox(path).pending.values()] == [
+            'pending', 'after refusal'
+        ]
+
+    def test_orphaned_journals_are_adopted(self, tmp_path):
+        base = str(tmp_path / 'outbox.jsonl')
+        orphan = Outbox(outbox_path('host:1', base))
+        orphan.add('1', 'orphaned')
+        orphan.commit()
+        orphan.release()
+        alive = Outbox(outbox_path('host:2', base))
+        alive.add('2', 'alive')
+        alive.commit()
+
+        outbox = Outbox(outbox_path('host:3', base))
+        assert outbox.adopt_orphans(base) == 1
+        assert [(entry.chat_id, entry.message)
+                for entry in outbox.ready] == [('1', 'orphaned')]
+        assert sorted(os.listdir(tmp_path)) == [
+            'outbox-host_2.jsonl', 'outbox-host_2.jsonl.lock',
+            'outbox-host_3.jsonl', 'outbox-host_3.jsonl.lock',
+        ]
+        outbox.release()
+        assert [entry.message for entry in Outbox(
+            outbox_path('host:3', base)
+        ).pending.values()] == ['orphaned']
+
+    def test_path_per_worker(self):
+        assert outbox_path(None, 'outbox.jsonl') == 'outbox.jsonl'
+        assert outbox_path('host:42', 'data/outbox.jsonl') == (
+            'data/outbox-host_42.jsonl'
+        )
+
+
+class TestSyncDelivery:
+
+    def test_failed_send_is_retried_on_next_poll(self, monkeypatch):
+        import requests
+
+        import homework
+
+        def get(*args, **kwargs):
+            response = utils.MockResponseGET(http_status=200)
+            response.json = lambda: {
+                'homeworks': [{'id': 1, 'homework_name': 'hw',
+                               'status': 'approved'}],
+                'current_date': 200
+            }
+            return response
+
+        monkeypatch.setattr(requests, 'get', get)
+        tenant = homework.Tenant('token', '1', timestamp=100)
+        attempts = []
+
+        def notify(message):
+            attempts.append(message)
+            return len(attempts) > 1
+
+        homework.check_updates(tenant, notify)
+        assert tenant.timestamp == 100
+        assert tenant.statuses == {}
+        homework.check_updates(tenant, notify)
+        assert len(attempts) == 2 and attempts[0] == attempts[1]
+        assert tenant.timestamp == 200
+        assert tenant.statuses == {'1': 'approved'}
+        assert [message for message, _ in tenant.history] == attempts[1:]
+        homework.check_updates(tenant, notify)
+        assert len(attempts) == 2
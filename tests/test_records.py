@@ -0,0 +1,63 @@
+import sys
+
+from records import HomeworkTable, StatusCodes, parse_timestamp
+
+STATUSES = ('approved', 'reviewing', 'rejected')
+
+
+def make_table():
+    return HomeworkTable(StatusCodes(STATUSES))
+
+
+class TestStatusCodes:
+
+    def test_known_statuses_keep_order(self):
+        codes = StatusCodes(STATUSES)
+        assert [codes.code(status) for status in STATUSES] == [0, 1, 2]
+        assert codes.code('unknown') == 3
+        assert codes.status(3) == 'unknown'
+
+
+class TestHomeworkTable:
+
+    def test_behaves_like_dict(self):
+        table = make_table()
+        table['20'] = 'reviewing'
+        table['3'] = 'approved'
+        table['hw'] = 'rejected'
+        table['20'] = 'approved'
+        assert table == {'3': 'approved', '20': 'approved', 'hw': 'rejected'}
+        assert list(table) == ['3', '20', 'hw']
+        assert table.get('4') is None
+        assert '20' in table and '4' not in table
+        del table['3']
+        del table['hw']
+        assert table == {'20': 'approved'}
+
+    def test_names_and_timestamps(self):
+        table = make_table()
+        table.set('1', 'reviewing', 'hw01.zip', 100)
+        table.set('2', 'approved')
+        table.set('1', 'approved', 'hw01_v2.zip', 200)
+        assert table.name('1') == 'hw01_v2.zip'
+        assert table.name('2') == '2'
+        assert table.updated_at('1') == 200
+        assert table.last(1) == [('2', 'approved', '2')]
+        assert table.has_status('approved')
+        assert not table.has_status('reviewing')
+
+    def test_compact(self):
+        table = make_table()
+        for number in range(10000):
+            table.set(str(10 ** 6 + number), 'approved',
+                      f'student__hw{number}.zip', 1654267257)
+        columns = (table.ids, table.statuses, table.updated, table.offsets,
+                   table.lengths, table.names)
+        size = sum(sys.getsizeof(column) for column in columns)
+        assert size / len(table) < 64
+
+
+def test_parse_timestamp():
+    assert parse_timestamp('2022-06-03T14:40:57Z') == 1654267257
+    assert isinstance(parse_timestamp(None), int)
+    assert isinstance(parse_timestamp('2022-06-03'), int)
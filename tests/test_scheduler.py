@@ -0,0 +1,62 @@
+import random
+from types import SimpleNamespace
+
+from scheduler import Scheduler
+
+
+def make_tenant(failures=0, last_status=None, changed_at=None):
+    return SimpleNamespace(failures=failures, last_status=last_status,
+                           changed_at=changed_at)
+
+
+class TestScheduler:
+
+    def test_reviewing_is_polled_more_often(self):
+        scheduler = Scheduler(period=600, reviewing_period=120,
+                              rng=random.Random(0))
+        reviewing = scheduler.delay(make_tenant(last_status='reviewing'))
+        approved = scheduler.delay(make_tenant(last_status='approved'))
+        assert reviewing < 150 < 500 < approved
+
+    def test_idle_tenant_is_polled_rarely(self):
+        scheduler = Scheduler(period=600, idle_period=1800, idle_after=100,
+                              rng=random.Random(0))
+        tenant = make_tenant(last_status='approved', changed_at=0)
+        assert scheduler.delay(tenant, now=1000) > 1500
+
+    def test_backoff_grows_and_is_capped(self):
+        scheduler = Scheduler(period=600, max_backoff=3600,
+                              rng=random.Random(0))
+        delays = [scheduler.delay(make_tenant(failures=failures))
+                  for failures in range(1, 10)]
+        assert 300 <= delays[0] <= 600
+        assert 1200 <= delays[2] <= 2400
+        assert all(1800 <= delay <= 3600 for delay in delays[4:])
+
+    def test_quota_limits_interval(self):
+        scheduler = Scheduler(period=600, quota=1, rng=random.Random(0))
+        scheduler.add([make_tenant() for _ in range(1200)], now=0)
+        assert scheduler.min_interval == 1200
+        assert scheduler.delay(make_tenant()) > 1000
+
+    def test_tenants_are_spread_over_period(self):
+        scheduler = Scheduler(period=600)
+        tenants = [make_tenant() for _ in range(6)]
+        scheduler.add(tenants, now=0)
+        assert scheduler.pop_due(0) == tenants[:1]
+        assert scheduler.wait_time(0) == 100
+        assert scheduler.pop_due(250) == tenants[1:3]
+
+    def test_discarded_tenant_is_not_polled(self):
+        scheduler = Scheduler(period=10, rng=random.Random(0))
+        kept, dropped, in_flight = make_tenant(), make_tenant(), make_tenant()
+        scheduler.add([in_flight, kept, dropped], now=0)
+        assert scheduler.pop_due(0) == [in_flight]
+        scheduler.discard([dropped, in_flight])
+        scheduler.reschedule([in_flight], now=0)
+        assert scheduler.size == 1
+        assert scheduler.pop_due(100) == [kept]
+
+        scheduler.add([dropped], now=100)
+        scheduler.add([dropped], now=100)
+        assert scheduler.pop_due(200) == [dropped]
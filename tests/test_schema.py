@@ -0,0 +1,108 @@
+import pytest
+
+from exceptions import InvalidHomeworks
+from schema import Field, get_validator
+
+FIELDS = (
+    Field('homework_name', missing='нет имени'),
+    Field('status', choices=frozenset({'approved', 'reviewing'}),
+          missing='нет статуса', invalid='неизвестный статус'),
+    Field('id', types=(int,), required=False, invalid='неверный id'),
+)
+
+
+class TestValidator:
+
+    def test_collects_all_errors_in_one_pass(self):
+        validate = get_validator(FIELDS)
+        entries = [
+            {'homework_name': 'a', 'status': 'approved', 'id': 1},
+            'строка',
+            {'status': 'approved'},
+            {'homework_name': 'b'},
+            {'homework_name': 'c', 'status': 'unknown'},
+            {'homework_name': 'd', 'status': 'reviewing', 'id': 'x'},
+            {'homework_name': 'e', 'status': 'reviewing'},
+        ]
+        errors = []
+        valid = list(validate(entries, errors))
+        assert [entry['homework_name'] for entry in valid] == ['a', 'e']
+        assert [(index, type(error), error.args[0][:11])
+                for index, error in errors] == [
+            (1, TypeError, 'Запись долж'),
+            (2, KeyError, 'нет имени'),
+            (3, KeyError, 'нет статуса'),
+            (4, KeyError, 'неизвестный'),
+            (5, TypeError, 'неверный id'),
+        ]
+
+    def test_unhashable_value_is_entry_error(self):
+        validate = get_validator(FIELDS)
+        entries = [
+            {'homework_name': 'a', 'status': ['approved']},
+            {'homework_name': 'b', 'status': {'x': 1}},
+            {'homework_name': 'c', 'status': 'approved'},
+        ]
+        errors = []
+        valid = list(validate(entries, errors))
+        assert [entry['homework_name'] for entry in valid] == ['c']
+        assert [(index, error.args[0]) for index, error in errors] == [
+            (0, 'неизвестный статус'), (1, 'неизвестный статус'),
+        ]
+
+    def test_compiled_once(self):
+        assert get_validator(FIELDS) is get_validator(list(FIELDS))
+        assert 'def validate(' in get_validator(FIELDS).source
+
+
+class TestProcessResponse:
+
+    def test_valid_homeworks_proceed(self, homework_module):
+        tenant = homework_module.Tenant('token', '1')
+        sent = []
+        response = {
+            'homeworks': [
+                {'id': 3, 'homework_name': 'hw3', 'status': 'approved'},
+                {'id': 2, 'homework_name': 'hw2', 'status': 'unknown'},
+                {'id': 1, 'homework_name': 'hw1', 'status': 'reviewing'},
+            ],
+            'current_date': 100,
+        }
+        with pytest.raises(InvalidHomeworks) as error:
+            homework_module.process_response(tenant, response, sent.append)
+        assert len(sent) == 2
+        assert tenant.statuses == {'1': 'reviewing', '3': 'approved'}
+        assert tenant.timestamp == 100
+        assert [index for index, _ in error.value.errors] == [1]
+        assert '1 из 3 работ' in str(error.value)
+
+    def test_unhashable_status_does_not_block_batch(self, homework_module):
+        tenant = homework_module.Tenant('token', '1')
+        sent = []
+        response = {
+            'homeworks': [
+                {'id': 2, 'homework_name': 'hw2', 'status': ['x']},
+                {'id': 1, 'homework_name': 'hw1', 'status': 'approved'},
+            ],
+            'current_date': 100,
+        }
+        with pytest.raises(InvalidHomeworks):
+            homework_module.process_response(tenant, response, sent.append)
+        assert len(sent) == 1
+        assert tenant.statuses == {'1': 'approved'}
+        assert tenant.timestamp == 100
+
+    def test_matches_parse_status(self, homework_module):
+        homework = {'homework_name': 'hw', 'status': 'rejected'}
+        errors = []
+        valid = list(homework_module.validate_homeworks([homework], errors))
+        assert homework_module.status_message(valid[0]) == (
+            homework_module.parse_status(homework)
+        )
+        for broken in ({'status': 'approved'}, {'homework_name': 'hw'},
+                       {'homework_name': 'hw', 'status': 'unknown'}):
+            with pytest.raises(KeyError) as expected:
+                homework_module.parse_status(broken)
+            errors = []
+            list(homework_module.validate_homeworks([broken], errors))
+            assert errors[0][1].args == expected.value.args
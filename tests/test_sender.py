@@ -0,0 +1,84 @@
+import asyncio
+import time
+
+import telegram
+
+import utils
+from sender import OutboundQueue, TokenBucket
+
+
+async def deliver(queue, messages):
+    delivered = []
+    await queue.start()
+    for chat_id, message in messages:
+        queue.submit(chat_id, message, delivered.append)
+    await queue.stop()
+    return delivered
+
+
+class TestTokenBucket:
+
+    def test_reserve_waits_when_empty(self):
+        bucket = TokenBucket(rate=2, capacity=2, now=0)
+        assert bucket.reserve(0) == 0
+        assert bucket.reserve(0) == 0
+        assert bucket.reserve(0) == 0.5
+        assert bucket.reserve(0) == 1
+
+    def test_refill(self):
+        bucket = TokenBucket(rate=1, capacity=1, now=0)
+        assert bucket.reserve(0) == 0
+        assert bucket.reserve(1) == 0
+        assert not bucket.is_full(1)
+        assert bucket.is_full(2)
+
+    def test_pause(self):
+        bucket = TokenBucket(rate=1, capacity=1, now=0)
+        bucket.pause(0, 3)
+        assert bucket.reserve(0) == 4
+
+
+class TestOutboundQueue:
+
+    def test_chat_rate_is_respected(self):
+        bot = utils.MockTelegramBot()
+        sent = []
+        bot.send_message = lambda chat_id, text: sent.append(
+            (chat_id, text, time.monotonic())
+        )
+        queue = OutboundQueue(bot, rate=1000, chat_rate=10)
+        messages = [('1', f'm{i}') for i in range(4)] + [('2', 'other')]
+
+        delivered = asyncio.run(deliver(queue, messages))
+
+        assert sorted(delivered) == ['m0', 'm1', 'm2', 'm3', 'other']
+        times = [moment for chat_id, _, moment in sent if chat_id == '1']
+        assert times[-1] - times[0] >= 0.29
+
+    def test_retry_after_is_honored(self):
+        bot = utils.MockTelegramBot()
+        calls = []
+
+        def send_message(chat_id, text):
+            calls.append(time.monotonic())
+            if len(calls) == 1:
+                raise telegram.error.RetryAfter(0.2)
+
+        bot.send_message = send_message
+        queue = OutboundQueue(bot, chat_rate=1000)
+
+        delivered = asyncio.run(deliver(queue, [('1', 'message')]))
+
+        assert delivered == ['message']
+        assert calls[1] - calls[0] >= 0.19
+
+    def test_telegram_error_is_not_delivered(self):
+        bot = utils.MockTelegramBot()
+
+        def send_message(chat_id, text):
+            raise telegram.error.TelegramError('Something wrong')
+
+        bot.send_message = send_message
+        queue = OutboundQueue(bot)
+
+        assert asyncio.run(deliver(queue, [('1', 'message')])) == []
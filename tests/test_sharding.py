@@ -0,0 +1,97 @@
+import asyncio
+from collections import Counter
+from http import HTTPStatus
+
+import pytest
+import requests
+
+import utils
+from homework import Tenant
+from scheduler import Scheduler
+from sharding import HashRing, Shard, ShardRegistry
+
+pytestmark = pytest.mark.usefixtures('requests_get_session')
+
+
+def make_tenants(count):
+    return [Tenant(f'token{number}', str(number)) for number in range(count)]
+
+
+class TestHashRing:
+
+    def test_tenants_are_spread_evenly(self):
+        ring = HashRing(['a', 'b', 'c', 'd'])
+        owners = Counter(ring.owner(f'key{number}')
+                         for number in range(10000))
+        assert set(owners) == {'a', 'b', 'c', 'd'}
+        assert all(1800 < count < 3200 for count in owners.values())
+
+    def test_new_worker_moves_few_tenants(self):
+        keys = [f'key{number}' for number in range(10000)]
+        before = HashRing(['a', 'b', 'c'])
+        after = HashRing(['a', 'b', 'c', 'd'])
+        moved = [key for key in keys if before.owner(key) != after.owner(key)]
+        assert all(after.owner(key) == 'd' for key in moved)
+        assert 1500 < len(moved) < 3500
+
+
+class TestShard:
+
+    def test_registry_expires_silent_workers(self, tmp_path):
+        registry = ShardRegistry(tmp_path / 'shards.db', ttl=10)
+        registry.heartbeat('a', 100)
+        registry.heartbeat('b', 95)
+        assert registry.alive(100) == ['a', 'b']
+        assert registry.alive(106) == ['a']
+        registry.leave('a')
+        assert registry.alive(100) == ['b']
+
+    def test_rebalance_hands_tenants_over(self, tmp_path):
+        tenants = make_tenants(200)
+        path = tmp_path / 'shards.db'
+        first = Shard(ShardRegistry(path), tenants, worker='a', interval=1)
+        second = Shard(ShardRegistry(path), tenants, worker='b', interval=1)
+
+        assert first.rebalance(0) == ([], [])
+        acquired, _ = first.rebalance(2)
+        assert len(acquired) == 200
+
+        assert second.rebalance(3) == ([], [])
+        _, released = first.rebalance(3)
+        acquired, _ = second.rebalance(5)
+        assert set(acquired) == set(released) and 50 < len(acquired) < 150
+        assert first.owned | second.owned == {tenant.key
+                                              for tenant in tenants}
+        assert not first.owned & second.owned
+
+        second.leave()
+        first.rebalance(6)
+        assert first.rebalance(8)[0] and len(first.owned) == 200
+
+    def test_serve_polls_own_shard(self, monkeypatch, tmp_path):
+        import engine
+
+        requested = []
+
+        def mock_get(url, headers=None, **kwargs):
+            requested.append(headers['Authorization'])
+            return utils.MockResponseGET(http_status=HTTPStatus.OK)
+
+        monkeypatch.setattr(requests, 'get', mock_get)
+        tenants = make_tenants(20)
+        registry = ShardRegistry(tmp_path / 'shards.db')
+        registry.heartbeat('other', 10 ** 10)
+        shard = Shard(registry, tenants, worker='me', interval=0.01)
+
+        asyncio.run(engine.serve(
+            utils.MockTelegramBot(), tenants,
+            scheduler=Scheduler(period=0, reviewing_period=0,
+                                idle_period=0),
+            cycles=1, shard=shard
+        ))
+
+        mine = {tenant.headers['Authorization'] for tenant in tenants
+                if tenant.key in shard.owned}
+        assert 0 < len(mine) < 20
+        assert set(requested) == mine
+        assert registry.alive(10 ** 10) == ['other']
@@ -0,0 +1,116 @@
+import asyncio
+import logging
+import os
+import signal
+import threading
+import time
+from http import HTTPStatus
+
+import pytest
+import requests
+import telegram
+
+import utils
+from outbox import Outbox
+from scheduler import Scheduler
+from shutdown import GracefulExit, Shutdown
+
+pytestmark = pytest.mark.usefixtures('requests_get_session')
+
+
+def send_sigterm(delay):
+    timer = threading.Timer(delay, os.kill, (os.getpid(), signal.SIGTERM))
+    timer.start()
+    return timer
+
+
+class TestGracefulExit:
+
+    def test_signal_waits_for_deferred_block(self):
+        finished = []
+        with GracefulExit(timeout=5) as stop:
+            with pytest.raises(Shutdown):
+                with stop.deferred():
+                    os.kill(os.getpid(), signal.SIGTERM)
+                    time.sleep(0.05)
+                    finished.append(True)
+        assert finished
+
+    def test_signal_interrupts_sleep(self):
+        previous = signal.getsignal(signal.SIGTERM)
+        started = time.monotonic()
+        with GracefulExit() as stop:
+            send_sigterm(0.1)
+            with pytest.raises(Shutdown):
+                time.sleep(10)
+        assert time.monotonic() - started < 2
+        assert stop.requested.is_set()
+        assert signal.getsignal(signal.SIGTERM) is previous
+
+    def test_deferred_block_has_deadline(self):
+        started = time.monotonic()
+        with GracefulExit(timeout=0.2) as stop:
+            with pytest.raises(Shutdown, match='не завершилась'):
+                with stop.deferred():
+                    os.kill(os.getpid(), signal.SIGTERM)
+                    time.sleep(10)
+        assert time.monotonic() - started < 2
+
+
+class TestMainShutdown:
+
+    def test_main_stops_on_sigterm(self, monkeypatch, caplog):
+        import homework
+        monkeypatch.setattr(homework, 'PRACTICUM_TOKEN', 'token')
+        monkeypatch.setattr(homework, 'TELEGRAM_TOKEN', '1234:abcdefg')
+        monkeypatch.setattr(homework, 'TELEGRAM_CHAT_ID', '1')
+        monkeypatch.setattr(telegram, 'Bot', utils.MockTelegramBot)
+        monkeypatch.setattr(requests, 'get', lambda *args, **kwargs: (
+            utils.MockResponseGET(random_timestamp=1,
+                                  http_status=HTTPStatus.OK)
+        ))
+        started = time.monotonic()
+        send_sigterm(0.3)
+        with caplog.at_level(logging.INFO):
+            homework.main()
+        assert time.monotonic() - started < 5
+        assert 'Бот остановлен: получен сигнал SIGTERM' in caplog.text
+
+
+class TestServeShutdown:
+
+    def test_stop_interrupts_wait_and_delivers(self, monkeypatch, tmp_path):
+        import engine
+        from state import StateStore
+
+        def mock_get(*args, **kwargs):
+            response = utils.MockResponseGET(http_status=HTTPStatus.OK)
+            response.json = lambda: {
+                'homeworks': [{'homework_name': 'hw', 'status': 'approved'}],
+                'current_date': 777
+            }
+            return response
+
+        monkeypatch.setattr(requests, 'get', mock_get)
+        sent = []
+        bot = utils.MockTelegramBot()
+        bot.send_message = lambda chat_id, text: sent.append(text)
+        store = StateStore(tmp_path / 'state.db')
+        tenant = engine.Tenant('token', '1', timestamp=1)
+
+        async def run():
+            stop = asyncio.Event()
+            asyncio.get_running_loop().call_later(0.3, stop.set)
+            await engine.serve(
+                bot, [tenant], store, stop=stop,
+                scheduler=Scheduler(period=600, reviewing_period=600),
+                outbox=Outbox(tmp_path / 'outbox.jsonl', sync_interval=0.01)
+            )
+
+        started = time.monotonic()
+        asyncio.run(run())
+        assert time.monotonic() - started < 5
+        assert len(sent) == 1 and '"hw"' in sent[0]
+        restarted = engine.Tenant('token', '1')
+        store.restore([restarted])
+        assert restarted.timestamp == 777
@@ -0,0 +1,113 @@
+import os
+import subprocess
+import sys
+from http import HTTPStatus
+
+import pytest
+import requests
+import telegram
+
+import utils
+
+pytestmark = pytest.mark.usefixtures('requests_get_session')
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORT_BUDGET = 0.1
+DEFERRED_MODULES = ('telegram', 'requests', 'http.server', 'orjson')
+
+
+def import_homework(*options):
+    return subprocess.run(
+        [sys.executable, *options, '-c',
+         'import sys, homework; '
+         f'print(*[name in sys.modules for name in {DEFERRED_MODULES}])'],
+        cwd=ROOT_DIR, capture_output=True, text=True, check=True
+    )
+
+
+def run_once_modules(tmp_path):
+    return subprocess.run(
+        [sys.executable, '-c',
+         'import sys, types, homework, transport; '
+         'response = types.SimpleNamespace(status_code=200, headers={}, '
+         "content=b'{\"homeworks\": [], \"current_date\": 1}'); "
+         'transport.PooledSession.get = lambda *args, **kwargs: response; '
+         'assert homework.run_once(); '
+         f'print(*[name in sys.modules for name in {DEFERRED_MODULES}])'],
+        cwd=ROOT_DIR, capture_output=True, text=True, check=True,
+        env=dict(os.environ, PRACTICUM_TOKEN='token', TOKEN='1234:abc',
+                 TELEGRAM_CHAT_ID='1', STATE_DB=str(tmp_path / 'state.db'))
+    )
+
+
+def import_time(stderr):
+    for line in stderr.splitlines():
+        *_, cumulative, name = line.split('|')
+        if name.strip() == 'homework':
+            return int(cumulative) / 1e6
+    raise AssertionError('homework нет в выводе -X importtime')
+
+
+def mock_response_get(data):
+    def mocked_response(*args, **kwargs):
+        response = utils.MockResponseGET(http_status=HTTPStatus.OK)
+        response.json = lambda: data
+        return response
+    return mocked_response
+
+
+class TestStartup:
+
+    def test_heavy_modules_are_deferred(self):
+        loaded = import_homework().stdout.split()
+        assert loaded == ['False'] * len(DEFERRED_MODULES)
+
+    def test_import_time_budget(self):
+        spent = min(import_time(import_homework('-X', 'importtime').stderr)
+                    for _ in range(3))
+        assert spent < IMPORT_BUDGET
+
+    def test_run_once_without_changes(self, monkeypatch):
+        import homework
+        monkeypatch.setattr(homework, 'PRACTICUM_TOKEN', 'token')
+        monkeypatch.setattr(homework, 'TELEGRAM_TOKEN', '1234:abc')
+        monkeypatch.setattr(homework, 'TELEGRAM_CHAT_ID', '1')
+        monkeypatch.setattr(requests, 'get', mock_response_get(
+            {'homeworks': [], 'current_date': 1000}
+        ))
+        monkeypatch.setattr(telegram, 'Bot', None)
+
+        assert homework.run_once()
+
+        from state import StateStore
+        tenant = homework.Tenant('token', '1')
+        StateStore(homework.STATE_DB).restore([tenant])
+        assert tenant.timestamp == 1000
+
+    def test_run_once_without_changes_skips_telegram(self, tmp_path):
+        flags = run_once_modules(tmp_path).stdout.split()
+        loaded = dict(zip(DEFERRED_MODULES, flags[-len(DEFERRED_MODULES):]))
+        assert loaded['telegram'] == 'False'
+        assert loaded['requests'] == 'True'
+
+    def test_run_once_notifies_and_reports_failure(self, monkeypatch):
+        import homework
+        monkeypatch.setattr(homework, 'PRACTICUM_TOKEN', 'token')
+        monkeypatch.setattr(homework, 'TELEGRAM_TOKEN', '1234:abc')
+        monkeypatch.setattr(homework, 'TELEGRAM_CHAT_ID', '1')
+        bots = []
+
+        def mock_telegram_bot(token):
+            bots.append(utils.MockTelegramBot())
+            return bots[-1]
+
+        monkeypatch.setattr(telegram, 'Bot', mock_telegram_bot)
+        monkeypatch.setattr(requests, 'get', mock_response_get(
+            {'homeworks': [{'homework_name': 'hw', 'status': 'approved'}],
+             'current_date': 1000}
+        ))
+        assert homework.run_once()
+        assert len(bots) == 1 and '"hw"' in bots[0].text
+
+        monkeypatch.setattr(requests, 'get', mock_response_get([]))
+        assert not homework.run_once()
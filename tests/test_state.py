@@ -0,0 +1,89 @@
+import sqlite3
+import time
+
+from homework import Tenant
+from state import StateStore
+
+
+class TestStateStore:
+
+    def test_cursors_survive_restart(self, tmp_path):
+        path = tmp_path / 'state.db'
+        store = StateStore(path)
+        store.save_cursors({'a': 100, 'b': 200})
+        store.save_cursors({'a': 150})
+        store.close()
+
+        store = StateStore(path)
+        assert store.load_cursors() == {'a': 150, 'b': 200}
+        store.close()
+
+    def test_wal_mode(self, tmp_path):
+        store = StateStore(tmp_path / 'state.db')
+        mode, = store.connection.execute('PRAGMA journal_mode').fetchone()
+        assert mode == 'wal'
+        store.close()
+
+    def test_flush_and_restore(self, tmp_path):
+        path = tmp_path / 'state.db'
+        store = StateStore(path)
+        tenant = Tenant('token', '1', timestamp=100)
+        tenant.update_status({'id': 7, 'homework_name': 'hw',
+                              'status': 'reviewing'})
+        tenant.record_sent('message')
+        store.flush([tenant])
+        assert tenant.take_changes() == (None, {}, [])
+        store.close()
+
+        store = StateStore(path)
+        restarted = Tenant('token', '1')
+        store.restore([restarted])
+        assert restarted.timestamp == 100
+        assert restarted.statuses == {'7': 'reviewing'}
+        assert restarted.statuses.name('7') == 'hw'
+        assert [message for message, _ in restarted.history] == ['message']
+        assert [message for message, _ in
+                store.load_sent_messages(restarted.key)] == ['message']
+        store.close()
+
+    def test_old_database_gets_homework_names(self, tmp_path):
+        path = tmp_path / 'state.db'
+        connection = sqlite3.connect(path)
+        connection.execute(
+            'CREATE TABLE statuses (tenant TEXT NOT NULL, '
+            'homework_id TEXT NOT NULL, status TEXT NOT NULL, '
+            'PRIMARY KEY (tenant, homework_id)) WITHOUT ROWID'
+        )
+        connection.commit()
+        connection.close()
+
+        store = StateStore(path)
+        tenant = Tenant('token', '1')
+        tenant.update_status({'id': 7, 'homework_name': 'hw',
+                              'status': 'approved'})
+        store.flush([tenant])
+        restarted = Tenant('token', '1')
+        store.restore([restarted])
+        assert restarted.statuses.last(1) == [('7', 'approved', 'hw')]
+        store.close()
+
+    def test_restore_ten_thousand_tenants(self, tmp_path):
+        path = tmp_path / 'state.db'
+        store = StateStore(path)
+        tenants = [Tenant(f'token{i}', str(i), timestamp=i)
+                   for i in range(10000)]
+        for tenant in tenants:
+            for homework_id in range(3):
+                tenant.update_status({'id': homework_id,
+                                      'status': 'approved'})
+        store.flush(tenants)
+        store.close()
+
+        store = StateStore(path)
+        restarted = [Tenant(f'token{i}', str(i)) for i in range(10000)]
+        started = time.perf_counter()
+        store.restore(restarted)
+        assert time.perf_counter() - started < 1
+        assert restarted[42].timestamp == 42
+        assert len(restarted[42].statuses) == 3
+        store.close()
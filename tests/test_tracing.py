@@ -0,0 +1,137 @@
+import json
+import os
+import pstats
+import signal
+import threading
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+import requests
+
+import utils
+from tracing import NULL_SPAN, Profiler, Tracer, tracer
+from transport import PooledSession
+
+pytestmark = pytest.mark.usefixtures('requests_get_session')
+
+
+@pytest.fixture
+def trace_file(monkeypatch, tmp_path):
+    path = tmp_path / 'trace.json'
+    monkeypatch.setattr(tracer, 'path', str(path))
+    monkeypatch.setattr(tracer, 'events', [])
+    monkeypatch.setattr(tracer, 'tracks', {})
+    return path
+
+
+def read_trace(path):
+    return json.loads(path.read_text(encoding='utf-8').rstrip(',\n') + ']')
+
+
+class TestTracer:
+
+    def test_disabled_tracer_collects_nothing(self, tmp_path):
+        disabled = Tracer()
+        with disabled.span('request'):
+            pass
+        disabled.flush()
+        assert disabled.span('request') is NULL_SPAN
+        assert disabled.events == []
+
+    def test_phases_of_poll_are_traced(self, monkeypatch, trace_file):
+        import homework
+
+        def get(*args, **kwargs):
+            response = utils.MockResponseGET(http_status=HTTPStatus.OK)
+            response.json = lambda: {
+                'homeworks': [{'id': 1, 'homework_name': 'hw',
+                               'status': 'approved'}],
+                'current_date': 1
+            }
+            return response
+
+        monkeypatch.setattr(requests, 'get', get)
+        tenant = homework.Tenant('token', '7')
+        homework.check_updates(tenant, lambda message: True)
+        with tracer.span('flush'):
+            pass
+        tracer.flush()
+        tracer.flush()
+        events = read_trace(trace_file)
+        tracks = {event['args']['name']: event['tid'] for event in events
+                  if event['ph'] == 'M'}
+        spans = {event['name']: event for event in events
+                 if event['ph'] == 'X'}
+        assert set(spans) == {'check_updates', 'request', 'decode',
+                              'check_response', 'homeworks', 'flush'}
+        assert spans['request']['tid'] == tracks['tenant 7']
+        assert spans['flush']['tid'] == tracks['MainThread']
+        outer = spans['check_updates']
+        for name in ('request', 'decode', 'homeworks'):
+            assert outer['ts'] <= spans[name]['ts']
+            assert (spans[name]['ts'] + spans[name]['dur']
+                    <= outer['ts'] + outer['dur'])
+        assert all(event['pid'] == os.getpid() for event in events)
+
+    def test_failed_phase_is_marked(self, trace_file):
+        with pytest.raises(KeyError):
+            with tracer.span('parse_status'):
+                raise KeyError('status')
+        assert tracer.events[-1]['args'] == {'error': 'KeyError'}
+
+    def test_connection_is_traced(self, trace_file):
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                self.send_response(HTTPStatus.OK)
+                self.send_header('Content-Length', '2')
+                self.end_headers()
+                self.wfile.write(b'{}')
+
+            def log_message(self, *args):
+                pass
+
+        server = HTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        session = PooledSession()
+        try:
+            for _ in range(2):
+                session.session.get(
+                    f'http://127.0.0.1:{server.server_port}/'
+                )
+        finally:
+            session.close()
+            server.shutdown()
+        names = [event['name'] for event in tracer.events
+                 if event['ph'] == 'X']
+        assert names == ['dns_tcp']
+
+
+class TestProfiler:
+
+    def test_profiles_next_cycles(self, tmp_path):
+        profiler = Profiler(cycles=2, directory=str(tmp_path))
+        with profiler.cycle():
+            sum(range(1000))
+        assert profiler.profile is None
+        profiler.request()
+        for _ in range(3):
+            with profiler.cycle():
+                sorted(range(1000))
+        files = list(tmp_path.glob('profile-*.prof'))
+        assert len(files) == 1
+        stats = pstats.Stats(str(files[0]))
+        calls = {name[2]: stat[1] for name, stat in stats.stats.items()}
+        assert calls["<built-in method builtins.sorted>"] == 2
+
+    def test_signal_requests_profile(self, tmp_path):
+        profiler = Profiler(cycles=1, directory=str(tmp_path))
+        previous = signal.getsignal(signal.SIGUSR1)
+        try:
+            profiler.install()
+            os.kill(os.getpid(), signal.SIGUSR1)
+        finally:
+            signal.signal(signal.SIGUSR1, previous)
+        assert profiler.requested
@@ -0,0 +1,97 @@
+import gzip
+import itertools
+import json
+from http import HTTPStatus
+
+import requests
+
+import utils
+from breaker import get_breaker
+from state import StateStore
+from traffic import (RecordingBot, RecordingSession, TrafficLog, read_traffic,
+                     replay)
+
+
+def hw_response(status):
+    response = utils.MockResponseGET(http_status=HTTPStatus.OK)
+    response.json = lambda: {
+        'homeworks': [{'id': 1, 'homework_name': 'hw', 'status': status}],
+        'current_date': 100
+    }
+    return response
+
+
+def record_traffic(monkeypatch, session, path, cycles=6):
+    import homework
+    import transport
+    responses = itertools.chain(
+        [hw_response('reviewing'),
+         utils.MockResponseGET(http_status=HTTPStatus.SERVICE_UNAVAILABLE),
+         hw_response('approved')],
+        itertools.repeat(hw_response('approved'))
+    )
+    monkeypatch.setattr(requests, 'get',
+                        lambda *args, **kwargs: next(responses))
+    log = TrafficLog(path)
+    transport.set_session(RecordingSession(session, log))
+    bot = RecordingBot(utils.MockTelegramBot(), log)
+    store = StateStore(':memory:')
+    tenant = homework.Tenant('token', '42', timestamp=1)
+    for _ in range(cycles):
+        homework.poll_cycle(tenant, lambda message: (
+            homework.send_chat_message(bot, tenant.chat_id, message)
+        ), store)
+    store.close()
+    log.close()
+    transport.set_session(session)
+
+
+class TestTraffic:
+
+    def test_record_is_compact_and_readable(self, monkeypatch, tmp_path,
+                                            requests_get_session):
+        path = tmp_path / 'traffic.jsonl.gz'
+        record_traffic(monkeypatch, requests_get_session, path)
+        records = list(read_traffic(path))
+        kinds = [record['k'] for record in records]
+        assert kinds.count('api') == 6
+        assert kinds.count('send') == 3
+        assert records[0]['c'] == '42' and records[0]['from'] == 1
+        assert records[2]['s'] == HTTPStatus.SERVICE_UNAVAILABLE
+        assert 'token' not in gzip.decompress(path.read_bytes()).decode()
+
+    def test_replay_matches_recording(self, monkeypatch, tmp_path,
+                                      requests_get_session):
+        import homework
+        path = tmp_path / 'traffic.jsonl.gz'
+        record_traffic(monkeypatch, requests_get_session, path)
+
+        def forbidden_get(*args, **kwargs):
+            raise AssertionError('Воспроизведение не должно обращаться в сеть')
+
+        monkeypatch.setattr(requests, 'get', forbidden_get)
+        breaker = get_breaker(homework.ENDPOINT)
+        player = replay(path)
+        assert player.diverged == []
+        assert player.sent == 3
+        assert get_breaker(homework.ENDPOINT) is breaker
+
+    def test_replay_finds_regression(self, monkeypatch, tmp_path,
+                                     requests_get_session):
+        import homework
+        path = tmp_path / 'traffic.jsonl.gz'
+        record_traffic(monkeypatch, requests_get_session, path)
+        monkeypatch.setitem(homework.HOMEWORK_VERDICTS, 'approved', 'Ура!')
+        player = replay(path)
+        assert len(player.diverged) == 1
+        assert 'Ура!' in player.diverged[0]
+
+    def test_truncated_tail_is_skipped(self, tmp_path):
+        path = tmp_path / 'traffic.jsonl.gz'
+        lines = ''.join(json.dumps({'k': 'send', 'm': str(number)}) + '\n'
+                        for number in range(100))
+        data = gzip.compress(lines.encode())
+        path.write_bytes(data[:len(data) // 2])
+        records = list(read_traffic(path))
+        assert 0 < len(records) < 100
+        assert records[-1] == {'k': 'send', 'm': str(len(records) - 1)}
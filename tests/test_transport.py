@@ -0,0 +1,99 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+import transport
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    drops_left = 0
+    slow_requests = 0
+
+    def do_GET(self):
+        if self.path == '/slow':
+            Handler.slow_requests += 1
+            time.sleep(0.5)
+        if self.path == '/flaky' and Handler.drops_left:
+            Handler.drops_left -= 1
+            self.close_connection = True
+            return
+        body = b'{"homeworks": []}'
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server_url():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_port}'
+    server.shutdown()
+    server.server_close()
+
+
+class TestPooledSession:
+
+    def test_connection_is_reused(self, server_url):
+        counter = transport.API_CONNECTIONS
+        before = {kind: counter.labels(kind).value
+                  for kind in ('new', 'reused')}
+        session = transport.PooledSession()
+        first = session.get(f'{server_url}/')
+        second = session.get(f'{server_url}/')
+        assert first.json() == {'homeworks': []}
+        assert first.connection_reused is False
+        assert second.connection_reused is True
+        assert session.stats == {'new': 1, 'reused': 1}
+        assert {kind: counter.labels(kind).value - value
+                for kind, value in before.items()} == {'new': 1, 'reused': 1}
+        session.close()
+
+    def test_read_timeout(self, server_url):
+        session = transport.PooledSession(read_timeout=0.1, retries=0)
+        started = time.monotonic()
+        with pytest.raises(requests.RequestException):
+            session.get(f'{server_url}/slow')
+        assert time.monotonic() - started < 0.5
+        session.close()
+
+    def test_read_timeout_is_not_retried(self, server_url):
+        Handler.slow_requests = 0
+        session = transport.PooledSession(read_timeout=0.1)
+        with pytest.raises(requests.ReadTimeout):
+            session.get(f'{server_url}/slow')
+        assert Handler.slow_requests == 1
+        session.close()
+
+    def test_retry_on_dropped_connection(self, server_url):
+        Handler.drops_left = 1
+        session = transport.PooledSession(retries=2, backoff_factor=0)
+        response = session.get(f'{server_url}/flaky')
+        assert response.status_code == 200
+        assert Handler.drops_left == 0
+        session.close()
+
+    def test_get_api_answer_uses_pooled_session(self, monkeypatch,
+                                                server_url, homework_module):
+        session = transport.PooledSession()
+        previous = transport.set_session(session)
+        monkeypatch.setattr(homework_module, 'ENDPOINT', f'{server_url}/')
+        try:
+            for _ in range(2):
+                assert homework_module.get_api_answer(0) == {'homeworks': []}
+        finally:
+            transport.set_session(previous)
+            session.close()
+        assert session.stats == {'new': 1, 'reused': 1}
+
+    def test_get_session_is_shared(self):
+        assert transport.get_session() is transport.get_session()
@@ -0,0 +1,184 @@
+import cProfile
+import json
+import logging
+import os
+import signal
+import threading
+import time
+from contextlib import contextmanager
+
+from jsonlog import TENANT
+
+TRACE_FILE = os.getenv('TRACE_FILE')
+PROFILE_CYCLES = int(os.getenv('PROFILE_CYCLES', 10))
+PROFILE_DIR = os.getenv('PROFILE_DIR', '.')
+PROFILE_SIGNAL = signal.SIGUSR1
+
+logger = logging.getLogger(__name__)
+
+
+class Span:
+    """Отрезок времени одной фазы цикла опроса."""
+
+    __slots__ = ('tracer', 'name', 'track', 'args', 'start')
+
+    def __init__(self, tracer, name, track, args):
+        self.tracer = tracer
+        self.name = name
+        self.track = track
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, error_type, error, traceback):
+        end = time.perf_counter_ns()
+        if error_type is not None:
+            self.args['error'] = error_type.__name__
+        self.tracer.add(self.name, self.track, self.start, end, self.args)
+        return False
+
+
+class NullSpan:
+    """Отрезок, который ничего не записывает: трассировка выключена."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, error_type, error, traceback):
+        return False
+
+
+NULL_SPAN = NullSpan()
+
+
+class Tracer:
+    """
+    Собирает отрезки фаз опроса и дописывает их в файл path.
+    Формат - Trace Event (JSON Array), его открывают Perfetto
+    и chrome://tracing.
+    Отрезки студента попадают на его дорожку, остальные - на дорожку потока.
+    Без path отрезки не собираются.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.lock = threading.Lock()
+        self.events = []
+        self.tracks = {}
+
+    @property
+    def enabled(self):
+        """Включена ли трассировка."""
+        return self.path is not None
+
+    def span(self, name, track=None, **args):
+        """Возвращает контекстный менеджер, измеряющий фазу name."""
+        if self.path is None:
+            return NULL_SPAN
+        return Span(self, name, track, args)
+
+    def track(self, track):
+        """Возвращает номер дорожки, объявляя новую дорожку в трассе."""
+        if track is None:
+            track = TENANT.get()
+        if track is None:
+            track = threading.current_thread().name
+        else:
+            track = f'tenant {track}'
+        number = self.tracks.get(track)
+        if number is None:
+            number = self.tracks[track] = len(self.tracks) + 1
+            self.events.append({'name': 'thread_name', 'ph': 'M',
+                                'tid': number, 'args': {'name': track}})
+        return number
+
+    def add(self, name, track, start, end, args):
+        """Запоминает отрезок с началом и концом в наносекундах."""
+        with self.lock:
+            self.events.append({'name': name, 'ph': 'X',
+                                'tid': self.track(track),
+                                'ts': start / 1000,
+                                'dur': (end - start) / 1000,
+                                'args': args})
+
+    def flush(self):
+        """Дописывает собранные отрезки в файл."""
+        if self.path is None:
+            return
+        with self.lock:
+            events, self.events = self.events, []
+        if not events:
+            return
+        pid = os.getpid()
+        lines = []
+        for event in events:
+            event['pid'] = pid
+            lines.append(json.dumps(event, ensure_ascii=False, default=str))
+        with open(self.path, 'a', encoding='utf-8') as file:
+            # Закрывающая скобка массива в формате Trace Event необязательна,
+            # поэтому файл можно дописывать после каждого цикла.
+            prefix = '[\n' if file.tell() == 0 else ''
+            file.write(prefix + ',\n'.join(lines) + ',\n')
+
+
+class Profiler:
+    """
+    Профилирует cProfile циклы опроса по сигналу SIGUSR1.
+    После сигнала профилируются следующие cycles циклов, статистика
+    записывается в файл .prof в directory.
+    Профилируется поток, в котором выполняется цикл.
+    """
+
+    def __init__(self, cycles=PROFILE_CYCLES, directory=PROFILE_DIR):
+        self.cycles = cycles
+        self.directory = directory
+        self.requested = False
+        self.remaining = 0
+        self.profile = None
+
+    def request(self, *args):
+        """Включает профилирование со следующего цикла."""
+        self.requested = True
+
+    def install(self):
+        """Включает профилирование по сигналу PROFILE_SIGNAL."""
+        signal.signal(PROFILE_SIGNAL, self.request)
+
+    @contextmanager
+    def cycle(self):
+        """Профилирует цикл опроса, если профилирование включено."""
+        if self.requested and self.profile is None:
+            self.requested = False
+            self.remaining = self.cycles
+            self.profile = cProfile.Profile()
+            logger.info(f'Профилируем {self.cycles} циклов опроса')
+        if self.profile is None:
+            yield
+            return
+        self.profile.enable()
+        try:
+            yield
+        finally:
+            self.profile.disable()
+            self.remaining -= 1
+            if self.remaining <= 0:
+                self.dump()
+
+    def dump(self):
+        """Записывает статистику профилирования, если оно идёт."""
+        if self.profile is None:
+            return None
+        path = os.path.join(self.directory,
+                            f'profile-{os.getpid()}-{int(time.time())}.prof')
+        self.profile.dump_stats(path)
+        self.profile = None
+        logger.info(f'Профиль циклов опроса записан в {path}')
+        return path
+
+
+tracer = Tracer(TRACE_FILE)
+profiler = Profiler()
@@ -0,0 +1,337 @@
+import atexit
+import gzip
+import json
+import os
+import sys
+import threading
+import time
+import zlib
+from collections import defaultdict, deque
+
+from jsonlog import TENANT
+
+# telegram и requests импортируются при первом использовании: transport
+# импортирует этот модуль и без записи, в том числе при запуске с --once.
+
+TRAFFIC_RECORD = os.getenv('TRAFFIC_RECORD')
+
+# Заголовки ответа API, от которых зависит опрос (см. read_response).
+RECORDED_HEADERS = ('ETag', 'Last-Modified')
+
+
+class TrafficLog:
+    """
+    Запись обмена с API и Telegram в дописываемый файл gzip.
+    Каждый запрос или сообщение - строка JSON. После каждой строки поток
+    сжатия сбрасывается, поэтому при аварийном завершении теряется только
+    недописанная строка.
+    """
+
+    def __init__(self, path):
+        self.lock = threading.Lock()
+        self.file = gzip.open(path, 'at', encoding='utf-8')
+        atexit.register(self.close)
+
+    def write(self, record):
+        """Дописывает запись со временем и чатом студента."""
+        record['t'] = round(time.time(), 3)
+        record.setdefault('c', TENANT.get())
+        line = json.dumps(record, ensure_ascii=False, separators=(',', ':'))
+        with self.lock:
+            if self.file.closed:
+                return
+            self.file.write(line + '\n')
+            self.file.flush()
+
+    def close(self):
+        """Закрывает файл записи."""
+        with self.lock:
+            self.file.close()
+
+
+def read_traffic(path):
+    """
+    Читает записи из файла TrafficLog.
+    Недописанный хвост файла (после аварийного завершения) пропускается.
+    """
+    with gzip.open(path, 'rt', encoding='utf-8') as file:
+        try:
+            for line in file:
+                if not line.endswith('\n'):
+                    return
+                yield json.loads(line)
+        except (EOFError, zlib.error, gzip.BadGzipFile):
+            return
+
+
+def api_record(timestamp, status=None, headers=None, body=b'',
+               error=None):
+    """
+    Возвращает запись запроса к API с курсором timestamp.
+    Для ответа это код, заголовки из RECORDED_HEADERS и тело,
+    для сбоя без ответа - ошибка error.
+    """
+    record = {'k': 'api', 'from': timestamp}
+    if error is not None:
+        record['e'] = f'{type(error).__name__}: {error}'
+        return record
+    record['s'] = int(status)
+    headers = {name: headers[name] for name in RECORDED_HEADERS
+               if name in headers}
+    if headers:
+        record['h'] = headers
+    record['b'] = body.decode('utf-8', 'replace')
+    return record
+
+
+def send_record(chat_id, text, error=None):
+    """Возвращает запись отправленного сообщения и ошибки отправки."""
+    record = {'k': 'send', 'c': chat_id, 'm': text}
+    if error is not None:
+        record['e'] = str(error)
+    return record
+
+
+class RecordingSession:
+    """Сессия HTTP, записывающая каждый запрос к API и ответ на него."""
+
+    def __init__(self, session, log):
+        self.session = session
+        self.log = log
+
+    def __getattr__(self, name):
+        return getattr(self.session, name)
+
+    def get(self, url, params=None, **kwargs):
+        """Выполняет GET запрос и записывает его."""
+        timestamp = (params or {}).get('from_date')
+        try:
+            response = self.session.get(url, params=params, **kwargs)
+        except Exception as error:
+            self.log.write(api_record(timestamp, error=error))
+            raise
+        self.log.write(api_record(timestamp, response.status_code,
+                                  response.headers, response.content))
+        return response
+
+
+class RecordingBot:
+    """Бот Telegram, записывающий каждое отправленное сообщение."""
+
+    def __init__(self, bot, log):
+        self.bot = bot
+        self.log = log
+
+    def __getattr__(self, name):
+        return getattr(self.bot, name)
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        """Отправляет сообщение и записывает его."""
+        import telegram
+        try:
+            result = self.bot.send_message(chat_id=chat_id, text=text,
+                                           **kwargs)
+        except telegram.error.TelegramError as error:
+            self.log.write(send_record(chat_id, text, error))
+            raise
+        self.log.write(send_record(chat_id, text))
+        return result
+
+
+_log = None
+_log_lock = threading.Lock()
+
+
+def get_log(path=TRAFFIC_RECORD):
+    """Возвращает общий файл записи или None, если запись выключена."""
+    global _log
+    if path is None:
+        return None
+    if _log is None:
+        with _log_lock:
+            if _log is None:
+                _log = TrafficLog(path)
+    return _log
+
+
+def record_session(session):
+    """В режиме записи оборачивает сессию HTTP в RecordingSession."""
+    log = get_log()
+    return session if log is None else RecordingSession(session, log)
+
+
+def record_bot(bot):
+    """В режиме записи оборачивает бота Telegram в RecordingBot."""
+    log = get_log()
+    return bot if log is None else RecordingBot(bot, log)
+
+
+class ReplayResponse:
+    """Ответ API из записи с интерфейсом requests.Response."""
+
+    def __init__(self, record):
+        from requests.structures import CaseInsensitiveDict
+        self.status_code = record['s']
+        self.reason = ''
+        self.headers = CaseInsensitiveDict(record.get('h', {}))
+        self.text = record['b']
+        self.content = self.text.encode()
+
+    def json(self):
+        """Разбирает тело ответа."""
+        return json.loads(self.text)
+
+
+class Replay:
+    """
+    Воспроизведение записи без сети.
+    Ответы API выдаются по очереди каждому чату, отправленные сообщения
+    сравниваются с записанными. Расхождения (другой курсор, другое,
+    лишнее или недостающее сообщение) собираются в diverged.
+    """
+
+    def __init__(self, records):
+        self.exchanges = [record for record in records
+                          if record['k'] == 'api']
+        self.responses = defaultdict(deque)
+        self.messages = defaultdict(deque)
+        for record in records:
+            queue = self.responses if record['k'] == 'api' else self.messages
+            queue[record['c']].append(record)
+        self.diverged = []
+        self.sent = 0
+
+    def get(self, url, params=None, **kwargs):
+        """Возвращает следующий записанный ответ API для чата студента."""
+        import requests
+        chat_id = TENANT.get()
+        queue = self.responses[chat_id]
+        if not queue:
+            raise requests.ConnectionError('Запись ответов API закончилась')
+        record = queue.popleft()
+        timestamp = (params or {}).get('from_date')
+        if timestamp != record['from']:
+            self.diverged.append(
+                f'{chat_id}: курсор {timestamp} вместо {record["from"]}'
+            )
+        if 'e' in record:
+            raise requests.ConnectionError(record['e'])
+        return ReplayResponse(record)
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        """Сравнивает сообщение с записанным и повторяет сбой отправки."""
+        import telegram
+        self.sent += 1
+        queue = self.messages[chat_id]
+        if not queue:
+            self.diverged.append(f'{chat_id}: лишнее сообщение: {text}')
+            return
+        record = queue.popleft()
+        if record['m'] != text:
+            self.diverged.append(f'{chat_id}: сообщение {text!r} '
+                                 f'вместо {record["m"]!r}')
+        if 'e' in record:
+            raise telegram.error.TelegramError(record['e'])
+
+    def pending(self, record):
+        """Проверяет, что записанный ответ ещё не выдан."""
+        queue = self.responses[record['c']]
+        return bool(queue) and queue[0] is record
+
+    def finish(self):
+        """Отмечает записанные, но не отправленные сообщения."""
+        for chat_id, queue in self.messages.items():
+            for record in queue:
+                self.diverged.append(
+                    f'{chat_id}: не отправлено сообщение: {record["m"]}'
+                )
+            queue.clear()
+
+
+class VirtualClock:
+    """
+    Часы со временем записи вместо настоящего.
+    Их получают сводки сбоев студентов и предохранитель API, поэтому
+    они ведут себя, как при записи, при любой скорости воспроизведения.
+    """
+
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        """Возвращает время записи."""
+        return self.now
+
+
+def replay(path, speed=0):
+    """
+    Пропускает запись path через цикл опроса main() без сети.
+    Паузы между запросами сокращаются в speed раз, при speed=0 их нет.
+    Возвращает объект Replay с расхождениями.
+    """
+    import homework
+    import transport
+    from breaker import CircuitBreaker, set_breaker
+    from state import StateStore
+
+    records = list(read_traffic(path))
+    player = Replay(records)
+    if not player.exchanges:
+        return player
+    store = StateStore(':memory:')
+    tenants = {}
+    clock = VirtualClock(player.exchanges[0]['t'])
+    saved_session = transport.set_session(player)
+    saved_breaker = set_breaker(
+        homework.ENDPOINT, CircuitBreaker(homework.ENDPOINT, clock=clock)
+    )
+    try:
+        for record in player.exchanges:
+            if speed:
+                time.sleep(max(0, record['t'] - clock.now) / speed)
+            clock.now = record['t']
+            chat_id = record['c']
+            if chat_id not in tenants:
+                tenants[chat_id] = homework.Tenant(
+                    f'replay:{chat_id}', chat_id, timestamp=record['from']
+                )
+                tenants[chat_id].errors.clock = clock
+            tenant = tenants[chat_id]
+            homework.poll_cycle(tenant, lambda message: (
+                homework.send_chat_message(player, tenant.chat_id, message)
+            ), store)
+            if player.pending(record):
+                # Опрос не дошёл до запроса (например, разомкнут
+                # предохранитель API), а при записи запрос был.
+                player.responses[chat_id].popleft()
+                player.diverged.append(f'{chat_id}: запрос не отправлен')
+    finally:
+        transport.set_session(saved_session)
+        set_breaker(homework.ENDPOINT, saved_breaker)
+        store.close()
+    player.finish()
+    return player
+
+
+def main():
+    """Воспроизводит запись и печатает расхождения."""
+    import argparse
+    parser = argparse.ArgumentParser(
+        description='Воспроизведение записи обмена с API и Telegram'
+    )
+    parser.add_argument('path', help='файл записи (TRAFFIC_RECORD)')
+    parser.add_argument('--speed', type=float, default=0,
+                        help='ускорение пауз между запросами, 0 - без пауз')
+    args = parser.parse_args()
+    started = time.perf_counter()
+    player = replay(args.path, args.speed)
+    seconds = time.perf_counter() - started
+    print(f'Запросов к API: {len(player.exchanges)}, сообщений: '
+          f'{player.sent}, за {seconds:.2f} с')
+    for line in player.diverged:
+        print(f'Расхождение: {line}')
+    sys.exit(1 if player.diverged else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,188 @@
+import logging
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ReadTimeoutError
+from urllib3.util.retry import Retry
+
+from metrics import API_CONNECTIONS
+from tracing import tracer
+
+HTTP_POOL_CONNECTIONS = int(os.getenv('HTTP_POOL_CONNECTIONS', 10))
+HTTP_POOL_MAXSIZE = int(os.getenv('HTTP_POOL_MAXSIZE', 100))
+HTTP_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', 5))
+HTTP_READ_TIMEOUT = float(os.getenv('HTTP_READ_TIMEOUT', 30))
+HTTP_RETRIES = int(os.getenv('HTTP_RETRIES', 3))
+HTTP_BACKOFF_FACTOR = float(os.getenv('HTTP_BACKOFF_FACTOR', 0.5))
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+
+class TracedHTTPConnection(HTTPConnection):
+    """Соединение, измеряющее разрешение имени и подключение TCP."""
+
+    def _new_conn(self):
+        with tracer.span('dns_tcp', host=self.host):
+            return super()._new_conn()
+
+
+class TracedHTTPSConnection(HTTPSConnection):
+    """
+    TLS соединение, измеряющее установку соединения целиком.
+    Отрезок connect включает dns_tcp (разрешение имени и подключение TCP),
+    остаток connect - рукопожатие TLS.
+    """
+
+    def _new_conn(self):
+        with tracer.span('dns_tcp', host=self.host):
+            return super()._new_conn()
+
+    def connect(self):
+        """Устанавливает соединение и рукопожатие TLS."""
+        with tracer.span('connect', host=self.host):
+            super().connect()
+
+
+class MeteredHTTPConnectionPool(HTTPConnectionPool):
+    """Пул соединений, отмечающий открытие нового соединения."""
+
+    ConnectionCls = TracedHTTPConnection
+
+    def _new_conn(self):
+        _local.new_connection = True
+        return super()._new_conn()
+
+
+class MeteredHTTPSConnectionPool(HTTPSConnectionPool):
+    """Пул TLS соединений, отмечающий открытие нового соединения."""
+
+    ConnectionCls = TracedHTTPSConnection
+
+    def _new_conn(self):
+        _local.new_connection = True
+        return super()._new_conn()
+
+
+class MeteredAdapter(HTTPAdapter):
+    """
+    Адаптер requests с пулом keep-alive соединений.
+    Для каждого запроса отмечает, было ли соединение новым.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.lock = threading.Lock()
+        self.stats = {'new': 0, 'reused': 0}
+        super().__init__(*args, **kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        """Создаёт менеджер пулов с отмечающими пулами соединений."""
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': MeteredHTTPConnectionPool,
+            'https': MeteredHTTPSConnectionPool,
+        }
+
+    def send(self, request, **kwargs):
+        """Отправляет запрос и учитывает, было ли соединение новым."""
+        _local.new_connection = False
+        response = super().send(request, **kwargs)
+        response.connection_reused = not _local.new_connection
+        kind = 'reused' if response.connection_reused else 'new'
+        with self.lock:
+            self.stats[kind] += 1
+        API_CONNECTIONS.labels(kind).inc()
+        logger.debug(f'{request.method} {request.url} - '
+                     f'соединение: {kind}')
+        return response
+
+
+class ResetRetry(Retry):
+    """
+    Повторы при ошибке подключения и обрыве соединения.
+    Таймаут чтения не повторяется: зависший сервер не ответит и на повтор,
+    а каждая попытка задерживала бы опрос ещё на read_timeout секунд.
+    """
+
+    def increment(self, method=None, url=None, response=None, error=None,
+                  _pool=None, _stacktrace=None):
+        """Засчитывает попытку или пробрасывает таймаут чтения."""
+        if isinstance(error, ReadTimeoutError):
+            raise error.with_traceback(_stacktrace)
+        return super().increment(method, url, response, error, _pool,
+                                 _stacktrace)
+
+
+class PooledSession:
+    """Сессия HTTP с пулом соединений, таймаутами и повторами."""
+
+    def __init__(self, pool_connections=HTTP_POOL_CONNECTIONS,
+                 pool_maxsize=HTTP_POOL_MAXSIZE,
+                 connect_timeout=HTTP_CONNECT_TIMEOUT,
+                 read_timeout=HTTP_READ_TIMEOUT,
+                 retries=HTTP_RETRIES,
+                 backoff_factor=HTTP_BACKOFF_FACTOR):
+        self.timeout = (connect_timeout, read_timeout)
+        self.adapter = MeteredAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            max_retries=ResetRetry(
+                total=retries,
+                connect=retries,
+                read=retries,
+                status=0,
+                allowed_methods=frozenset({'GET'}),
+                backoff_factor=backoff_factor,
+                raise_on_status=False,
+            ),
+        )
+        self.session = requests.Session()
+        self.session.mount('http://', self.adapter)
+        self.session.mount('https://', self.adapter)
+
+    @property
+    def stats(self):
+        """Число запросов по новым и переиспользованным соединениям."""
+        with self.adapter.lock:
+            return dict(self.adapter.stats)
+
+    def get(self, url, **kwargs):
+        """Выполняет GET запрос с таймаутами по умолчанию."""
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session.get(url, **kwargs)
+
+    def close(self):
+        """Закрывает все соединения пула."""
+        self.session.close()
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def set_session(session):
+    """
+    Заменяет общую для процесса сессию и возвращает прежнюю.
+    Через эту функцию свою сессию подставляют тесты и воспроизведение
+    записи обмена с API (traffic.py).
+    """
+    global _session
+    with _session_lock:
+        previous, _session = _session, session
+    return previous
+
+
+def get_session():
+    """Возвращает общую для процесса сессию, создавая её при первом вызове."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                from traffic import record_session
+                _session = record_session(PooledSession())
+    return _session